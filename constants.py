@@ -3,19 +3,54 @@
 import os as _os
 if _os.path.isdir("/media/hdd"):
     TRASH_PATH = "/media/hdd/.pilotfs_trash"
+    FILE_INDEX_FILE = "/media/hdd/.pilotfs_files.db"
 else:
     TRASH_PATH = "/tmp/.pilotfs_trash"
+    FILE_INDEX_FILE = "/tmp/pilotfs_files.db"
 del _os  # Clean up namespace
+TRASH_DIR_NAME = ".pilotfs_trash"  # per-device trash at <mountpoint>/.pilotfs_trash
+TRASH_PURGE_DAYS = 30  # "purge old items" removes trash older than this
 BOOKMARKS_FILE = "/etc/enigma2/pilotfs_bookmarks.json"
 HISTORY_FILE = "/tmp/pilotfs_history.json"
 CACHE_FILE = "/tmp/pilotfs_cache.json"
+CACHE_STATS_FILE = "/tmp/pilotfs_cache_stats.json"
 REMOTE_CONNECTIONS_FILE = "/etc/enigma2/pilotfs_remotes.json"
 LOG_FILE = "/tmp/pilotfs.log"
+TRANSFER_JOURNAL_FILE = "/etc/enigma2/pilotfs_transfers.json"  # survives reboots
 
 # Limits
 MAX_PREVIEW_SIZE = 1024 * 1024  # 1MB default
 MAX_CACHE_SIZE = 1000
+CACHE_DEFAULT_TTL = 24 * 60 * 60  # 1 day
+MAX_CACHE_BYTES = 8 * 1024 * 1024  # 8MB resident budget
+CACHE_LOW_WATER = 0.8  # Evict down to 80% of a limit
+CACHE_SHARDS = 8
+MAX_LISTING_CACHE_DIRS = 64
+STAT_SCANDIR_THRESHOLD = 8  # stat_many() reads a directory once for this many names
+CACHE_STATS_INTERVAL = 60  # seconds between stats dumps
+NEGATIVE_CACHE_TTL = 5  # seconds a failed stat() is remembered
+MOUNT_UNHEALTHY_TTL = 30  # seconds a mount that returned EIO/timeout is skipped
+SIZE_REVALIDATE_INTERVAL = 10  # seconds a folder size is shown before its subtree is checked again
 MAX_HISTORY_ITEMS = 50
+COPY_BUFFER_SIZE = 1024 * 1024  # read/write fallback buffer
+COPY_CHUNK_SIZE = 8 * 1024 * 1024  # bytes per copy_file_range/sendfile call
+TRANSFER_WORKERS = 3  # parallel transfers, at most one per device
+TREE_COPY_WORKERS = 4  # threads copying small files in a directory tree
+TREE_COPY_QUEUE = 64  # small files waiting for a copy thread
+TREE_COPY_SMALL_FILE = 4 * 1024 * 1024  # larger files are copied one at a time
+TRANSFER_CHECKPOINT_BYTES = 64 * 1024 * 1024  # flush and journal a resume point this often
+JOURNAL_SAVE_INTERVAL = 10  # seconds between transfer journal writes
+FILE_INDEX_REFRESH_INTERVAL = 15 * 60  # seconds between background index revalidations
+WALK_WORKERS = {  # directories listed at once when searching, by filesystem type
+    'cifs': 8, 'smb3': 8, 'smbfs': 8, 'nfs': 8, 'nfs4': 8,
+    'fuse.sshfs': 4, 'davfs': 4, 'fuse.rclone': 4,
+    'vfat': 2, 'exfat': 2, 'ntfs': 2, 'fuseblk': 2,
+}
+WALK_WORKERS_DEFAULT = 1  # local disks: one reader avoids seeking between directories
+DELETE_BATCH_SIZE = 50  # unlinks between progress updates / throttle checks
+DELETE_FILES_PER_SEC = 500
+DELETE_BYTES_PER_SEC = 2 * 1024 ** 3  # blocks released per second
+DELETE_TRUNCATE_STEP = 512 * 1024 * 1024  # large files shrink in steps before unlink
 
 # Icons
 ICON_FOLDER = "📁"
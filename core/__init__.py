@@ -1,7 +1,7 @@
 from .config import PilotFSConfig
-from .cache import FileCache
+from .cache import FileCache, ShardedFileCache
 from .file_operations import FileOperations
 from .archive import ArchiveManager
 from .search import SearchEngine
 
-__all__ = ['PilotFSConfig', 'FileCache', 'FileOperations', 'ArchiveManager', 'SearchEngine']
\ No newline at end of file
+__all__ = ['PilotFSConfig', 'FileCache', 'ShardedFileCache', 'FileOperations', 'ArchiveManager', 'SearchEngine']
\ No newline at end of file
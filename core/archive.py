@@ -63,15 +63,8 @@ class ArchiveManager:
             if archive_name.endswith('.tar'):
                 archive_name = archive_name[:-4]
             
-            extract_dir = os.path.join(destination, archive_name)
-            
-            # Make unique if exists
-            counter = 1
-            while os.path.exists(extract_dir):
-                extract_dir = os.path.join(destination, f"{archive_name}_{counter}")
-                counter += 1
-            
-            os.makedirs(extract_dir, exist_ok=True)
+            # Claim a fresh extraction directory
+            extract_dir = self.file_ops.namer.allocate(destination, archive_name, 'dir')
             
             # Extract based on file type
             if archive_path.endswith('.zip'):
@@ -1,95 +1,680 @@
+import hashlib
 import json
 import os
+import sys
+import tempfile
 import threading
+import time
+import zlib
 from collections import OrderedDict
-from ..constants import CACHE_FILE, MAX_CACHE_SIZE
+from ..constants import (
+    CACHE_FILE, MAX_CACHE_SIZE, CACHE_DEFAULT_TTL, CACHE_LOW_WATER, CACHE_SHARDS,
+    CACHE_STATS_FILE, CACHE_STATS_INTERVAL
+)
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+def make_key(prefix, path):
+    """Build a process-independent cache key for a path.
+
+    Unlike hash(), the digest is stable across interpreter runs, so keys
+    written to the persistent log stay valid after a restart.
+    """
+    digest = hashlib.md5(os.path.normpath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return f"{prefix}:{digest}"
+
+def stat_signature(path_or_stat):
+    """Return (st_dev, st_ino, st_mtime_ns, st_size) or None if unavailable"""
+    try:
+        st = path_or_stat if hasattr(path_or_stat, 'st_ino') else os.stat(path_or_stat)
+        return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+    except (OSError, TypeError, ValueError):
+        return None
+
+def estimate_size(value, _depth=0):
+    """Rough resident footprint of a cached value in bytes.
+
+    Walks containers a few levels deep; sys.getsizeof() alone would count
+    a directory listing as just the list header.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+def _hit_rate(hits, misses):
+    total = hits + misses
+    return round(hits / total * 100, 1) if total > 0 else 0.0
+
+def _build_stats(size, hits, misses, inserts, evictions, lookup_time, prefix_counts,
+                 resident_bytes, max_size, max_bytes, since):
+    lookups = hits + misses
+    elapsed = max(time.time() - since, 1e-6)
+    return {
+        'size': size,
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': _hit_rate(hits, misses),
+        'inserts': inserts,
+        'insert_rate': round(inserts / elapsed, 2),
+        'evictions': evictions,
+        'bytes': resident_bytes,
+        'max_size': max_size,
+        'max_bytes': max_bytes,
+        'mean_lookup_us': round(lookup_time / lookups * 1e6, 2) if lookups else 0.0,
+        'prefixes': {
+            prefix: {'hits': h, 'misses': m, 'hit_rate': _hit_rate(h, m)}
+            for prefix, (h, m) in sorted(prefix_counts.items())
+        },
+        'uptime': round(elapsed, 1)
+    }
+
+class _CacheEntry:
+    __slots__ = ('value', 'expires', 'signature', 'nbytes')
+
+    def __init__(self, value, expires=None, signature=None):
+        self.value = value
+        self.expires = expires
+        self.signature = signature
+        self.nbytes = estimate_size(value)
+
+    def is_expired(self, now):
+        return self.expires is not None and now >= self.expires
+
+    def to_record(self, key):
+        record = {'k': key, 'v': self.value}
+        if self.expires is not None:
+            record['e'] = self.expires
+        if self.signature is not None:
+            record['s'] = list(self.signature)
+        return record
 
 class FileCache:
-    def __init__(self, max_size=MAX_CACHE_SIZE, cache_file=None):
+    """LRU cache persisted as an append-only JSON-lines log.
+
+    Each set/delete appends a single record instead of rewriting the whole
+    file. Once stale records outnumber live entries the log is compacted in
+    a background thread into a fresh snapshot (temp file + rename), so a
+    crash mid-write can only lose the last, partially written record.
+    Nothing is read from disk until the cache is first used.
+
+    Entries may carry an expiry time and a stat signature; a signature
+    passed to get() must match the stored one for the entry to be served.
+
+    The cache is bounded by entry count and, if ``max_bytes`` is given, by
+    the estimated footprint of its values. Crossing either limit evicts
+    least recently used entries in one batch down to ``low_water`` of the
+    limit, rather than one entry per set().
+    """
+
+    # Compact once the log holds this many records per live entry...
+    COMPACT_RATIO = 2
+    # ...but never for logs smaller than this
+    COMPACT_MIN_RECORDS = 500
+
+    def __init__(self, max_size=MAX_CACHE_SIZE, cache_file=None, default_ttl=CACHE_DEFAULT_TTL,
+                 max_bytes=None, low_water=CACHE_LOW_WATER, lock_free_reads=False):
         self.cache = OrderedDict()
+        self.lock_free_reads = lock_free_reads
         self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.total_bytes = 0
+        self.default_ttl = default_ttl
         self.cache_file = cache_file or CACHE_FILE
+        self._reset_counters()
+        self.lock = threading.RLock()
+        self._loaded = False
+        self._log = None
+        self._log_records = 0
+        self._compacting = False
+        self._compact_buffer = None
+
+    def _reset_counters(self):
         self.hits = 0
         self.misses = 0
-        self.lock = threading.RLock()
-        self.load_cache()
-    
+        self.inserts = 0
+        self.evictions = 0
+        self.lookup_time = 0.0
+        self.prefix_stats = {}
+        self.stats_since = time.time()
+
+    def _ensure_loaded(self):
+        """Replay the log on first access"""
+        if not self._loaded:
+            with self.lock:
+                if not self._loaded:
+                    self.load_cache()
+
     def load_cache(self):
         """Load cache from file"""
-        if self.cache_file and os.path.exists(self.cache_file):
+        with self.lock:
+            self._loaded = True
+            if not self.cache_file or not os.path.exists(self.cache_file):
+                return False
             try:
-                with open(self.cache_file, 'r') as f:
-                    data = json.load(f)
-                    for key, value in data.items():
-                        self.cache[key] = value
+                records = 0
+                now = time.time()
+                complete = 0  # bytes up to the end of the last whole line
+                with open(self.cache_file, 'rb') as f:
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        complete += len(line)
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Torn write from a crash - skip the record
+                            continue
+                        if not isinstance(record, dict):
+                            continue
+                        records += 1
+                        if 'k' not in record:
+                            # Legacy whole-file snapshot keyed by hash(),
+                            # which is meaningless in a new process
+                            continue
+                        key = record['k']
+                        self._remove(key)
+                        if record.get('d'):
+                            continue
+                        signature = record.get('s')
+                        entry = _CacheEntry(
+                            record.get('v'),
+                            record.get('e'),
+                            tuple(signature) if signature else None
+                        )
+                        if not entry.is_expired(now):
+                            self.cache[key] = entry
+                            self.total_bytes += entry.nbytes
+
+                if complete < os.path.getsize(self.cache_file):
+                    # Cut off a torn last line, or the next append would be
+                    # glued onto it and lost on the following load
+                    os.truncate(self.cache_file, complete)
+
+                self._evict()
+
+                self._log_records = records
+                self._maybe_compact()
                 return True
-            except Exception:
-                pass
+            except Exception as e:
+                logger.warning(f"Failed to load cache {self.cache_file}: {e}")
         return False
-    
+
     def save_cache(self):
-        """Save cache to file"""
-        if self.cache_file:
+        """Write a compacted snapshot of the cache atomically"""
+        if not self.cache_file:
+            return False
+        self._ensure_loaded()
+
+        tmp_path = None
+        try:
+            with self.lock:
+                now = time.time()
+                snapshot = [(key, entry) for key, entry in self.cache.items()
+                            if not entry.is_expired(now)]
+                self._compact_buffer = []
+
+            cache_dir = os.path.dirname(self.cache_file) or '.'
+            fd, tmp_path = tempfile.mkstemp(prefix='.pilotfs_cache.', dir=cache_dir)
+            with os.fdopen(fd, 'w') as f:
+                written = 0
+                for key, entry in snapshot:
+                    line = self._encode(entry.to_record(key))
+                    if line:
+                        f.write(line)
+                        written += 1
+
+                # Records appended while the snapshot was being written are
+                # carried over under the lock, so none are lost by the rename
+                with self.lock:
+                    for line in self._compact_buffer:
+                        f.write(line)
+                        written += 1
+                    self._compact_buffer = None
+                    f.flush()
+                    os.fsync(f.fileno())
+                    os.replace(tmp_path, self.cache_file)
+                    tmp_path = None
+                    self._close_log()
+                    self._log_records = written
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to save cache {self.cache_file}: {e}")
+            with self.lock:
+                self._compact_buffer = None
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        return False
+
+    def _encode(self, record):
+        """Serialise one log record, or None if the value is not JSON-safe"""
+        try:
+            return json.dumps(record, separators=(',', ':')) + '\n'
+        except (TypeError, ValueError):
+            return None
+
+    def _append(self, record):
+        """Append a record to the log (caller holds the lock)"""
+        if not self.cache_file:
+            return
+        line = self._encode(record)
+        if not line:
+            return
+        try:
+            if self._log is None:
+                self._log = open(self.cache_file, 'a')
+            self._log.write(line)
+            self._log.flush()
+            self._log_records += 1
+            if self._compact_buffer is not None:
+                self._compact_buffer.append(line)
+        except Exception as e:
+            logger.debug(f"Cache log append failed: {e}")
+            self._close_log()
+            return
+        self._maybe_compact()
+
+    def _close_log(self):
+        if self._log is not None:
             try:
-                with open(self.cache_file, 'w') as f:
-                    json.dump(dict(self.cache), f)
-                return True
+                self._log.close()
             except Exception:
                 pass
-        return False
-    
-    def get(self, key, default=None):
-        """Get value from cache"""
+            self._log = None
+
+    def _maybe_compact(self):
+        """Start a background compaction if the log is mostly stale"""
+        threshold = max(self.COMPACT_MIN_RECORDS, len(self.cache) * self.COMPACT_RATIO)
+        if self._compacting or self._log_records <= threshold:
+            return
+        self._compacting = True
+        threading.Thread(target=self._compact_worker, daemon=True).start()
+
+    def _compact_worker(self):
+        try:
+            self.save_cache()
+        finally:
+            self._compacting = False
+
+    def _remove(self, key):
+        """Drop an entry and its byte accounting (caller holds the lock)"""
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.nbytes
+        return entry
+
+    def _over_limit(self):
+        return (len(self.cache) > self.max_size or
+                (self.max_bytes is not None and self.total_bytes > self.max_bytes))
+
+    def _evict(self):
+        """Evict LRU entries in one batch down to the low-water mark.
+
+        Evictions are not logged: replaying the log applies the same limits.
+        """
+        if not self._over_limit():
+            return 0
+        target_count = int(self.max_size * self.low_water)
+        target_bytes = int(self.max_bytes * self.low_water) if self.max_bytes is not None else None
+        evicted = 0
+        while self.cache and (len(self.cache) > target_count or
+                              (target_bytes is not None and self.total_bytes > target_bytes)):
+            _, entry = self.cache.popitem(last=False)
+            self.total_bytes -= entry.nbytes
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def get(self, key, default=None, signature=None):
+        """Get value from cache
+
+        Expired entries, and entries whose stored stat signature differs
+        from ``signature``, are dropped and reported as misses.
+        """
+        self._ensure_loaded()
+        started = time.perf_counter()
+        if self.lock_free_reads:
+            hit, value = self._get_optimistic(key, signature)
+        else:
+            hit, value = self._get_locked(key, signature)
+        self._record_lookup(key, hit, time.perf_counter() - started)
+        return value if hit else default
+
+    def _is_stale(self, entry, signature):
+        return entry.is_expired(time.time()) or (
+            signature is not None and entry.signature is not None
+            and tuple(signature) != entry.signature
+        )
+
+    def _get_locked(self, key, signature):
         with self.lock:
-            if key in self.cache:
-                self.cache.move_to_end(key)
-                self.hits += 1
-                return self.cache[key]
+            entry = self.cache.get(key)
+            if entry is None:
+                return False, None
+            if self._is_stale(entry, signature):
+                self._remove(key)
+                self._append({'k': key, 'd': 1})
+                return False, None
+            self.cache.move_to_end(key)
+            return True, entry.value
+
+    def _get_optimistic(self, key, signature):
+        """Serve fresh hits without blocking on the lock.
+
+        A single dict lookup is atomic under the GIL. The LRU bump is only
+        done if the lock is free; under contention recency is approximate,
+        which costs nothing but slightly worse eviction choices.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return False, None
+        if self._is_stale(entry, signature):
+            with self.lock:
+                if self.cache.get(key) is entry:
+                    self._remove(key)
+                    self._append({'k': key, 'd': 1})
+            return False, None
+        if self.lock.acquire(blocking=False):
+            try:
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+            finally:
+                self.lock.release()
+        return True, entry.value
+
+    def _record_lookup(self, key, hit, elapsed):
+        """Update hit/miss and latency counters.
+
+        Not locked: on the lock-free path concurrent updates may
+        occasionally be lost, which is acceptable for statistics.
+        """
+        prefix = key.split(':', 1)[0] if isinstance(key, str) and ':' in key else 'other'
+        counts = self.prefix_stats.get(prefix)
+        if counts is None:
+            counts = self.prefix_stats.setdefault(prefix, [0, 0])
+        if hit:
+            self.hits += 1
+            counts[0] += 1
+        else:
             self.misses += 1
+            counts[1] += 1
+        self.lookup_time += elapsed
+
+    def get_validated(self, key, path, default=None):
+        """Get value only if the file at ``path`` is unchanged since set()"""
+        signature = stat_signature(path)
+        if signature is None:
+            self.delete(key)
             return default
-    
-    def set(self, key, value):
-        """Set value in cache"""
+        return self.get(key, default, signature=signature)
+
+    def set(self, key, value, ttl=None, signature=None):
+        """Set value in cache
+
+        Args:
+            ttl: Lifetime in seconds (defaults to ``default_ttl``; 0 or
+                None there means the entry never expires)
+            signature: stat_signature() of the file the value describes
+        """
+        self._ensure_loaded()
+        if ttl is None:
+            ttl = self.default_ttl
+        entry = _CacheEntry(
+            value,
+            time.time() + ttl if ttl else None,
+            tuple(signature) if signature is not None else None
+        )
+        if self.max_bytes is not None and entry.nbytes > self.max_bytes:
+            # Would evict everything else and still not fit
+            self.delete(key)
+            return False
         with self.lock:
-            if key in self.cache:
-                self.cache.move_to_end(key)
-            self.cache[key] = value
-            
+            self._remove(key)
+            self.cache[key] = entry
+            self.total_bytes += entry.nbytes
+            self.inserts += 1
+
             # Remove oldest items if cache is full
-            if len(self.cache) > self.max_size:
-                oldest = next(iter(self.cache))
-                del self.cache[oldest]
+            self._evict()
+
+            self._append(entry.to_record(key))
             return True
-    
+
     def delete(self, key):
         """Delete key from cache"""
+        self._ensure_loaded()
         with self.lock:
-            if key in self.cache:
-                del self.cache[key]
+            if self._remove(key) is not None:
+                self._append({'k': key, 'd': 1})
                 return True
             return False
-    
+
     def clear(self):
         """Clear cache"""
         with self.lock:
+            self._loaded = True
             self.cache.clear()
-            self.hits = 0
-            self.misses = 0
-            return True
-    
+            self.total_bytes = 0
+            self._reset_counters()
+        self.save_cache()
+        return True
+
+    def reset_stats(self):
+        """Zero all counters without touching cached entries"""
+        with self.lock:
+            self._reset_counters()
+
+    def close(self):
+        """Flush and release the log file handle"""
+        with self.lock:
+            self._close_log()
+
     def get_stats(self):
-        """Get cache statistics"""
-        total = self.hits + self.misses
-        hit_rate = (self.hits / total * 100) if total > 0 else 0
-        return {
-            'size': len(self.cache),
-            'hits': self.hits,
-            'misses': self.misses,
-            'hit_rate': f"{hit_rate:.1f}%"
-        }
-    
+        """Get cache statistics as a machine-readable dict
+
+        Rates are percentages, latency is the mean get() time in
+        microseconds, and ``prefixes`` breaks hits/misses down by the key
+        prefix used with make_key().
+        """
+        self._ensure_loaded()
+        return _build_stats(
+            size=len(self.cache),
+            hits=self.hits,
+            misses=self.misses,
+            inserts=self.inserts,
+            evictions=self.evictions,
+            lookup_time=self.lookup_time,
+            prefix_counts={p: tuple(c) for p, c in list(self.prefix_stats.items())},
+            resident_bytes=self.total_bytes,
+            max_size=self.max_size,
+            max_bytes=self.max_bytes,
+            since=self.stats_since
+        )
+
+    def purge_expired(self):
+        """Drop all expired entries, returning how many were removed"""
+        self._ensure_loaded()
+        now = time.time()
+        with self.lock:
+            expired = [key for key, entry in self.cache.items() if entry.is_expired(now)]
+            for key in expired:
+                self._remove(key)
+                self._append({'k': key, 'd': 1})
+            return len(expired)
+
     def __contains__(self, key):
-        return key in self.cache
-    
+        self._ensure_loaded()
+        entry = self.cache.get(key)
+        return entry is not None and not entry.is_expired(time.time())
+
     def __len__(self):
-        return len(self.cache)
\ No newline at end of file
+        self._ensure_loaded()
+        return len(self.cache)
+
+class ShardedFileCache:
+    """FileCache striped across independent LRU segments.
+
+    Keys are spread over ``shards`` FileCache instances by a stable CRC32,
+    each with its own lock and log file (``<cache_file>.<n>``), so worker
+    threads touching different keys rarely contend. Fresh hits take no
+    lock at all. Limits are split evenly between shards and statistics are
+    aggregated across them.
+    """
+
+    def __init__(self, shards=CACHE_SHARDS, max_size=MAX_CACHE_SIZE, cache_file=None,
+                 default_ttl=CACHE_DEFAULT_TTL, max_bytes=None, low_water=CACHE_LOW_WATER):
+        self.shard_count = max(1, int(shards))
+        base_file = cache_file or CACHE_FILE
+        shard_size = max(1, -(-max_size // self.shard_count))
+        shard_bytes = -(-max_bytes // self.shard_count) if max_bytes is not None else None
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.shards = [
+            FileCache(
+                max_size=shard_size,
+                cache_file=f"{base_file}.{i}",
+                default_ttl=default_ttl,
+                max_bytes=shard_bytes,
+                low_water=low_water,
+                lock_free_reads=True
+            )
+            for i in range(self.shard_count)
+        ]
+
+    def _shard(self, key):
+        # crc32 rather than hash() so persisted keys land in the same shard
+        # after a restart
+        return self.shards[zlib.crc32(str(key).encode('utf-8', 'surrogateescape')) % self.shard_count]
+
+    def get(self, key, default=None, signature=None):
+        """Get value from cache"""
+        return self._shard(key).get(key, default, signature=signature)
+
+    def get_validated(self, key, path, default=None):
+        """Get value only if the file at ``path`` is unchanged since set()"""
+        return self._shard(key).get_validated(key, path, default)
+
+    def set(self, key, value, ttl=None, signature=None):
+        """Set value in cache"""
+        return self._shard(key).set(key, value, ttl=ttl, signature=signature)
+
+    def delete(self, key):
+        """Delete key from cache"""
+        return self._shard(key).delete(key)
+
+    def clear(self):
+        """Clear all shards"""
+        for shard in self.shards:
+            shard.clear()
+        return True
+
+    def save_cache(self):
+        """Compact every shard's log"""
+        return all([shard.save_cache() for shard in self.shards])
+
+    def purge_expired(self):
+        """Drop expired entries from every shard"""
+        return sum(shard.purge_expired() for shard in self.shards)
+
+    def reset_stats(self):
+        for shard in self.shards:
+            shard.reset_stats()
+
+    def close(self):
+        """Release all shard log handles"""
+        for shard in self.shards:
+            shard.close()
+
+    def get_stats(self):
+        """Get cache statistics aggregated across shards"""
+        prefix_counts = {}
+        for shard in self.shards:
+            shard._ensure_loaded()
+            for prefix, (h, m) in list(shard.prefix_stats.items()):
+                total_h, total_m = prefix_counts.get(prefix, (0, 0))
+                prefix_counts[prefix] = (total_h + h, total_m + m)
+        stats = _build_stats(
+            size=sum(len(shard.cache) for shard in self.shards),
+            hits=sum(shard.hits for shard in self.shards),
+            misses=sum(shard.misses for shard in self.shards),
+            inserts=sum(shard.inserts for shard in self.shards),
+            evictions=sum(shard.evictions for shard in self.shards),
+            lookup_time=sum(shard.lookup_time for shard in self.shards),
+            prefix_counts=prefix_counts,
+            resident_bytes=sum(shard.total_bytes for shard in self.shards),
+            max_size=self.max_size,
+            max_bytes=self.max_bytes,
+            since=min(shard.stats_since for shard in self.shards)
+        )
+        stats['shards'] = self.shard_count
+        return stats
+
+    def __contains__(self, key):
+        return key in self._shard(key)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+class CacheStatsExporter:
+    """Periodically dump a cache's get_stats() to a JSON file.
+
+    The file is replaced atomically, so external tools can poll it while
+    sizing the cache on a given receiver.
+    """
+
+    def __init__(self, cache, stats_file=CACHE_STATS_FILE, interval=CACHE_STATS_INTERVAL):
+        self.cache = cache
+        self.stats_file = stats_file
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop exporting, writing one final snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.export()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def export(self):
+        """Write the current statistics now"""
+        tmp_path = None
+        try:
+            stats = self.cache.get_stats()
+            stats['timestamp'] = time.time()
+            stats_dir = os.path.dirname(self.stats_file) or '.'
+            fd, tmp_path = tempfile.mkstemp(prefix='.pilotfs_stats.', dir=stats_dir)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, self.stats_file)
+            return True
+        except Exception as e:
+            logger.debug(f"Cache stats export failed: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return False
@@ -59,6 +59,8 @@ class PilotFSConfig:
             p.trash_enabled = ConfigSelection(default="yes", choices=[("yes", "Yes"), ("no", "No")])
         if not hasattr(p, 'cache_enabled'):
             p.cache_enabled = ConfigYesNo(default=True)
+        if not hasattr(p, 'verify_copies'):
+            p.verify_copies = ConfigYesNo(default=False)
         if not hasattr(p, 'preview_size'):
             p.preview_size = ConfigSelection(default="1024", choices=[("512", "512KB"), ("1024", "1MB"), ("2048", "2MB")])
             
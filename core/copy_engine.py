@@ -0,0 +1,596 @@
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import os
+import shutil
+import stat
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from ..constants import (COPY_BUFFER_SIZE, COPY_CHUNK_SIZE, TREE_COPY_WORKERS,
+                         TREE_COPY_QUEUE, TREE_COPY_SMALL_FILE, TRANSFER_CHECKPOINT_BYTES)
+from ..exceptions import FileOperationError, OperationCancelledError, VerificationError
+from ..utils.logging_config import get_logger
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = get_logger(__name__)
+
+# Errors meaning "this copy method is not supported here", not "the copy failed"
+_UNSUPPORTED_ERRNOS = frozenset(
+    getattr(errno, name) for name in
+    ('EINVAL', 'ENOSYS', 'EXDEV', 'EOPNOTSUPP', 'ENOTSUP', 'EBADF', 'ENOTSOCK')
+    if hasattr(errno, name)
+)
+
+FALLOC_FL_KEEP_SIZE = 0x01
+
+def _load_fallocate():
+    """libc fallocate(), which unlike posix_fallocate() never falls back to writing zeros"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        func = getattr(libc, 'fallocate64', None) or libc.fallocate
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    func.restype = ctypes.c_int
+    return func
+
+_fallocate = _load_fallocate()
+
+def _fadvise(fd, offset, length, advice):
+    """posix_fadvise(fd, ..., os.<advice>) as a pure hint; errors are ignored"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError:
+            pass
+
+VerifyResult = namedtuple('VerifyResult', ['source', 'destination', 'size', 'algorithm', 'digest', 'ok'])
+
+def new_hasher():
+    """Fast non-cryptographic-grade checksum: xxh64 when installed, md5 otherwise"""
+    if xxhash is not None:
+        return xxhash.xxh64()
+    return hashlib.md5()
+
+class TransferReport:
+    """Verification results of the files written by one transfer"""
+
+    def __init__(self):
+        self.results = []
+        self.special = []
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        with self._lock:
+            self.results.append(result)
+
+    def add_special(self, source, action):
+        """Note a FIFO, socket or device node that was recreated or skipped"""
+        with self._lock:
+            self.special.append((source, action))
+
+    @property
+    def verified(self):
+        return [r for r in self.results if r.ok]
+
+    @property
+    def mismatched(self):
+        return [r for r in self.results if not r.ok]
+
+    def summary(self):
+        lines = []
+        if self.results:
+            algorithm = self.results[0].algorithm
+            lines.append(f"Verified {len(self.verified)} of {len(self.results)} files ({algorithm})")
+            bad = self.mismatched
+            if bad:
+                names = ", ".join(os.path.basename(r.destination) for r in bad[:3])
+                more = f" and {len(bad) - 3} more" if len(bad) > 3 else ""
+                lines.append(f"Checksum mismatch: {names}{more}")
+        skipped = [source for source, action in self.special if action == 'skipped']
+        recreated = len(self.special) - len(skipped)
+        if recreated:
+            lines.append(f"Recreated {recreated} special files (pipes, devices)")
+        if skipped:
+            names = ", ".join(os.path.basename(source) for source in skipped[:3])
+            more = f" and {len(skipped) - 3} more" if len(skipped) > 3 else ""
+            lines.append(f"Skipped special files: {names}{more}")
+        return "\n".join(lines)
+
+class CopyEngine:
+    """Chunked single-file copy with progress, cancellation and resume.
+
+    Tries the kernel-side copy_file_range() and sendfile() first and falls
+    back to plain reads and writes with a large reusable buffer. Progress is
+    reported as progress_callback(copied_bytes, total_bytes) after every
+    chunk. A cancelled copy leaves the partial destination in place so it
+    can be continued later with resume=True.
+
+    With verify=True the data is read into userspace instead, hashed as it
+    is written, and the destination is read back once from the disk (not
+    the page cache) and compared, so a bad stick is caught at copy time.
+
+    Dense files are preallocated up front so a recording lands in few
+    extents even on FAT/exFAT sticks; sparse files are copied extent by
+    extent (SEEK_DATA/SEEK_HOLE) so their holes stay holes. Both sides are
+    read sequentially and their pages dropped behind the copy, so a large
+    copy does not push live TV's buffers out of the page cache.
+    """
+
+    def __init__(self, buffer_size=COPY_BUFFER_SIZE, chunk_size=COPY_CHUNK_SIZE, zero_copy=True,
+                 checkpoint_bytes=TRANSFER_CHECKPOINT_BYTES):
+        self.buffer_size = buffer_size
+        self.chunk_size = chunk_size
+        self.zero_copy = zero_copy
+        self.checkpoint_bytes = checkpoint_bytes
+
+    def copy_file(self, source, destination, progress_callback=None, cancel_event=None, resume=False,
+                  preserve_metadata=True, verify=False, report=None, checkpoint=None, resume_point=None):
+        """Copy source to destination, return the number of bytes written
+
+        With verify=True a VerifyResult is added to report (a TransferReport)
+        and VerificationError is raised if the destination does not match.
+
+        checkpoint(destination, offset, digest) is called whenever the first
+        offset bytes are safely on disk (every checkpoint_bytes and at the
+        end); digest is the source prefix checksum when verifying. Passing
+        such a point back as resume_point=(offset, digest) with resume=True
+        continues from there, ignoring anything written after it, and starts
+        over if the source prefix no longer matches the digest.
+        """
+        st = os.stat(source)
+        if not stat.S_ISREG(st.st_mode):
+            # open() would block on a FIFO where cancel_event cannot reach it
+            raise FileOperationError(f"{source} is not a regular file")
+        total = st.st_size
+        offset = 0
+        if resume:
+            try:
+                existing = os.stat(destination).st_size
+                if existing <= total:
+                    offset = existing
+            except OSError:
+                pass
+            if resume_point is not None:
+                offset = min(offset, resume_point[0])
+
+        flags = os.O_WRONLY | os.O_CREAT
+        if not offset:
+            flags |= os.O_TRUNC
+
+        hasher = new_hasher() if verify else None
+        with open(source, 'rb') as fsrc:
+            src_fd = fsrc.fileno()
+            dst_fd = os.open(destination, flags, 0o644)
+            try:
+                _fadvise(src_fd, 0, 0, 'POSIX_FADV_SEQUENTIAL')
+                if hasher is not None and offset:
+                    # Resumed part was written earlier; only its source side is hashed again
+                    self._hash_fd(src_fd, hasher, offset, cancel_event)
+                    digest = resume_point[1] if resume_point is not None else None
+                    if digest and hasher.copy().hexdigest() != digest:
+                        logger.warning(f"{source} changed since the interrupted copy, starting over")
+                        offset = 0
+                        hasher = new_hasher()
+                if offset:
+                    logger.info(f"Resuming copy of {source} at {offset} bytes")
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                os.ftruncate(dst_fd, offset)
+
+                sparse = self._is_sparse(src_fd)
+                if not sparse:
+                    self._preallocate(dst_fd, offset, total - offset)
+                if checkpoint is not None:
+                    progress_callback = self._checkpointing(progress_callback, checkpoint, destination,
+                                                            dst_fd, offset, hasher)
+                progress_callback = self._dropping_cache(progress_callback, src_fd, dst_fd, offset)
+                copied = self._copy_fd(src_fd, dst_fd, offset, total, progress_callback, cancel_event,
+                                       hasher, sparse)
+                if hasher is not None or checkpoint is not None:
+                    os.fsync(dst_fd)
+                _fadvise(src_fd, 0, 0, 'POSIX_FADV_DONTNEED')
+            finally:
+                os.close(dst_fd)
+
+        if copied != total:
+            raise FileOperationError(f"Short copy of {source}: {copied} of {total} bytes")
+
+        if checkpoint is not None:
+            checkpoint(destination, copied, hasher.copy().hexdigest() if hasher is not None else None)
+
+        if hasher is not None:
+            try:
+                self._verify(source, destination, copied, hasher, cancel_event, report)
+            except VerificationError:
+                if checkpoint is not None:
+                    # Nothing of this file can be trusted any more
+                    checkpoint(destination, 0, None)
+                raise
+
+        if preserve_metadata:
+            shutil.copystat(source, destination)
+        return copied
+
+    def _checkpointing(self, progress_callback, checkpoint, destination, dst_fd, offset, hasher):
+        """Wrap progress_callback to flush and report a checkpoint every checkpoint_bytes"""
+        last = [offset]
+
+        def progress(copied, total):
+            if progress_callback:
+                progress_callback(copied, total)
+            if copied - last[0] >= self.checkpoint_bytes:
+                os.fdatasync(dst_fd)
+                last[0] = copied
+                checkpoint(destination, copied, hasher.copy().hexdigest() if hasher is not None else None)
+
+        return progress
+
+    def copy_tree(self, source, destination, progress_callback=None, cancel_event=None,
+                  workers=TREE_COPY_WORKERS, queue_limit=TREE_COPY_QUEUE, small_file=TREE_COPY_SMALL_FILE,
+                  verify=False, report=None, resume=False, checkpoint=None, resume_points=None, total=None):
+        """Copy a directory tree, return the number of bytes written.
+
+        The tree is walked once with scandir() and every directory is
+        created as soon as it is seen. Files up to small_file bytes are
+        copied on a thread pool, with at most queue_limit waiting, so
+        sidecar files (.ap, .cuts, .sc, .meta) are not copied one by one.
+        Larger files are copied one at a time. Modes and timestamps are
+        applied in one pass at the end, directories last and bottom-up,
+        so writing files into a directory cannot reset its mtime.
+        verify and report are passed on to copy_file() for every file.
+        Only regular files are copied: FIFOs and device nodes are created
+        anew, sockets are skipped, and either is noted in report.
+
+        With resume=True an interrupted copy into an existing destination is
+        continued: complete files are kept, the files named in
+        resume_points ({destination: (offset, digest)}) continue from their
+        checkpoint and any other partial file is copied again. checkpoint
+        is passed on for the large files, which are copied one at a time.
+        total, when the caller already knows the tree's size, saves the
+        walk that measures it for progress_callback.
+        """
+        lock = threading.Lock()
+        state = {'done': 0, 'total': 0, 'error': None}
+        stop = threading.Event()
+        slots = threading.BoundedSemaphore(queue_limit)
+        file_meta = []
+        dir_meta = []
+        large = []
+
+        def add_progress(delta):
+            with lock:
+                state['done'] += delta
+                done, total = state['done'], state['total']
+            if progress_callback:
+                progress_callback(done, total)
+
+        def cancelled():
+            return stop.is_set() or (cancel_event is not None and cancel_event.is_set())
+
+        def resume_point(dst, st):
+            if not resume:
+                return None
+            point = (resume_points or {}).get(dst)
+            if point is not None:
+                return point
+            try:
+                if os.stat(dst).st_size == st.st_size:
+                    return (st.st_size, None)
+            except OSError:
+                pass
+            return (0, None)
+
+        def copy_small(src, dst, st):
+            try:
+                if not cancelled():
+                    add_progress(self.copy_file(src, dst, preserve_metadata=False,
+                                                verify=verify, report=report, resume=resume,
+                                                resume_point=resume_point(dst, st)))
+                    with lock:
+                        file_meta.append((dst, st))
+            except BaseException as e:
+                with lock:
+                    if state['error'] is None:
+                        state['error'] = e
+                stop.set()
+            finally:
+                slots.release()
+
+        if progress_callback:
+            state['total'] = total if total is not None else self._tree_size(source)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            stack = [(source, destination)]
+            while stack and not cancelled():
+                src_dir, dst_dir = stack.pop()
+                os.makedirs(dst_dir, exist_ok=True)
+                dir_meta.append((dst_dir, os.stat(src_dir)))
+                with os.scandir(src_dir) as it:
+                    for entry in it:
+                        if cancelled():
+                            break
+                        dst = os.path.join(dst_dir, entry.name)
+                        if entry.is_symlink():
+                            if resume and os.path.lexists(dst):
+                                continue
+                            os.symlink(os.readlink(entry.path), dst)
+                        elif entry.is_dir():
+                            stack.append((entry.path, dst))
+                        else:
+                            st = entry.stat(follow_symlinks=False)
+                            if not stat.S_ISREG(st.st_mode):
+                                if self._copy_special(entry.path, dst, st, report, resume):
+                                    with lock:
+                                        file_meta.append((dst, st))
+                            elif st.st_size > small_file:
+                                large.append((entry.path, dst, st))
+                            else:
+                                slots.acquire()
+                                pool.submit(copy_small, entry.path, dst, st)
+
+            for src, dst, st in large:
+                if cancelled():
+                    break
+                last = [0]
+
+                def file_progress(copied, size, last=last):
+                    add_progress(copied - last[0])
+                    last[0] = copied
+
+                copied = self.copy_file(src, dst, file_progress, cancel_event, preserve_metadata=False,
+                                        verify=verify, report=report, resume=resume, checkpoint=checkpoint,
+                                        resume_point=resume_point(dst, st))
+                # A resumed file that was already complete reports no progress
+                add_progress(copied - last[0])
+                with lock:
+                    file_meta.append((dst, st))
+
+        if state['error'] is not None:
+            raise state['error']
+        if cancel_event is not None and cancel_event.is_set():
+            raise OperationCancelledError("Copy cancelled")
+
+        for dst, st in file_meta:
+            self._apply_metadata(dst, st)
+        for dst, st in reversed(dir_meta):
+            self._apply_metadata(dst, st)
+        return state['done']
+
+    def _copy_special(self, source, destination, st, report, resume=False):
+        """Recreate a FIFO or device node, return True if destination exists now"""
+        if resume and os.path.lexists(destination):
+            return True
+        try:
+            if stat.S_ISFIFO(st.st_mode):
+                os.mkfifo(destination, stat.S_IMODE(st.st_mode))
+            elif stat.S_ISCHR(st.st_mode) or stat.S_ISBLK(st.st_mode):
+                os.mknod(destination, st.st_mode, st.st_rdev)
+            else:
+                raise OSError(errno.EOPNOTSUPP, "Cannot copy a socket", source)
+        except OSError as e:
+            logger.warning(f"Skipping special file {source}: {e}")
+            if report is not None:
+                report.add_special(source, 'skipped')
+            return False
+        if report is not None:
+            report.add_special(source, 'recreated')
+        return True
+
+    def _tree_size(self, path):
+        total = 0
+        stack = [path]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                pass
+        return total
+
+    def _apply_metadata(self, path, st):
+        try:
+            os.chmod(path, stat.S_IMODE(st.st_mode))
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        except OSError as e:
+            # FAT and some network mounts reject chmod; the data is what matters
+            logger.debug(f"Cannot apply metadata to {path}: {e}")
+
+    def _is_sparse(self, fd):
+        """True if fd has fewer blocks allocated than its size needs"""
+        if not hasattr(os, 'SEEK_DATA'):
+            return False
+        st = os.fstat(fd)
+        return getattr(st, 'st_blocks', 0) * 512 < st.st_size
+
+    def _preallocate(self, fd, offset, length):
+        """Reserve blocks for the rest of the file without changing its size
+
+        FALLOC_FL_KEEP_SIZE keeps the file length equal to the bytes really
+        written, so a cancelled copy can still be resumed by its size.
+        """
+        if _fallocate is None or length <= 0:
+            return
+        if _fallocate(fd, FALLOC_FL_KEEP_SIZE, offset, length) != 0:
+            err = ctypes.get_errno()
+            logger.debug(f"fallocate not used: {os.strerror(err)}")
+
+    def _dropping_cache(self, progress_callback, src_fd, dst_fd, offset):
+        """Wrap progress_callback to evict copied pages every chunk_size bytes
+
+        Source pages are clean and go at once. DONTNEED on the destination
+        starts writeback and drops whatever is already clean, so its range
+        is advised once more a step later, when the writes have landed.
+        """
+        if not hasattr(os, 'posix_fadvise'):
+            return progress_callback
+        marks = [offset, offset]  # end of the last dropped range, one step before that
+
+        def progress(copied, total):
+            if progress_callback:
+                progress_callback(copied, total)
+            if copied - marks[0] >= self.chunk_size:
+                _fadvise(src_fd, marks[0], copied - marks[0], 'POSIX_FADV_DONTNEED')
+                _fadvise(dst_fd, marks[1], copied - marks[1], 'POSIX_FADV_DONTNEED')
+                marks[1] = marks[0]
+                marks[0] = copied
+
+        return progress
+
+    def _copy_fd(self, src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher=None, sparse=False):
+        if progress_callback:
+            progress_callback(offset, total)
+        if sparse:
+            return self._copy_sparse(src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher)
+        return self._copy_range(src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher)
+
+    def _copy_sparse(self, src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher):
+        """Copy only the data extents of src_fd; holes are skipped, not written"""
+        while offset < total:
+            try:
+                data = os.lseek(src_fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    data = total  # only a hole is left
+                elif e.errno in _UNSUPPORTED_ERRNOS:
+                    return self._copy_range(src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher)
+                else:
+                    raise
+            data = min(data, total)
+            if data > offset:
+                if hasher is not None:
+                    self._hash_zeros(hasher, data - offset)
+                offset = data
+                if progress_callback:
+                    progress_callback(offset, total)
+                if offset >= total:
+                    break
+
+            hole = min(os.lseek(src_fd, data, os.SEEK_HOLE), total)
+            os.lseek(dst_fd, data, os.SEEK_SET)
+            offset = self._copy_range(src_fd, dst_fd, data, hole,
+                                      (lambda c, _end: progress_callback(c, total)) if progress_callback else None,
+                                      cancel_event, hasher)
+            if offset < hole:
+                return offset  # source shrank under us
+
+        # A trailing hole has no data to write; give the file its length
+        os.ftruncate(dst_fd, total)
+        return total
+
+    def _hash_zeros(self, hasher, length):
+        zeros = bytes(min(self.buffer_size, length))
+        while length > 0:
+            n = min(len(zeros), length)
+            hasher.update(zeros[:n])
+            length -= n
+
+    def _copy_range(self, src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher=None):
+        """Copy bytes offset..total; only the buffered loop can feed a hasher"""
+        if self.zero_copy and hasher is None and offset < total:
+            for method in (self._copy_file_range, self._sendfile):
+                try:
+                    offset = method(src_fd, dst_fd, offset, total, progress_callback, cancel_event)
+                    if offset >= total:
+                        return offset
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_ERRNOS:
+                        raise
+                    logger.debug(f"{method.__name__} unavailable ({e}), trying next method")
+                # Partial progress is kept; the next method carries on from offset
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+
+        return self._copy_buffered(src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher)
+
+    def _check_cancel(self, cancel_event):
+        if cancel_event is not None and cancel_event.is_set():
+            raise OperationCancelledError("Copy cancelled")
+
+    def _copy_file_range(self, src_fd, dst_fd, offset, total, progress_callback, cancel_event):
+        if not hasattr(os, 'copy_file_range'):
+            raise OSError(errno.ENOSYS, "copy_file_range not available")
+        while offset < total:
+            self._check_cancel(cancel_event)
+            count = min(self.chunk_size, total - offset)
+            sent = os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+            if sent == 0:
+                break
+            offset += sent
+            if progress_callback:
+                progress_callback(offset, total)
+        return offset
+
+    def _sendfile(self, src_fd, dst_fd, offset, total, progress_callback, cancel_event):
+        if not hasattr(os, 'sendfile'):
+            raise OSError(errno.ENOSYS, "sendfile not available")
+        while offset < total:
+            self._check_cancel(cancel_event)
+            count = min(self.chunk_size, total - offset)
+            sent = os.sendfile(dst_fd, src_fd, offset, count)
+            if sent == 0:
+                break
+            offset += sent
+            if progress_callback:
+                progress_callback(offset, total)
+        return offset
+
+    def _copy_buffered(self, src_fd, dst_fd, offset, total, progress_callback, cancel_event, hasher=None):
+        os.lseek(src_fd, offset, os.SEEK_SET)
+        buf = bytearray(self.buffer_size)
+        view = memoryview(buf)
+        while offset < total:
+            self._check_cancel(cancel_event)
+            n = os.readv(src_fd, [view[:min(self.buffer_size, total - offset)]])
+            if n == 0:
+                break
+            if hasher is not None:
+                hasher.update(view[:n])
+            written = 0
+            while written < n:
+                written += os.write(dst_fd, view[written:n])
+            offset += n
+            if progress_callback:
+                progress_callback(offset, total)
+        return offset
+
+    def _hash_fd(self, fd, hasher, length, cancel_event):
+        """Feed the first length bytes of fd to hasher"""
+        os.lseek(fd, 0, os.SEEK_SET)
+        buf = bytearray(self.buffer_size)
+        view = memoryview(buf)
+        remaining = length
+        while remaining > 0:
+            self._check_cancel(cancel_event)
+            n = os.readv(fd, [view[:min(self.buffer_size, remaining)]])
+            if n == 0:
+                break
+            hasher.update(view[:n])
+            remaining -= n
+        return length - remaining
+
+    def _verify(self, source, destination, size, source_hasher, cancel_event, report):
+        """Read destination back once and compare it with the source digest"""
+        dest_hasher = new_hasher()
+        fd = os.open(destination, os.O_RDONLY)
+        try:
+            # Drop the pages just written so the check reads the medium
+            _fadvise(fd, 0, 0, 'POSIX_FADV_DONTNEED')
+            read = self._hash_fd(fd, dest_hasher, size, cancel_event)
+        finally:
+            os.close(fd)
+
+        digest = source_hasher.hexdigest()
+        ok = read == size and dest_hasher.hexdigest() == digest
+        if report is not None:
+            report.add(VerifyResult(source, destination, size, source_hasher.name, digest, ok))
+        if not ok:
+            raise VerificationError(f"Checksum mismatch: {destination} differs from {source}")
@@ -0,0 +1,118 @@
+import os
+import stat
+import time
+from ..constants import DELETE_BATCH_SIZE, DELETE_FILES_PER_SEC, DELETE_BYTES_PER_SEC, DELETE_TRUNCATE_STEP
+from ..exceptions import OperationCancelledError
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class DeletionWorker:
+    """Rate-limited recursive delete.
+
+    Unlinks in batches of batch_size and sleeps between batches so that
+    neither files_per_sec nor bytes_per_sec is exceeded, which keeps the
+    disk free for a recording running at the same time. Large files are
+    shrunk with ftruncate() in steps before the unlink, so freeing a 20 GB
+    recording does not stall the filesystem in one long journal commit.
+    Progress is reported as progress_callback(done_items, total_items).
+    Meant to run on a worker thread, never the Enigma2 main loop.
+    """
+
+    def __init__(self, files_per_sec=DELETE_FILES_PER_SEC, bytes_per_sec=DELETE_BYTES_PER_SEC,
+                 batch_size=DELETE_BATCH_SIZE, truncate_step=DELETE_TRUNCATE_STEP):
+        self.files_per_sec = files_per_sec
+        self.bytes_per_sec = bytes_per_sec
+        self.batch_size = batch_size
+        self.truncate_step = truncate_step
+
+    def _collect(self, path, items):
+        """Append (path, size, is_dir) in post-order: children before parents"""
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode):
+            items.append((path, st.st_size, False))
+            return
+        # Iterative post-order walk: (dir, visited) pairs
+        stack = [(path, False)]
+        while stack:
+            current, visited = stack.pop()
+            if visited:
+                items.append((current, 0, True))
+                continue
+            stack.append((current, True))
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, False))
+                            else:
+                                items.append((entry.path, entry.stat(follow_symlinks=False).st_size, False))
+                        except OSError:
+                            items.append((entry.path, 0, False))
+            except OSError as e:
+                logger.debug(f"Cannot scan {current}: {e}")
+
+    def delete(self, paths, progress_callback=None, cancel_event=None):
+        """Delete files and directory trees, return the number of items removed"""
+        items = []
+        for path in paths:
+            self._collect(path, items)
+        total = len(items)
+
+        done = 0
+        batch_start = time.monotonic()
+        batch_files = 0
+        batch_bytes = 0
+        for path, size, is_dir in items:
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelledError("Delete cancelled")
+            if is_dir:
+                os.rmdir(path)
+            else:
+                if size > self.truncate_step:
+                    self._shrink(path, size, cancel_event)
+                os.unlink(path)
+            done += 1
+            batch_files += 1
+            batch_bytes += size
+
+            if batch_files >= self.batch_size or batch_bytes >= self.bytes_per_sec:
+                if progress_callback:
+                    progress_callback(done, total)
+                self._throttle(batch_start, batch_files, batch_bytes)
+                batch_start = time.monotonic()
+                batch_files = 0
+                batch_bytes = 0
+
+        if progress_callback:
+            progress_callback(done, total)
+        return done
+
+    def _throttle(self, started, files, nbytes):
+        """Sleep long enough to respect both rate caps; always yield"""
+        needed = 0.0
+        if self.files_per_sec:
+            needed = max(needed, files / self.files_per_sec)
+        if self.bytes_per_sec:
+            needed = max(needed, nbytes / self.bytes_per_sec)
+        time.sleep(max(0.0, needed - (time.monotonic() - started)))
+
+    def _shrink(self, path, size, cancel_event):
+        """Release a large file's blocks gradually before unlinking it"""
+        try:
+            fd = os.open(path, os.O_WRONLY)
+        except OSError:
+            return  # read-only or special file: plain unlink
+        try:
+            if os.fstat(fd).st_nlink > 1:
+                return  # other hard links still need the data
+            while size > self.truncate_step:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OperationCancelledError("Delete cancelled")
+                started = time.monotonic()
+                size -= self.truncate_step
+                os.ftruncate(fd, size)
+                self._throttle(started, 0, self.truncate_step)
+        finally:
+            os.close(fd)
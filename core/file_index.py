@@ -0,0 +1,354 @@
+import os
+import stat
+import threading
+import time
+from ..constants import FILE_INDEX_FILE, FILE_INDEX_REFRESH_INTERVAL, TRASH_DIR_NAME
+from ..utils.logging_config import get_logger
+from .matcher import compile_pattern
+from .mounts import mount_table, NETWORK_FS_TYPES
+from .stat_engine import FileInfo
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+logger = get_logger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY, built REAL)",
+    "CREATE TABLE IF NOT EXISTS dirs (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime_ns INTEGER)",
+    "CREATE TABLE IF NOT EXISTS names (dir INTEGER, name TEXT, lname TEXT, is_dir INTEGER,"
+    " size INTEGER, mtime REAL, mode INTEGER)",
+    "CREATE INDEX IF NOT EXISTS names_dir ON names(dir)",
+)
+
+def _subtree_range(directory):
+    """(prefix, upper) so that prefix <= path < upper selects everything below directory"""
+    prefix = directory.rstrip('/') + '/'
+    return prefix, prefix[:-1] + chr(ord('/') + 1)
+
+class FileIndex:
+    """Locate-style database of file names on the local storage mounts.
+
+    Every directory is stored with its mtime and the names, types, sizes
+    and mtimes of its entries. refresh() walks a root and rescans only
+    directories whose mtime changed, so keeping the index current costs
+    one stat() per directory; it runs on a background thread for roots
+    last built more than refresh_interval seconds ago (the build time is
+    kept in the database, so opening the plugin does not walk a fresh
+    index again). search() answers from the database without touching the
+    disk, so a query does not spin up a sleeping drive.
+
+    Needs the sqlite3 module; without it (or for paths outside the indexed
+    mounts, such as network shares) search() returns None and callers walk
+    the directory themselves, as they do when the database fails (locked,
+    corrupt, disk full). Results can be as old as the last refresh.
+    """
+
+    COMMIT_EVERY = 200  # rescanned directories per transaction
+
+    def __init__(self, db_file=FILE_INDEX_FILE, roots=None, refresh_interval=FILE_INDEX_REFRESH_INTERVAL):
+        self.db_file = db_file
+        self._roots = roots
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_refresh = None
+        self._changed = set()
+        if sqlite3 is None:
+            logger.info("sqlite3 not available, file search walks the disk")
+            return
+        try:
+            self._conn = sqlite3.connect(db_file, check_same_thread=False)
+            # The index can always be rebuilt; do not fsync for every batch
+            self._conn.execute("PRAGMA synchronous = OFF")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"Cannot open file index {db_file}: {e}")
+            self._conn = None
+
+    @property
+    def available(self):
+        return self._conn is not None
+
+    def roots(self):
+        """Directories that are indexed: local storage mounts below /media"""
+        if self._roots is not None:
+            return list(self._roots)
+        roots = [m.mount_point for m in mount_table.storage_mounts()
+                 if m.mount_point.startswith('/media/') and m.fstype not in NETWORK_FS_TYPES]
+        if os.path.isdir('/media/hdd') and not any(r == '/media/hdd' for r in roots):
+            roots.append('/media/hdd')
+        return roots
+
+    def _root_for(self, directory):
+        """Indexed root that fully covers directory, or None"""
+        directory = os.path.normpath(directory)
+        best = None
+        for root in self.roots():
+            if directory == root or directory.startswith(root.rstrip('/') + '/'):
+                if best is None or len(root) > len(best):
+                    best = root
+        if best is None:
+            return None
+        # A filesystem mounted inside the root is not part of its index
+        mount = mount_table.find_mount(directory)
+        root_mount = mount_table.find_mount(best)
+        if mount is not None and root_mount is not None and mount.mount_point != root_mount.mount_point:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT built FROM roots WHERE path = ?", (best,)).fetchone()
+        return best if row is not None and row[0] else None
+
+    def covers(self, directory):
+        return self.available and self._root_for(directory) is not None
+
+    def search(self, directory, pattern, max_results=100):
+        """FileInfo records below directory whose name matches pattern
+
+        pattern is a search pattern or NameMatcher (see core.matcher).
+        Wildcard parts become GLOB terms evaluated inside SQLite; "re:"
+        parts go through the matcher as an SQL function. Returns None
+        when directory is not covered by a built index or the database
+        cannot be read.
+        """
+        try:
+            return self._search(directory, pattern, max_results)
+        except sqlite3.Error as e:
+            logger.warning(f"File index unusable, searching the disk: {e}")
+            return None
+
+    def _search(self, directory, pattern, max_results):
+        self._apply_changes()
+        if not self.covers(directory):
+            return None
+        matcher = compile_pattern(pattern)
+        globs = matcher.globs()
+        directory = os.path.normpath(directory)
+        prefix, upper = _subtree_range(directory)
+        if globs is None:
+            condition, args = "pilotfs_match(n.name)", []
+        elif globs:
+            condition, args = "(" + " OR ".join(["n.lname GLOB ?"] * len(globs)) + ")", globs
+        else:
+            return []
+        with self._lock:
+            if globs is None:
+                self._conn.create_function("pilotfs_match", 1, matcher.match)
+            rows = self._conn.execute(
+                "SELECT d.path, n.name, n.size, n.mtime, n.mode FROM names n JOIN dirs d ON d.id = n.dir"
+                " WHERE " + condition + " AND (d.path = ? OR (d.path >= ? AND d.path < ?)) LIMIT ?",
+                args + [directory, prefix, upper, max_results]
+            ).fetchall()
+        results = []
+        for parent, name, size, mtime, mode in rows:
+            st = os.stat_result((mode, 0, 0, 1, 0, 0, size, mtime, mtime, mtime))
+            results.append(FileInfo(os.path.join(parent, name), st, name=name))
+        return results
+
+    def invalidate(self, path):
+        """Note that PilotFS created, changed or removed path
+
+        Costs nothing here; the next search() rescans the parent folder and
+        re-indexes (or drops) the subtree at path before it queries.
+        """
+        if self.available:
+            with self._lock:
+                self._changed.add(os.path.normpath(path))
+
+    def _apply_changes(self):
+        with self._lock:
+            if not self._changed:
+                return
+            changed, self._changed = self._changed, set()
+        for path in sorted(changed):
+            if TRASH_DIR_NAME in path.split('/'):
+                continue
+            parent = os.path.dirname(path)
+            if self._root_for(parent) is None:
+                continue
+            with self._lock:
+                row = self._conn.execute("SELECT id FROM dirs WHERE path = ?", (parent,)).fetchone()
+            try:
+                if row is not None:
+                    self._rescan(parent, os.lstat(parent).st_mtime_ns, row[0])
+                st = os.lstat(path)
+            except OSError:
+                self._drop(path)
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                self._sync(path)
+        with self._lock:
+            self._conn.commit()
+
+    def _drop(self, top):
+        """Remove top and everything below it from the index"""
+        prefix, upper = _subtree_range(top)
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (top, prefix, upper))]
+            for dir_id in ids:
+                self._conn.execute("DELETE FROM names WHERE dir = ?", (dir_id,))
+                self._conn.execute("DELETE FROM dirs WHERE id = ?", (dir_id,))
+
+    def refresh_async(self, force=False):
+        """Revalidate stale roots on a background thread (all of them with force)"""
+        if not self.available:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            if not force and self._last_refresh is not None and \
+                    time.monotonic() - self._last_refresh < self.refresh_interval:
+                return
+        try:
+            roots = self.roots() if force else self._due_roots()
+        except sqlite3.Error as e:
+            logger.warning(f"Cannot read file index: {e}")
+            return
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            if not roots or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_all, args=(roots,), daemon=True)
+            self._thread.start()
+
+    def _due_roots(self):
+        """Roots never built, or built more than refresh_interval ago"""
+        now = time.time()
+        with self._lock:
+            built = dict(self._conn.execute("SELECT path, built FROM roots").fetchall())
+        # A clock set back (no RTC before NTP) makes every build look stale
+        return [root for root in self.roots() if not 0 <= now - (built.get(root) or 0) < self.refresh_interval]
+
+    def _refresh_all(self, roots):
+        try:
+            for root in roots:
+                if self._stop.is_set():
+                    break
+                try:
+                    self.refresh(root)
+                except Exception as e:
+                    logger.error(f"Indexing {root} failed: {e}")
+        finally:
+            with self._lock:
+                self._thread = None
+
+    def refresh(self, root):
+        """Bring the index of root up to date, rescanning changed directories only"""
+        root = os.path.normpath(root)
+        started = time.monotonic()
+        result = self._sync(root)
+        if result is None:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO roots (path, built) VALUES (?, ?)", (root, time.time()))
+            self._conn.commit()
+        logger.info(f"Indexed {root}: {result[0]} folders, {result[1]} rescanned, "
+                    f"{result[2]} removed in {time.monotonic() - started:.1f}s")
+
+    def _sync(self, top):
+        """Walk top, rescan folders whose mtime changed and drop vanished ones
+
+        Returns (folders seen, rescanned, removed), or None when top cannot
+        be read or the walk was stopped.
+        """
+        prefix, upper = _subtree_range(top)
+        with self._lock:
+            known = {path: (dir_id, mtime_ns) for dir_id, path, mtime_ns in self._conn.execute(
+                "SELECT id, path, mtime_ns FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                (top, prefix, upper))}
+        try:
+            root_dev = os.stat(top).st_dev
+        except OSError:
+            return None
+
+        seen = set()
+        rescanned = 0
+        stack = [top]
+        while stack:
+            if self._stop.is_set():
+                with self._lock:
+                    self._conn.commit()
+                return None
+            path = stack.pop()
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if st.st_dev != root_dev:
+                continue  # another filesystem mounted here
+            seen.add(path)
+            record = known.get(path)
+            if record is not None and record[1] == st.st_mtime_ns:
+                with self._lock:
+                    subdirs = [row[0] for row in self._conn.execute(
+                        "SELECT name FROM names WHERE dir = ? AND is_dir = 1", (record[0],))]
+            else:
+                subdirs = self._rescan(path, st.st_mtime_ns, record[0] if record else None)
+                rescanned += 1
+                if rescanned % self.COMMIT_EVERY == 0:
+                    with self._lock:
+                        self._conn.commit()
+            stack.extend(os.path.join(path, name) for name in subdirs)
+
+        # Roots mounted inside this one are indexed (and pruned) on their own
+        nested = [r.rstrip('/') + '/' for r in self.roots() if r != top and r.startswith(prefix)]
+        gone = [dir_id for path, (dir_id, _mtime) in known.items()
+                if path not in seen and not any((path + '/').startswith(n) for n in nested)]
+        with self._lock:
+            for dir_id in gone:
+                self._conn.execute("DELETE FROM names WHERE dir = ?", (dir_id,))
+                self._conn.execute("DELETE FROM dirs WHERE id = ?", (dir_id,))
+        return len(seen), rescanned, len(gone)
+
+    def _rescan(self, path, mtime_ns, dir_id):
+        rows = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name == TRASH_DIR_NAME or entry.path == self.db_file:
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    is_dir = stat.S_ISDIR(st.st_mode)
+                    if is_dir:
+                        subdirs.append(entry.name)
+                    rows.append((entry.name, entry.name.lower(), int(is_dir),
+                                 0 if is_dir else st.st_size, st.st_mtime, st.st_mode))
+        except OSError as e:
+            logger.debug(f"Cannot index {path}: {e}")
+            return subdirs
+        with self._lock:
+            if dir_id is None:
+                # invalidate() may have indexed it since the caller looked
+                row = self._conn.execute("SELECT id FROM dirs WHERE path = ?", (path,)).fetchone()
+                dir_id = row[0] if row is not None else None
+            if dir_id is None:
+                dir_id = self._conn.execute("INSERT INTO dirs (path, mtime_ns) VALUES (?, ?)",
+                                            (path, mtime_ns)).lastrowid
+            else:
+                self._conn.execute("UPDATE dirs SET mtime_ns = ? WHERE id = ?", (mtime_ns, dir_id))
+                self._conn.execute("DELETE FROM names WHERE dir = ?", (dir_id,))
+            self._conn.executemany(
+                "INSERT INTO names (dir, name, lname, is_dir, size, mtime, mode) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(dir_id,) + row for row in rows])
+        return subdirs
+
+    def close(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(5.0)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,18 +1,39 @@
+import errno
 import os
 import shutil
 import time
 import random
 import stat
-from datetime import datetime
-from ..constants import TRASH_PATH
-from ..exceptions import FileOperationError, DiskSpaceError
-from ..utils.formatters import format_size
+from ..constants import TRASH_PATH, TRASH_DIR_NAME
+from .cache import make_key, stat_signature
+from .copy_engine import CopyEngine
+from .negative_cache import NegativeCache
+from .size_service import DirectorySizeService
+from .transfer_planner import TransferPlanner
+from .mounts import mount_table
+from .trash_index import TrashIndex
+from .unique_names import UniqueNameAllocator
+from .deletion_worker import DeletionWorker
+from .stat_engine import StatEngine
+from ..exceptions import FileOperationError, DiskSpaceError, OperationCancelledError
 from ..utils.validators import validate_path
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
 
 class FileOperations:
-    def __init__(self, config, cache=None):
+    def __init__(self, config, cache=None, file_index=None):
         self.config = config
         self.cache = cache
+        self.file_index = file_index
+        self.negative_cache = NegativeCache()
+        self.stat_engine = StatEngine(self.negative_cache)
+        self.copy_engine = CopyEngine()
+        self.size_service = DirectorySizeService(cache)
+        self.planner = TransferPlanner()
+        self._trash_indexes = {}
+        self.deletion_worker = DeletionWorker()
+        self.namer = UniqueNameAllocator()
         self.init_trash()
     
     def init_trash(self):
@@ -23,8 +44,39 @@ class FileOperations:
         except Exception as e:
             raise FileOperationError(f"Failed to initialize trash: {e}")
     
-    def copy(self, source, destination, overwrite=False):
-        """Copy file or directory"""
+    def _contents_changed(self, *paths):
+        """Tell the name allocator, size service and file index that paths changed"""
+        for path in paths:
+            self.namer.note(path)
+            self.size_service.invalidate(path)
+            if self.file_index is not None:
+                self.file_index.invalidate(path)
+    
+    def stat(self, path):
+        """os.stat() that fails fast for recently missing paths and dead mounts"""
+        return self.negative_cache.stat(path)
+    
+    def stat_many(self, paths):
+        """Return {path: FileInfo} for many paths with about one syscall each"""
+        return self.stat_engine.stat_many(paths)
+    
+    def copy(self, source, destination, overwrite=False, progress_callback=None, cancel_event=None, resume=False,
+             verify=False, report=None, journal=None, planned_size=None):
+        """Copy file or directory
+        
+        progress_callback(copied_bytes, total_bytes) is called as data is
+        written; setting cancel_event (a threading.Event) aborts the copy
+        with OperationCancelledError. With resume=True a partial
+        destination file is continued instead of copied to a new name.
+        With verify=True every file is checksummed while it is copied and
+        read back once; results go to report (a TransferReport). journal
+        (a JournalEntry) records the destination and resume checkpoints;
+        an entry that already has a target continues that transfer.
+        planned_size is source's byte count from a TransferPlan whose space
+        check already passed; the copy then neither checks nor measures
+        source again.
+        """
+        dest_path = destination
         try:
             validate_path(source)
             validate_path(destination)
@@ -33,80 +85,340 @@ class FileOperations:
                 raise FileOperationError(f"Source does not exist: {source}")
             
             if os.path.isdir(source):
-                return self._copy_directory(source, destination, overwrite)
+                dest_path = self._copy_directory(source, destination, overwrite, progress_callback, cancel_event,
+                                                 verify, report, journal, planned_size)
             else:
-                return self._copy_file(source, destination, overwrite)
+                dest_path = self._copy_file(source, destination, overwrite, progress_callback, cancel_event,
+                                            resume, verify, report, journal, planned_size)
+            return dest_path
                 
+        except OperationCancelledError:
+            raise
         except Exception as e:
             raise FileOperationError(f"Copy failed: {e}")
+        finally:
+            self._contents_changed(dest_path)
     
-    def _copy_file(self, source, destination, overwrite=False):
+    def _copy_file(self, source, destination, overwrite=False, progress_callback=None, cancel_event=None, resume=False,
+                   verify=False, report=None, journal=None, planned_size=None):
         """Copy single file"""
-        dest_path = self._get_unique_path(source, destination)
-        
-        if not overwrite and os.path.exists(dest_path):
-            raise FileOperationError(f"File already exists: {dest_path}")
-        
-        # Check disk space
-        self._check_disk_space(source, os.path.dirname(dest_path))
+        resume_point = None
+        if journal is not None and journal.resuming:
+            dest_path = journal.target
+            resume = True
+            # Bytes written after the last checkpoint are not trusted
+            resume_point = journal.resume_point(dest_path) or (0, None)
+        elif resume:
+            dest_path = destination
+            if os.path.isdir(destination):
+                dest_path = os.path.join(destination, os.path.basename(source))
+        else:
+            # Check disk space before a name is claimed for the copy
+            if planned_size is None:
+                self._check_disk_space(source, destination)
+            dest_path = self._get_unique_path(source, destination)
         
-        shutil.copy2(source, dest_path)
+        try:
+            if journal is not None and not journal.resuming:
+                journal.start(dest_path)
+            self.copy_engine.copy_file(source, dest_path, progress_callback, cancel_event, resume,
+                                       verify=verify, report=report, resume_point=resume_point,
+                                       checkpoint=journal.checkpoint if journal is not None else None)
+        except BaseException as e:
+            # An explicit resume=True copy keeps its partial file for the next attempt
+            self._abandon_copy(dest_path, e, journal, keep=resume and journal is None)
+            raise
+        self.negative_cache.forget(dest_path)
         
         # Clear cache entry if exists
-        if self.cache:
-            self.cache.delete(f"file_size_{hash(source)}")
+        if self.cache is not None:
+            self.cache.delete(make_key("file_size", dest_path))
         
         return dest_path
     
-    def _copy_directory(self, source, destination, overwrite=False):
+    def _copy_directory(self, source, destination, overwrite=False, progress_callback=None, cancel_event=None,
+                        verify=False, report=None, journal=None, planned_size=None):
         """Copy directory recursively"""
-        dest_path = self._get_unique_path(source, destination)
-        
-        if os.path.exists(dest_path):
-            if overwrite:
-                shutil.rmtree(dest_path)
-            else:
-                raise FileOperationError(f"Directory already exists: {dest_path}")
-        
-        # Check disk space
-        self._check_disk_space(source, os.path.dirname(dest_path))
+        resume = journal is not None and journal.resuming
+        if resume:
+            dest_path = journal.target
+        else:
+            # Check disk space
+            if planned_size is None:
+                self._check_disk_space(source, destination)
+            
+            dest_path = self._get_unique_path(source, destination, kind='dir')
         
-        shutil.copytree(source, dest_path, symlinks=True)
+        try:
+            if journal is not None and not resume:
+                journal.start(dest_path)
+            self.copy_engine.copy_tree(source, dest_path, progress_callback, cancel_event,
+                                       verify=verify, report=report, total=planned_size,
+                                       **self._journal_args(journal))
+        except BaseException as e:
+            self._abandon_copy(dest_path, e, journal)
+            raise
+        self.negative_cache.forget(dest_path)
         return dest_path
     
-    def move(self, source, destination, use_trash=False):
-        """Move file or directory"""
+    def move(self, source, destination, use_trash=False, progress_callback=None, cancel_event=None,
+             verify=False, report=None, journal=None, planned_size=None):
+        """Move file or directory
+        
+        Within one filesystem this is a rename. Across devices the data goes
+        through the chunked copy engine (progress_callback, cancel_event,
+        verify, report, journal and planned_size as for copy()) and the source is removed
+        only after the copy has been verified.
+        """
+        dest_path = destination
         try:
             validate_path(source)
             validate_path(destination)
             
+            resume = journal is not None and journal.resuming
+            if resume and not os.path.lexists(source) and os.path.lexists(journal.target):
+                # Interrupted while removing the source: the move is complete
+                return journal.target
+            
             if not os.path.exists(source):
                 raise FileOperationError(f"Source does not exist: {source}")
             
             if use_trash and self.config.plugins.pilotfs.trash_enabled.value == "yes":
                 return self._move_to_trash(source)
             
-            dest_path = self._get_unique_path(source, destination)
+            if resume:
+                dest_path = journal.target
+            else:
+                dest_path = self._get_unique_path(source, destination, kind=self._path_kind(source))
+                if journal is not None:
+                    journal.start(dest_path)
             
-            # Check disk space if moving to different device
             try:
-                src_device = os.stat(source).st_dev
-                dest_device = os.stat(os.path.dirname(dest_path)).st_dev
-                if src_device != dest_device:
-                    self._check_disk_space(source, os.path.dirname(dest_path))
-            except:
-                pass  # If we can't check devices, proceed anyway
-            
-            shutil.move(source, dest_path)
+                self._rename_or_move(source, dest_path, progress_callback, cancel_event, verify, report, journal,
+                                     planned_size)
+            except BaseException:
+                # A failed disk-space check or copy must not leave the claimed name behind
+                self._discard_placeholder(dest_path)
+                raise
+            self.negative_cache.forget(dest_path)
             
             # Clear cache
-            if self.cache:
-                self.cache.delete(f"file_size_{hash(source)}")
+            if self.cache is not None:
+                self.cache.delete(make_key("file_size", source))
             
             return dest_path
             
+        except OperationCancelledError:
+            raise
         except Exception as e:
             raise FileOperationError(f"Move failed: {e}")
+        finally:
+            self._contents_changed(source, dest_path)
+    
+    def _rename_or_move(self, source, dest_path, progress_callback=None, cancel_event=None,
+                        verify=False, report=None, journal=None, planned_size=None):
+        """os.rename() when possible, verified copy + delete across devices"""
+        try:
+            os.rename(source, dest_path)
+            return dest_path
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        
+        if planned_size is None and (journal is None or not journal.resumed):
+            self._check_disk_space(source, os.path.dirname(dest_path))
+        return self._move_across_devices(source, dest_path, progress_callback, cancel_event, verify, report,
+                                         journal, planned_size)
+    
+    def _move_across_devices(self, source, dest_path, progress_callback=None, cancel_event=None,
+                             verify=False, report=None, journal=None, planned_size=None):
+        """Copy to another device, verify, then remove the source"""
+        is_dir = os.path.isdir(source) and not os.path.islink(source)
+        try:
+            if os.path.islink(source):
+                if not os.path.lexists(dest_path):
+                    os.symlink(os.readlink(source), dest_path)
+            elif is_dir:
+                written = self.copy_engine.copy_tree(source, dest_path, progress_callback, cancel_event,
+                                                     verify=verify, report=report, total=planned_size,
+                                                     **self._journal_args(journal))
+            else:
+                resume_point = None
+                if journal is not None and os.path.lexists(dest_path):
+                    resume_point = journal.resume_point(dest_path) or (0, None)
+                self.copy_engine.copy_file(source, dest_path, progress_callback, cancel_event,
+                                           resume=resume_point is not None, verify=verify, report=report,
+                                           resume_point=resume_point,
+                                           checkpoint=journal.checkpoint if journal is not None else None)
+            
+            if is_dir:
+                self._verify_tree_copy(dest_path, written, planned_size)
+            else:
+                self._verify_copy(source, dest_path)
+        except BaseException as e:
+            if journal is not None and journal.keeps_partial(e):
+                # Journaled: the partial copy is where a resume continues
+                raise
+            # Never leave a half-moved item behind; the source is untouched
+            try:
+                if is_dir:
+                    shutil.rmtree(dest_path, ignore_errors=True)
+                elif os.path.lexists(dest_path):
+                    os.remove(dest_path)
+            except OSError:
+                pass
+            raise
+        
+        self.deletion_worker.delete([source])
+        return dest_path
+    
+    def _abandon_copy(self, dest_path, error, journal, keep=False):
+        """Clean up dest_path after a copy to it failed with error
+        
+        A cancelled copy is removed unless its journal entry keeps it for
+        resuming; a copy cut short by close() stays where the resume
+        continues. Otherwise only a still empty name claimed by
+        _get_unique_path() is released, so it does not shift the suffixes
+        of later copies.
+        """
+        if keep:
+            return
+        if isinstance(error, OperationCancelledError) and not (journal is not None and journal.keeps_partial(error)):
+            try:
+                if os.path.isdir(dest_path) and not os.path.islink(dest_path):
+                    shutil.rmtree(dest_path, ignore_errors=True)
+                elif os.path.lexists(dest_path):
+                    os.remove(dest_path)
+            except OSError:
+                pass
+            self.namer.note(dest_path)
+            return
+        self._discard_placeholder(dest_path)
+    
+    def _journal_args(self, journal):
+        """copy_tree() arguments that resume and checkpoint a journaled transfer"""
+        if journal is None:
+            return {}
+        args = {'checkpoint': journal.checkpoint}
+        if journal.resuming:
+            args['resume'] = True
+            if journal.file:
+                args['resume_points'] = {journal.file: journal.resume_point(journal.file)}
+        return args
+    
+    def _verify_copy(self, source, dest_path):
+        """Check that the copied file holds as many bytes as the source"""
+        expected = os.lstat(source).st_size
+        actual = os.lstat(dest_path).st_size
+        if expected != actual:
+            raise FileOperationError(
+                f"Verification failed for {dest_path}: {actual} of {expected} bytes"
+            )
+    
+    def _verify_tree_copy(self, dest_path, written, planned_size=None):
+        """Check a copied tree without walking source and copy again
+        
+        copy_tree() already failed on any file it could not copy in full;
+        against a plan, the bytes it wrote also show whether the source
+        changed after it was measured, before that source is deleted.
+        """
+        if planned_size is None:
+            return
+        expected, actual = planned_size, written
+        if expected != actual:
+            raise FileOperationError(
+                f"Verification failed for {dest_path}: {actual} of {expected} bytes"
+            )
+    
+    def get_trash_dir(self, path):
+        """Trash directory on the same device as path, so trashing is a rename"""
+        try:
+            device = os.lstat(path).st_dev
+            if os.path.isdir(TRASH_PATH) and os.stat(TRASH_PATH).st_dev == device:
+                return TRASH_PATH
+            # The top of the device the file lives on, checked by st_dev
+            return os.path.join(mount_table.device_root(path), TRASH_DIR_NAME)
+        except OSError:
+            return TRASH_PATH
+    
+    def get_trash_dirs(self):
+        """All existing trash directories, one per device"""
+        dirs = []
+        candidates = [TRASH_PATH] + [os.path.join(m.mount_point, TRASH_DIR_NAME)
+                                     for m in mount_table.storage_mounts()]
+        for trash_dir in candidates:
+            # Do not hang on a dead network share
+            if trash_dir in dirs or self.negative_cache.is_unhealthy(trash_dir):
+                continue
+            if os.path.isdir(trash_dir):
+                dirs.append(trash_dir)
+        return dirs
+    
+    def get_trash_index(self, trash_dir):
+        """The TrashIndex cataloguing one trash directory"""
+        trash_dir = os.path.normpath(trash_dir)
+        index = self._trash_indexes.get(trash_dir)
+        if index is None:
+            index = self._trash_indexes[trash_dir] = TrashIndex(trash_dir)
+        return index
+    
+    def list_trash_entries(self):
+        """TrashEntry records for every item in every trash directory"""
+        entries = []
+        for trash_dir in self.get_trash_dirs():
+            index = self.get_trash_index(trash_dir)
+            for entry in index.entries():
+                if entry.size is None:
+                    entry = self._measure_trash_entry(index, entry)
+                entries.append(entry)
+        return entries
+    
+    def _measure_trash_entry(self, index, entry):
+        """Fill in the size of an item the index adopted without one
+        
+        Folders go through the size service, so the first call only queues
+        the walk and the entry stays unknown (None) until it finishes.
+        """
+        if entry.is_dir:
+            size = self.size_service.get_size(entry.path)
+        else:
+            try:
+                size = os.lstat(entry.path).st_size
+            except OSError:
+                size = None
+        if size is None:
+            return entry
+        index.set_size(entry.name, size)
+        return entry._replace(size=size)
+    
+    def list_trash_items(self):
+        """Full paths of everything in every trash directory"""
+        return [entry.path for entry in self.list_trash_entries()]
+    
+    def get_trash_size(self):
+        """Total bytes held in all trash directories"""
+        return sum(entry.size or 0 for entry in self.list_trash_entries())
+    
+    def purge_trash(self, older_than_days, progress_callback=None, cancel_event=None):
+        """Permanently delete trash items deleted more than N days ago"""
+        old = []
+        for trash_dir in self.get_trash_dirs():
+            index = self.get_trash_index(trash_dir)
+            old.extend((index, entry) for entry in index.older_than(older_than_days * 24 * 60 * 60))
+        
+        purged = 0
+        for i, (index, entry) in enumerate(old):
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelledError("Purge cancelled")
+            try:
+                self._permanent_delete(entry.path, cancel_event=cancel_event)
+                index.remove(entry.name)
+                purged += 1
+            except FileOperationError as e:
+                logger.error(f"Cannot purge {entry.path}: {e}")
+            if progress_callback:
+                progress_callback(i + 1, len(old))
+        return purged
     
     def _move_to_trash(self, source):
         """Move file to trash"""
@@ -115,42 +427,71 @@ class FileOperations:
             random_suffix = random.randint(1000, 9999)
             name = os.path.basename(source)
             trash_name = f"{name}_{timestamp}_{random_suffix}"
-            trash_path = os.path.join(TRASH_PATH, trash_name)
             
-            shutil.move(source, trash_path)
+            st = os.lstat(source)
+            is_dir = stat.S_ISDIR(st.st_mode)
+            # Never walk a big folder here; the last known total will do
+            size = (self.size_service.peek(source) or 0) if is_dir else st.st_size
+            
+            trash_dirs = [self.get_trash_dir(source)]
+            if trash_dirs[0] != TRASH_PATH:
+                # A read-only mount root: copy to the main trash as before
+                trash_dirs.append(TRASH_PATH)
+            for trash_dir in trash_dirs:
+                try:
+                    os.makedirs(trash_dir, exist_ok=True)
+                    if not os.access(trash_dir, os.W_OK):
+                        raise PermissionError(errno.EACCES, "Trash is not writable", trash_dir)
+                    break
+                except OSError as e:
+                    if trash_dir == trash_dirs[-1]:
+                        raise
+                    logger.warning(f"Cannot use trash {trash_dir}: {e}")
+            
+            trash_path = os.path.join(trash_dir, trash_name)
+            self._rename_or_move(source, trash_path)
+            self.get_trash_index(trash_dir).add(trash_name, os.path.abspath(source), size, st.st_dev, is_dir)
             return trash_path
         except Exception as e:
             raise FileOperationError(f"Failed to move to trash: {e}")
     
-    def delete(self, path, permanent=False):
-        """Delete file or directory"""
+    def delete(self, path, permanent=False, progress_callback=None, cancel_event=None):
+        """Delete file or directory
+        
+        Permanent deletes go through the throttled DeletionWorker; run them
+        off the main loop. progress_callback(done_items, total_items) and
+        cancel_event work as for copy().
+        """
         try:
             validate_path(path)
             
-            if not os.path.exists(path):
+            if not os.path.lexists(path):
                 raise FileOperationError(f"Path does not exist: {path}")
             
             if permanent or self.config.plugins.pilotfs.trash_enabled.value != "yes":
-                return self._permanent_delete(path)
+                return self._permanent_delete(path, progress_callback, cancel_event)
             else:
                 return self._move_to_trash(path)
                 
+        except OperationCancelledError:
+            raise
         except Exception as e:
             raise FileOperationError(f"Delete failed: {e}")
+        finally:
+            self._contents_changed(path)
     
-    def _permanent_delete(self, path):
+    def _permanent_delete(self, path, progress_callback=None, cancel_event=None):
         """Permanently delete file or directory"""
         try:
-            if os.path.isdir(path):
-                shutil.rmtree(path)
-            else:
-                os.remove(path)
+            self.deletion_worker.delete([path], progress_callback, cancel_event)
             
             # Clear cache
-            if self.cache:
-                self.cache.delete(f"file_size_{hash(path)}")
+            if self.cache is not None:
+                self.cache.delete(make_key("file_size", path))
             
             return True
+        except OperationCancelledError:
+            raise
         except Exception as e:
             raise FileOperationError(f"Permanent delete failed: {e}")
     
@@ -169,14 +510,18 @@ class FileOperations:
                 raise FileOperationError(f"Destination already exists: {new_path}")
             
             os.rename(old_path, new_path)
+            self.negative_cache.forget(new_path)
+            self._contents_changed(old_path, new_path)
             
             # Update cache
-            if self.cache:
-                old_key = f"file_size_{hash(old_path)}"
-                if self.cache and old_key in self.cache:
+            if self.cache is not None:
+                old_key = make_key("file_size", old_path)
+                if old_key in self.cache:
                     size = self.cache.get(old_key)
                     self.cache.delete(old_key)
-                    self.cache.set(f"file_size_{hash(new_path)}", size)
+                    # rename() keeps inode and mtime, so the new signature still matches
+                    self.cache.set(make_key("file_size", new_path), size,
+                                   signature=stat_signature(new_path))
             
             return new_path
             
@@ -194,6 +539,8 @@ class FileOperations:
                 raise FileOperationError(f"Directory already exists: {new_path}")
             
             os.makedirs(new_path, exist_ok=True)
+            self.negative_cache.forget(new_path)
+            self._contents_changed(new_path)
             return new_path
             
         except Exception as e:
@@ -211,6 +558,8 @@ class FileOperations:
             
             with open(new_path, 'w') as f:
                 f.write(content)
+            self.negative_cache.forget(new_path)
+            self._contents_changed(new_path)
             
             return new_path
             
@@ -220,59 +569,41 @@ class FileOperations:
     def get_file_size(self, path, use_cache=True):
         """Get file or directory size - OPTIMIZED for UI"""
         try:
-            if not os.path.exists(path):
-                return 0
-            
-            # For directories, return 0 immediately (too slow to calculate for UI)
-            if os.path.isdir(path):
-                return 0
-            
-            # For files, just get the size directly
-            return os.path.getsize(path)
-            
-        except Exception:
+            st = self.stat(path)
+        except OSError:
             return 0
+        
+        # For directories, return the last known total (0 until the
+        # background computation has finished) - never walk in the UI thread
+        if stat.S_ISDIR(st.st_mode):
+            if not use_cache:
+                return self._get_directory_size(path)
+            return self.size_service.get_size(path) or 0
+        
+        return st.st_size
     
     def _get_directory_size(self, path):
         """Calculate directory size recursively"""
-        total = 0
         try:
-            for entry in os.scandir(path):
-                if entry.is_file(follow_symlinks=False):
-                    total += entry.stat().st_size
-                elif entry.is_dir(follow_symlinks=False):
-                    total += self._get_directory_size(entry.path)
+            return self.size_service.compute(path)
         except Exception:
-            pass
-        return total
+            return 0
     
     def get_file_info(self, path):
         """Get detailed file information"""
         try:
-            if not os.path.exists(path):
-                return None
-            
-            stat_info = os.stat(path)
-            
-            info = {
-                'path': path,
-                'name': os.path.basename(path),
-                'is_dir': os.path.isdir(path),
-                'size': self.get_file_size(path),
-                'size_formatted': format_size(self.get_file_size(path)),
-                'modified': datetime.fromtimestamp(stat_info.st_mtime),
-                'accessed': datetime.fromtimestamp(stat_info.st_atime),
-                'created': datetime.fromtimestamp(stat_info.st_ctime),
-                'permissions': oct(stat_info.st_mode)[-3:],
-                'owner': stat_info.st_uid,
-                'group': stat_info.st_gid,
-            }
-            
-            if info['is_dir']:
+            try:
+                info = self.stat_engine.stat(path)
+            except OSError as e:
+                if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                    return None
+                raise
+            
+            if info.is_dir:
                 try:
-                    info['item_count'] = len(os.listdir(path))
+                    info.item_count = len(os.listdir(path))
                 except:
-                    info['item_count'] = 0
+                    info.item_count = 0
             
             return info
             
@@ -297,34 +628,17 @@ class FileOperations:
         except Exception as e:
             raise FileOperationError(f"Change permissions failed: {e}")
     
+    def plan_transfer(self, sources, destination, mode="cp"):
+        """Return a TransferPlan (bytes, files, space and inode checks) for a selection"""
+        return self.planner.plan(sources, destination, mode)
+    
     def _check_disk_space(self, source, destination):
         """Check if enough disk space is available"""
         try:
             if not os.path.exists(destination):
                 return True
             
-            st = os.statvfs(destination)
-            free = st.f_bavail * st.f_frsize
-            
-            # For directories, estimate size more efficiently
-            if os.path.isdir(source):
-                # Don't calculate exact directory size (too slow)
-                # Just check if there's at least 1GB free
-                if free < (1024**3):  # 1GB
-                    raise DiskSpaceError(
-                        f"Insufficient space for large directory! Free: {free / (1024**3):.2f} GB"
-                    )
-                return True
-            else:
-                needed = os.path.getsize(source)
-            
-            if needed > free:
-                needed_gb = needed / (1024**3)
-                free_gb = free / (1024**3)
-                raise DiskSpaceError(
-                    f"Insufficient space! Needed: {needed_gb:.2f} GB, Free: {free_gb:.2f} GB"
-                )
-            return True
+            return self.plan_transfer([source], destination).check()
             
         except Exception as e:
             if isinstance(e, DiskSpaceError):
@@ -332,39 +646,57 @@ class FileOperations:
             # Don't fail if we can't check disk space
             return True
     
-    def _get_unique_path(self, source, destination):
-        """Generate unique path if destination exists"""
-        base = os.path.basename(source)
+    def _get_unique_path(self, source, destination, kind='file'):
+        """Claim a free path for source in destination
         
+        The path is created at once (an empty file, a directory or, for
+        kind='symlink', a copy of source's link) so that concurrent
+        transfers cannot pick the same name; writing, renaming or copying
+        a tree onto it replaces the placeholder.
+        """
         # If destination is a directory, create path inside it
         if os.path.isdir(destination):
             dest_dir = destination
-            dest_path = os.path.join(destination, base)
+            name = os.path.basename(source)
         else:
             # Destination is a file path
             dest_dir = os.path.dirname(destination)
-            dest_path = destination
-        
-        if not os.path.exists(dest_path):
-            return dest_path
-        
-        # Generate unique name
-        name, ext = os.path.splitext(base)
-        counter = 1
-        while os.path.exists(dest_path):
-            dest_path = os.path.join(dest_dir, f"{name}_{counter}{ext}")
-            counter += 1
+            name = os.path.basename(destination)
         
-        return dest_path
+        link_target = os.readlink(source) if kind == 'symlink' else None
+        return self.namer.allocate(dest_dir, name, kind, link_target)
+    
+    def _path_kind(self, path):
+        if os.path.islink(path):
+            return 'symlink'
+        return 'dir' if os.path.isdir(path) else 'file'
     
-    def empty_trash(self):
+    def _discard_placeholder(self, path):
+        """Remove a path claimed by _get_unique_path() that was never filled"""
+        try:
+            st = os.lstat(path)
+            if stat.S_ISDIR(st.st_mode):
+                os.rmdir(path)
+            elif stat.S_ISLNK(st.st_mode) or st.st_size == 0:
+                os.remove(path)
+        except OSError:
+            pass
+        self.namer.note(path)
+    
+    def empty_trash(self, progress_callback=None, cancel_event=None):
         """Empty trash directory"""
         try:
-            if os.path.exists(TRASH_PATH):
-                shutil.rmtree(TRASH_PATH)
-                os.makedirs(TRASH_PATH, exist_ok=True)
-                return True
-            return False
+            trash_dirs = self.get_trash_dirs()
+            items = []
+            for trash_dir in trash_dirs:
+                items.extend(os.path.join(trash_dir, name) for name in os.listdir(trash_dir))
+            # One throttled pass over every device's trash
+            self.deletion_worker.delete(items, progress_callback, cancel_event)
+            for trash_dir in trash_dirs:
+                self.get_trash_index(trash_dir).clear()
+            return bool(trash_dirs)
+        except OperationCancelledError:
+            raise
         except Exception as e:
             raise FileOperationError(f"Empty trash failed: {e}")
     
@@ -374,26 +706,38 @@ class FileOperations:
             if not os.path.exists(trash_item):
                 raise FileOperationError(f"Trash item not found: {trash_item}")
             
-            if not destination:
-                destination = "/media/hdd"
-            
-            # Extract original name from trash filename
+            trash_item = os.path.abspath(trash_item)
+            trash_dir = os.path.dirname(trash_item)
             name = os.path.basename(trash_item)
-            if "_" in name:
-                original_name = name.split("_")[0]
-            else:
-                original_name = name
+            index = self.get_trash_index(trash_dir)
+            entry = index.get(name)
+            original_path = entry.original_path if entry is not None else None
             
-            dest_path = os.path.join(destination, original_name)
+            if not destination:
+                if original_path and os.path.isdir(os.path.dirname(original_path)):
+                    destination = os.path.dirname(original_path)
+                else:
+                    # The device the trash folder lives on, so restoring is a rename
+                    destination = os.path.dirname(trash_dir)
+            
+            if original_path:
+                original_name = os.path.basename(original_path)
+            else:
+                # Not in the index: strip the "_<timestamp>_<random>" suffix
+                parts = name.rsplit("_", 2)
+                original_name = parts[0] if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit() else name
             
-            # Make unique if exists
-            counter = 1
-            while os.path.exists(dest_path):
-                base, ext = os.path.splitext(original_name)
-                dest_path = os.path.join(destination, f"{base}_{counter}{ext}")
-                counter += 1
+            link_target = os.readlink(trash_item) if os.path.islink(trash_item) else None
+            dest_path = self.namer.allocate(destination, original_name, self._path_kind(trash_item), link_target)
             
-            shutil.move(trash_item, dest_path)
+            try:
+                self._rename_or_move(trash_item, dest_path)
+            except BaseException:
+                self._discard_placeholder(dest_path)
+                raise
+            index.remove(name)
+            self.negative_cache.forget(dest_path)
+            self._contents_changed(trash_item, dest_path)
             return dest_path
             
         except Exception as e:
@@ -403,20 +747,16 @@ class FileOperations:
     def can_play_file(self, path):
         """Check if file can be played - for compatibility with main_screen.py"""
         try:
-            if not os.path.exists(path):
+            # Check extension first - it needs no I/O
+            ext = os.path.splitext(path)[1].lower()
+            supported = ['.mp4', '.mkv', '.avi', '.ts', '.m2ts', '.mp3', '.flac', '.wav', '.aac', '.ogg', '.m4a']
+            if ext not in supported:
                 return False
             
-            # Check file size
+            # Check file size (one stat; fails fast on dead mounts)
             try:
-                size = os.path.getsize(path)
-                if size == 0:
-                    return False
-            except:
+                return self.stat(path).st_size > 0
+            except OSError:
                 return False
-            
-            # Check extension
-            ext = os.path.splitext(path)[1].lower()
-            supported = ['.mp4', '.mkv', '.avi', '.ts', '.m2ts', '.mp3', '.flac', '.wav', '.aac', '.ogg', '.m4a']
-            return ext in supported
         except:
             return False
\ No newline at end of file
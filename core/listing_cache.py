@@ -0,0 +1,240 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+from collections import OrderedDict
+from ..constants import MAX_LISTING_CACHE_DIRS
+from ..utils.logging_config import get_logger
+from .mounts import mount_table
+from .stat_engine import StatEngine
+
+logger = get_logger(__name__)
+
+# inotify(7) constants
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# IN_MODIFY is left out on purpose: it fires for every write to a recording
+# in progress. The new size shows up once the writer closes the file.
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+class _Inotify:
+    """Minimal ctypes binding to the inotify syscalls"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return wd
+
+    def rm_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Yield (wd, mask) for all queued events"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            raise
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size + name_len
+            yield wd, mask
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+class _Listing:
+    __slots__ = ('entries', 'mtime_ns', 'wd')
+
+    def __init__(self, entries, mtime_ns, wd):
+        self.entries = entries
+        self.mtime_ns = mtime_ns
+        self.wd = wd
+
+class DirectoryListingCache:
+    """Cache of os.scandir() results per directory.
+
+    Local directories are watched with inotify, so a cached listing is
+    served without any syscall until the kernel reports a change. Where
+    inotify is unavailable, the watch limit is reached, or the directory
+    is on a network filesystem (inotify does not see remote changes), the
+    cache falls back to comparing the directory's mtime with one stat().
+    """
+
+    def __init__(self, max_dirs=MAX_LISTING_CACHE_DIRS, use_inotify=True):
+        self.max_dirs = max_dirs
+        self._listings = OrderedDict()
+        self._wd_paths = {}
+        self._generation = {}
+        self._lock = threading.RLock()
+        self._inotify = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._stat_engine = StatEngine()
+
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._thread = threading.Thread(target=self._watch_loop, daemon=True)
+                self._thread.start()
+            except Exception as e:
+                logger.info(f"inotify unavailable, polling directory mtimes: {e}")
+                self._inotify = None
+
+    def _watch_loop(self):
+        """Drain inotify events and drop the affected listings"""
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self._inotify.fd], [], [], 1.0)
+                if not ready:
+                    continue
+                for wd, mask in self._inotify.read_events():
+                    if mask & IN_Q_OVERFLOW:
+                        self.invalidate_all()
+                        continue
+                    with self._lock:
+                        if mask & IN_IGNORED:
+                            # Watch gone (removed by us, dir deleted or unmounted)
+                            path = self._wd_paths.pop(wd, None)
+                        else:
+                            path = self._wd_paths.get(wd)
+                        if path:
+                            self._generation[path] = self._generation.get(path, 0) + 1
+                            self._drop(path)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.error(f"inotify watch loop error: {e}")
+                    self._stop.wait(1.0)
+
+    def _add_watch(self, path):
+        if self._inotify is None or mount_table.is_network_fs(path):
+            return None
+        try:
+            wd = self._inotify.add_watch(path, WATCH_MASK)
+        except OSError as e:
+            # ENOSPC: out of watches - fall back to mtime polling for this dir
+            logger.debug(f"Cannot watch {path}: {e}")
+            return None
+        self._wd_paths[wd] = path
+        return wd
+
+    def _drop(self, path, remove_watch=True):
+        with self._lock:
+            listing = self._listings.pop(path, None)
+            if listing is not None and listing.wd is not None:
+                if self._wd_paths.get(listing.wd) == path:
+                    del self._wd_paths[listing.wd]
+                    if remove_watch and self._inotify is not None:
+                        self._inotify.rm_watch(listing.wd)
+            return listing is not None
+
+    def _scan(self, path):
+        return self._stat_engine.scan_dir(path)
+
+    def _is_valid(self, path, listing):
+        if listing.wd is not None:
+            return True
+        try:
+            return os.stat(path).st_mtime_ns == listing.mtime_ns
+        except OSError:
+            return False
+
+    def get(self, path):
+        """Return the cached listing of path, scanning it if needed.
+
+        Raises OSError if the directory cannot be read.
+        """
+        path = os.path.normpath(path)
+        with self._lock:
+            listing = self._listings.get(path)
+        if listing is not None:
+            if self._is_valid(path, listing):
+                with self._lock:
+                    if path in self._listings:
+                        self._listings.move_to_end(path)
+                return listing.entries
+            self._drop(path)
+
+        # Watch before scanning; a change reported while scanning bumps the
+        # generation and the (possibly stale) result is not cached
+        with self._lock:
+            wd = self._add_watch(path)
+            generation = self._generation.get(path, 0)
+        mtime_ns = os.stat(path).st_mtime_ns
+        entries = self._scan(path)
+        with self._lock:
+            if self._generation.get(path, 0) != generation:
+                return entries
+            self._listings[path] = _Listing(entries, mtime_ns, wd)
+            while len(self._listings) > self.max_dirs:
+                oldest = next(iter(self._listings))
+                self._drop(oldest)
+        return entries
+
+    def is_fresh(self, path):
+        """True if a listing of path is cached and still valid"""
+        path = os.path.normpath(path)
+        with self._lock:
+            listing = self._listings.get(path)
+        return listing is not None and self._is_valid(path, listing)
+
+    def get_entry_map(self, path):
+        """Return {full path: FileInfo} for a directory"""
+        return {entry.path: entry for entry in self.get(path)}
+
+    def invalidate(self, path):
+        """Forget the listing of one directory"""
+        return self._drop(os.path.normpath(path))
+
+    def invalidate_all(self):
+        with self._lock:
+            for path in list(self._listings):
+                self._drop(path)
+
+    def close(self):
+        """Stop the watcher thread and release the inotify descriptor"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        with self._lock:
+            self._listings.clear()
+            self._wd_paths.clear()
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
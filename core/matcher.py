@@ -0,0 +1,115 @@
+import re
+from fnmatch import translate
+
+PATTERN_SEPARATOR = ';'
+REGEX_PREFIX = 're:'
+_WILDCARDS = frozenset('*?[')
+
+def _literal(text):
+    return not _WILDCARDS.intersection(text)
+
+class NameMatcher:
+    """Case-insensitive file name matcher compiled from a search pattern.
+
+    The pattern is one or more fnmatch patterns separated by ';'
+    ("*.mkv;*.ts"); a part starting with "re:" is a regular expression
+    searched anywhere in the name. Each part is compiled once into the
+    cheapest test that gives the same answer as fnmatch:
+
+      *.ext         extension set lookup (all such parts share one set)
+      name          equality
+      abc*          startswith
+      *abc          endswith
+      *abc*         substring
+      anything else one combined regex
+
+    so the walk lower-cases each name once and mostly does string
+    operations instead of going through fnmatch per entry.
+    """
+
+    __slots__ = ('pattern', 'extensions', 'exact', 'prefixes', 'suffixes',
+                 'substrings', 'wildcards', 'regex', 'user_regexes')
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.extensions = set()
+        self.exact = set()
+        prefixes, suffixes, substrings, wildcards = [], [], [], []
+        self.user_regexes = []
+
+        for part in pattern.split(PATTERN_SEPARATOR):
+            part = part.strip()
+            if not part:
+                continue
+            if part[:len(REGEX_PREFIX)].lower() == REGEX_PREFIX:
+                self.user_regexes.append(re.compile(part[len(REGEX_PREFIX):], re.IGNORECASE))
+                continue
+            part = part.lower()
+            inner = part.strip('*')
+            if not inner or not _literal(inner):
+                wildcards.append(part)
+            elif part == inner:
+                self.exact.add(part)
+            elif part.startswith('*.') and part == '*' + inner and '.' not in inner[1:]:
+                self.extensions.add(inner[1:])
+            elif part == inner + '*':
+                prefixes.append(inner)
+            elif part == '*' + inner:
+                suffixes.append(inner)
+            elif part == '*' + inner + '*':
+                substrings.append(inner)
+            else:
+                wildcards.append(part)
+
+        self.prefixes = tuple(prefixes)
+        self.suffixes = tuple(suffixes)
+        self.substrings = tuple(substrings)
+        self.wildcards = tuple(wildcards)
+        self.regex = re.compile('|'.join(translate(p) for p in wildcards)) if wildcards else None
+
+    def __call__(self, name):
+        return self.match(name)
+
+    def match(self, name):
+        lname = name.lower()
+        if self.extensions:
+            dot = lname.rfind('.')
+            if dot >= 0 and lname[dot + 1:] in self.extensions:
+                return True
+        if lname in self.exact:
+            return True
+        if self.prefixes and lname.startswith(self.prefixes):
+            return True
+        if self.suffixes and lname.endswith(self.suffixes):
+            return True
+        for text in self.substrings:
+            if text in lname:
+                return True
+        if self.regex is not None and self.regex.match(lname):
+            return True
+        for regex in self.user_regexes:
+            if regex.search(name):
+                return True
+        return False
+
+    def globs(self):
+        """The pattern as SQLite GLOB patterns on the lower-cased name
+
+        None when a part is a regular expression, which GLOB cannot express.
+        """
+        if self.user_regexes:
+            return None
+        # Literal parts hold no GLOB metacharacters, so they need no escaping
+        globs = [f"*.{ext}" for ext in self.extensions]
+        globs.extend(self.exact)
+        globs.extend(text + '*' for text in self.prefixes)
+        globs.extend('*' + text for text in self.suffixes)
+        globs.extend('*' + text + '*' for text in self.substrings)
+        globs.extend(part.replace('[!', '[^') for part in self.wildcards)
+        return globs
+
+def compile_pattern(pattern):
+    """NameMatcher for pattern; an already compiled matcher is returned as is"""
+    if isinstance(pattern, NameMatcher):
+        return pattern
+    return NameMatcher(pattern)
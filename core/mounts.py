@@ -0,0 +1,179 @@
+import os
+import select
+import threading
+from collections import namedtuple
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+PROC_MOUNTS = "/proc/mounts"
+
+NETWORK_FS_TYPES = ('cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'fuse.sshfs', 'davfs', 'fuse.rclone')
+FAT_FS_TYPES = ('vfat', 'msdos', 'fat')
+VIRTUAL_FS_TYPES = ('proc', 'sysfs', 'devtmpfs', 'devpts', 'cgroup', 'cgroup2', 'debugfs',
+                    'securityfs', 'pstore', 'configfs', 'tracefs', 'mqueue', 'bpf',
+                    'rpc_pipefs', 'binfmt_misc', 'fusectl', 'autofs', 'hugetlbfs', 'squashfs')
+
+MountInfo = namedtuple('MountInfo', ['mount_point', 'device', 'fstype', 'options'])
+
+def _unescape(field):
+    """Decode the octal escapes (\\040 etc.) used in /proc/mounts"""
+    if '\\' not in field:
+        return field
+    out = []
+    i = 0
+    while i < len(field):
+        if field[i] == '\\' and field[i + 1:i + 4].isdigit():
+            out.append(chr(int(field[i + 1:i + 4], 8)))
+            i += 4
+        else:
+            out.append(field[i])
+            i += 1
+    return ''.join(out)
+
+class MountTable:
+    """Parsed view of /proc/mounts.
+
+    Looks up the mount containing a path by string prefix only, so it never
+    touches the filesystem in question - safe to call for paths on dead
+    network shares. The table reloads itself when the kernel reports a
+    mount change (USB hotplug, automount) or when a caller passes the
+    st_dev of the path and the mount found lives on another device.
+    """
+
+    def __init__(self, mounts_file=PROC_MOUNTS):
+        self.mounts_file = mounts_file
+        self._mounts = None
+        self._devices = {}
+        self._poll = None
+        self._watch = None
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """Re-read the mount table"""
+        mounts = []
+        try:
+            with open(self.mounts_file, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 4:
+                        continue
+                    mounts.append(MountInfo(
+                        os.path.normpath(_unescape(parts[1])),
+                        _unescape(parts[0]),
+                        parts[2],
+                        parts[3]
+                    ))
+        except Exception as e:
+            logger.debug(f"Cannot read {self.mounts_file}: {e}")
+        # Longest mount point first so find_mount() hits the innermost one
+        mounts.sort(key=lambda m: len(m.mount_point), reverse=True)
+        with self._lock:
+            self._mounts = mounts
+            self._devices = {}
+        return mounts
+
+    def _changed(self):
+        """True once after the kernel has mounted or unmounted something
+
+        /proc/mounts flags POLLPRI on an open handle when the mount
+        namespace changes, so this costs one poll() and no file system
+        access. A plain mounts_file never reports a change.
+        """
+        with self._lock:
+            return self._poll_changed()
+
+    def _poll_changed(self):
+        if self._poll is None:
+            try:
+                self._watch = open(self.mounts_file, 'r')
+                self._poll = select.poll()
+                self._poll.register(self._watch, select.POLLPRI | select.POLLERR)
+            except (OSError, AttributeError) as e:
+                logger.debug(f"Cannot watch {self.mounts_file}: {e}")
+                self._poll = False
+            # A fresh handle starts out in sync with the mount namespace
+            return False
+        if not self._poll:
+            return False
+        try:
+            events = self._poll.poll(0)
+        except OSError:
+            return False
+        return any(mask & (select.POLLPRI | select.POLLERR) for _fd, mask in events)
+
+    def mounts(self):
+        """Return all mounts, innermost first"""
+        if self._changed() or self._mounts is None:
+            return self.reload()
+        return self._mounts
+
+    def _lookup(self, path):
+        for mount in self.mounts():
+            mp = mount.mount_point
+            if mp == '/' or path == mp or path.startswith(mp + os.sep):
+                return mount
+        return None
+
+    def _device(self, mount_point):
+        device = self._devices.get(mount_point)
+        if device is None:
+            try:
+                device = self._devices[mount_point] = os.stat(mount_point).st_dev
+            except OSError:
+                return None
+        return device
+
+    def find_mount(self, path, st_dev=None):
+        """Return the MountInfo for the filesystem containing path
+
+        Pass st_dev (from an lstat() of path the caller already made) to
+        have the answer checked against the device: a table that has
+        missed a mount is re-read once.
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        mount = self._lookup(path)
+        if st_dev is not None and mount is not None and self._device(mount.mount_point) != st_dev:
+            logger.debug(f"Mount table missed the mount holding {path}, reloading")
+            self.reload()
+            mount = self._lookup(path)
+        return mount
+
+    def device_root(self, path):
+        """Top directory of the file system holding path
+
+        The mount point when the table agrees with the path's st_dev,
+        otherwise the highest parent still on that device.
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        device = os.lstat(path).st_dev
+        mount = self.find_mount(path, device)
+        if mount is not None and self._device(mount.mount_point) == device:
+            return mount.mount_point
+        root = path
+        while root != os.sep:
+            parent = os.path.dirname(root)
+            try:
+                if os.lstat(parent).st_dev != device:
+                    break
+            except OSError:
+                break
+            root = parent
+        return root
+
+    def get_fstype(self, path, st_dev=None):
+        mount = self.find_mount(path, st_dev)
+        return mount.fstype if mount else None
+
+    def is_network_fs(self, path, st_dev=None):
+        return self.get_fstype(path, st_dev) in NETWORK_FS_TYPES
+
+    def is_fat_fs(self, path, st_dev=None):
+        return self.get_fstype(path, st_dev) in FAT_FS_TYPES
+
+    def storage_mounts(self):
+        """Mounts that can hold user files (no proc, sysfs, squashfs, ...)"""
+        return [m for m in self.mounts() if m.fstype not in VIRTUAL_FS_TYPES]
+
+# Shared instance; cheap to query, reloads itself on mount changes
+mount_table = MountTable()
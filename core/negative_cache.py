@@ -0,0 +1,103 @@
+import errno
+import os
+import threading
+import time
+from ..constants import NEGATIVE_CACHE_TTL, MOUNT_UNHEALTHY_TTL
+from ..utils.logging_config import get_logger
+from .mounts import mount_table
+
+logger = get_logger(__name__)
+
+# Errors that mean "the share is in trouble", not "this file is missing"
+UNHEALTHY_ERRNOS = frozenset(
+    getattr(errno, name) for name in
+    ('EIO', 'ETIMEDOUT', 'EHOSTDOWN', 'EHOSTUNREACH', 'ENOTCONN', 'ESTALE', 'ECONNRESET')
+    if hasattr(errno, name)
+)
+
+class NegativeCache:
+    """Remembers failed stat() calls for a short time.
+
+    ENOENT results are cached per path. I/O errors and timeouts also flag
+    the whole mount as unhealthy, so further lookups on a dead CIFS share
+    fail immediately instead of each paying the timeout again. Entries for
+    a mount are dropped when it is remounted (see drop_mount()).
+    """
+
+    def __init__(self, ttl=NEGATIVE_CACHE_TTL, unhealthy_ttl=MOUNT_UNHEALTHY_TTL, mounts=None):
+        self.ttl = ttl
+        self.unhealthy_ttl = unhealthy_ttl
+        self.mounts = mounts or mount_table
+        self._missing = {}
+        self._unhealthy = {}
+        self._lock = threading.Lock()
+
+    def _mount_point(self, path):
+        mount = self.mounts.find_mount(path)
+        return mount.mount_point if mount else None
+
+    def check(self, path):
+        """Raise the cached OSError for path, if any"""
+        now = time.monotonic()
+        with self._lock:
+            if self._unhealthy:
+                mount_point = self._mount_point(path)
+                cached = self._unhealthy.get(mount_point)
+                if cached is not None:
+                    if now < cached[0]:
+                        raise OSError(cached[1], f"{os.strerror(cached[1])} (mount {mount_point} unhealthy)", path)
+                    del self._unhealthy[mount_point]
+            cached = self._missing.get(path)
+            if cached is not None:
+                if now < cached[0]:
+                    raise OSError(cached[1], os.strerror(cached[1]), path)
+                del self._missing[path]
+
+    def record_error(self, path, error):
+        """Remember a failed lookup"""
+        code = getattr(error, 'errno', None)
+        now = time.monotonic()
+        with self._lock:
+            if code == errno.ENOENT or code == errno.ENOTDIR:
+                self._missing[path] = (now + self.ttl, code)
+            elif code in UNHEALTHY_ERRNOS:
+                self._missing[path] = (now + self.ttl, code)
+                mount_point = self._mount_point(path)
+                if mount_point and mount_point != '/':
+                    if mount_point not in self._unhealthy:
+                        logger.warning(f"Marking mount {mount_point} unhealthy: {error}")
+                    self._unhealthy[mount_point] = (now + self.unhealthy_ttl, code)
+
+    def stat(self, path, follow_symlinks=True):
+        """os.stat() that answers from the cache for known failures"""
+        self.check(path)
+        try:
+            return os.stat(path, follow_symlinks=follow_symlinks)
+        except OSError as e:
+            self.record_error(path, e)
+            raise
+
+    def forget(self, path):
+        """Drop the entry for a path that has just been created"""
+        with self._lock:
+            self._missing.pop(path, None)
+
+    def is_unhealthy(self, path):
+        mount_point = self._mount_point(path)
+        with self._lock:
+            cached = self._unhealthy.get(mount_point)
+            return cached is not None and time.monotonic() < cached[0]
+
+    def drop_mount(self, mount_point):
+        """Forget everything known about a (re)mounted share"""
+        mount_point = os.path.normpath(mount_point)
+        prefix = mount_point.rstrip(os.sep) + os.sep
+        with self._lock:
+            self._unhealthy.pop(mount_point, None)
+            for path in [p for p in self._missing if p == mount_point or p.startswith(prefix)]:
+                del self._missing[path]
+
+    def clear(self):
+        with self._lock:
+            self._missing.clear()
+            self._unhealthy.clear()
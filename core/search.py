@@ -1,98 +1,91 @@
 import os
 import subprocess
 import threading
-from fnmatch import fnmatch
 from ..exceptions import FileOperationError
 from ..utils.validators import validate_path
 from ..utils.formatters import format_size
+from .matcher import compile_pattern
+from .stat_engine import StatEngine
+from .walker import walker_for, entry_size
 
 class SearchEngine:
-    def __init__(self, cache=None):
+    def __init__(self, cache=None, file_index=None):
         self.cache = cache
-        # FIXED: Use threading.Event() correctly
-        self._stop_search = threading.Event()
+        self.file_index = file_index
+        # One stop event per running search; stop_search() sets them all
+        self._active_searches = set()
         self._search_lock = threading.Lock()
+        self.stat_engine = StatEngine()
+    
+    def _begin(self, stop_event=None):
+        stop_event = stop_event if stop_event is not None else threading.Event()
+        with self._search_lock:
+            self._active_searches.add(stop_event)
+        return stop_event
+    
+    def _end(self, stop_event):
+        with self._search_lock:
+            self._active_searches.discard(stop_event)
     
     def search_files(self, directory, pattern, recursive=True, max_results=100):
-        """Search for files matching pattern"""
+        """Search for files matching pattern
+        
+        Recursive searches below an indexed mount are answered from the
+        FileIndex without touching the disk; anything else is walked.
+        """
         try:
-            validate_path(directory)
-            
-            if not os.path.isdir(directory):
-                raise FileOperationError(f"Not a directory: {directory}")
-            
-            self._stop_search.clear()
-            results = []
-            
-            if recursive:
-                for root, dirs, files in os.walk(directory):
-                    if self._stop_search.is_set():
-                        break
-                    
-                    # Search in files
-                    for name in files:
-                        if self._stop_search.is_set():
-                            break
-                        
-                        if fnmatch(name.lower(), pattern.lower()):
-                            full_path = os.path.join(root, name)
-                            results.append({
-                                'path': full_path,
-                                'name': name,
-                                'is_dir': False,
-                                'size': os.path.getsize(full_path) if os.path.exists(full_path) else 0
-                            })
-                        
-                        if len(results) >= max_results:
-                            self._stop_search.set()
-                            break
-                    
-                    # Search in directory names
-                    for name in dirs:
-                        if self._stop_search.is_set():
-                            break
-                        
-                        if fnmatch(name.lower(), pattern.lower()):
-                            full_path = os.path.join(root, name)
-                            results.append({
-                                'path': full_path,
-                                'name': name,
-                                'is_dir': True,
-                                'size': 0
-                            })
-                        
-                        if len(results) >= max_results:
-                            self._stop_search.set()
-                            break
-            else:
-                # Non-recursive search
-                try:
-                    entries = os.listdir(directory)
-                    for name in entries:
-                        if self._stop_search.is_set():
-                            break
-                        
-                        if fnmatch(name.lower(), pattern.lower()):
-                            full_path = os.path.join(directory, name)
-                            is_dir = os.path.isdir(full_path)
-                            results.append({
-                                'path': full_path,
-                                'name': name,
-                                'is_dir': is_dir,
-                                'size': 0 if is_dir else os.path.getsize(full_path)
-                            })
-                        
-                        if len(results) >= max_results:
-                            self._stop_search.set()
-                            break
-                except Exception:
-                    pass
-            
-            return results
-            
+            return list(self.iter_files(directory, pattern, recursive, max_results))
         except Exception as e:
             raise FileOperationError(f"File search failed: {e}")
     
+    def iter_files(self, directory, pattern, recursive=True, max_results=100, stop_event=None):
+        """Yield FileInfo records matching pattern as they are found
+        
+        pattern may hold several ';'-separated wildcard patterns and "re:"
+        regular expressions; it is compiled once (see core.matcher).
+        
+        Matches are described from the walker's DirEntry objects and handed
+        out before the walk goes on, so the first result arrives as soon as
+        the first matching folder has been read. Setting stop_event (a
+        threading.Event of the caller's) or stop_search() ends the
+        iteration early.
+        """
+        validate_path(directory)
+        
+        if not os.path.isdir(directory):
+            raise FileOperationError(f"Not a directory: {directory}")
+        
+        matcher = compile_pattern(pattern)
+        stop = self._begin(stop_event)
+        try:
+            if recursive and self.file_index is not None:
+                indexed = self.file_index.search(directory, matcher, max_results)
+                # Keep the index current for the next query
+                self.file_index.refresh_async()
+                if indexed is not None:
+                    yield from indexed
+                    return
+            
+            match = matcher.match
+            found = 0
+            walker = walker_for(directory, max_depth=None if recursive else 0, stop_event=stop)
+            
+            for root, dirs, files in walker.walk(directory):
+                # Files first, then directory names
+                for entry in files + dirs:
+                    if not match(entry.name):
+                        continue
+                    try:
+                        info = self.stat_engine.from_entry(entry)
+                    except OSError:
+                        continue
+                    found += 1
+                    yield info
+                    if found >= max_results:
+                        return
+        finally:
+            self._end(stop)
+    
     def search_content(self, directory, text, file_pattern="*", recursive=True, max_results=50):
         """Search for text inside files using grep"""
         try:
@@ -101,8 +94,6 @@ class SearchEngine:
             if not os.path.isdir(directory):
                 raise FileOperationError(f"Not a directory: {directory}")
             
-            self._stop_search.clear()
-            
             # Check if grep is available
             try:
                 subprocess.run(["which", "grep"], capture_output=True, check=True)
@@ -127,6 +118,7 @@ class SearchEngine:
             if file_pattern and file_pattern != "*":
                 cmd.extend(["--include", file_pattern])
             
+            stop = self._begin()
             try:
                 result = subprocess.run(
                     cmd,
@@ -141,7 +133,7 @@ class SearchEngine:
                     
                     results = []
                     for file_path in files[:max_results]:
-                        if self._stop_search.is_set():
+                        if stop.is_set():
                             break
                         
                         if os.path.exists(file_path):
@@ -162,6 +154,8 @@ class SearchEngine:
                 raise FileOperationError("Search timed out")
             except Exception as e:
                 raise FileOperationError(f"Content search failed: {e}")
+            finally:
+                self._end(stop)
             
         except Exception as e:
             if isinstance(e, FileOperationError):
@@ -171,100 +165,105 @@ class SearchEngine:
     def find_large_files(self, directory, min_size_mb=100, max_results=50):
         """Find files larger than specified size"""
         try:
-            validate_path(directory)
-            
-            if not os.path.isdir(directory):
-                raise FileOperationError(f"Not a directory: {directory}")
-            
-            min_size = min_size_mb * 1024 * 1024
-            results = []
-            
-            for root, dirs, files in os.walk(directory):
-                if self._stop_search.is_set():
-                    break
-                
-                for name in files:
-                    if self._stop_search.is_set():
-                        break
-                    
-                    full_path = os.path.join(root, name)
-                    try:
-                        size = os.path.getsize(full_path)
-                        if size >= min_size:
-                            results.append({
-                                'path': full_path,
-                                'name': name,
-                                'size': size,
-                                'size_formatted': format_size(size),
-                                'directory': root
-                            })
-                        
-                        if len(results) >= max_results:
-                            self._stop_search.set()
-                            break
-                    except:
-                        continue
-            
+            results = list(self.iter_large_files(directory, min_size_mb, max_results))
             results.sort(key=lambda x: x['size'], reverse=True)
             return results
             
         except Exception as e:
             raise FileOperationError(f"Find large files failed: {e}")
     
-    def find_duplicates(self, directory, max_results=50):
-        """Find duplicate files by size and name"""
+    def iter_large_files(self, directory, min_size_mb=100, max_results=50, stop_event=None):
+        """Yield files larger than min_size_mb in the order they are found"""
+        validate_path(directory)
+        
+        if not os.path.isdir(directory):
+            raise FileOperationError(f"Not a directory: {directory}")
+        
+        min_size = min_size_mb * 1024 * 1024
+        found = 0
+        
+        stop = self._begin(stop_event)
         try:
-            validate_path(directory)
-            
-            if not os.path.isdir(directory):
-                raise FileOperationError(f"Not a directory: {directory}")
-            
-            file_map = {}
-            duplicates = []
-            
-            for root, dirs, files in os.walk(directory):
-                if self._stop_search.is_set():
-                    break
-                
-                for name in files:
-                    if self._stop_search.is_set():
+            walker = walker_for(directory, stop_event=stop)
+            for root, dirs, files in walker.walk(directory):
+                for entry in files:
+                    if stop.is_set():
                         break
                     
-                    full_path = os.path.join(root, name)
-                    try:
-                        size = os.path.getsize(full_path)
-                        key = f"{name}_{size}"
+                    size = entry_size(entry)
+                    if size is not None and size >= min_size:
+                        found += 1
+                        yield {
+                            'path': entry.path,
+                            'name': entry.name,
+                            'size': size,
+                            'size_formatted': format_size(size),
+                            'directory': root
+                        }
                         
-                        if key in file_map:
-                            file_map[key].append(full_path)
-                        else:
-                            file_map[key] = [full_path]
-                    except:
-                        continue
-            
-            for key, paths in file_map.items():
-                if len(paths) > 1:
-                    duplicates.append({
-                        'name': key.split('_')[0],
-                        'size': int(key.split('_')[1]),
-                        'paths': paths,
-                        'count': len(paths)
-                    })
-                
-                if len(duplicates) >= max_results:
-                    break
-            
-            return duplicates
+                        if found >= max_results:
+                            return
+        finally:
+            self._end(stop)
+    
+    def find_duplicates(self, directory, max_results=50):
+        """Find duplicate files by size and name"""
+        try:
+            return list(self.iter_duplicates(directory, max_results))
             
         except Exception as e:
             raise FileOperationError(f"Find duplicates failed: {e}")
     
+    def iter_duplicates(self, directory, max_results=50, stop_event=None):
+        """Yield duplicate groups as soon as a second copy turns up
+        
+        A group is yielded once, when it reaches two paths; the same dict
+        keeps growing ('paths' and 'count') while the walk goes on, so a
+        consumer that holds on to it sees the final group when the
+        iteration ends. The walk continues after max_results groups so
+        those groups are complete, but no new ones are yielded.
+        """
+        validate_path(directory)
+        
+        if not os.path.isdir(directory):
+            raise FileOperationError(f"Not a directory: {directory}")
+        
+        file_map = {}
+        groups = 0
+        
+        stop = self._begin(stop_event)
+        try:
+            walker = walker_for(directory, stop_event=stop)
+            for root, dirs, files in walker.walk(directory):
+                for entry in files:
+                    if stop.is_set():
+                        break
+                    
+                    size = entry_size(entry)
+                    if size is None:
+                        continue
+                    
+                    key = (entry.name, size)
+                    group = file_map.get(key)
+                    if group is None:
+                        file_map[key] = {'name': entry.name, 'size': size, 'paths': [entry.path], 'count': 1}
+                        continue
+                    
+                    group['paths'].append(entry.path)
+                    group['count'] += 1
+                    if group['count'] == 2 and groups < max_results:
+                        groups += 1
+                        yield group
+        finally:
+            self._end(stop)
+    
     def stop_search(self):
-        """Stop current search operation"""
+        """Stop every running search"""
         with self._search_lock:
-            self._stop_search.set()
+            for stop_event in self._active_searches:
+                stop_event.set()
     
     def is_searching(self):
         """Check if search is in progress"""
         with self._search_lock:
-            return not self._stop_search.is_set()
+            return bool(self._active_searches)
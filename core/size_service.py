@@ -0,0 +1,216 @@
+import os
+import stat
+import threading
+import time
+from collections import deque
+from ..constants import SIZE_REVALIDATE_INTERVAL
+from .cache import make_key, stat_signature
+from ..exceptions import OperationCancelledError
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class _DirRecord:
+    __slots__ = ('signature', 'local_bytes', 'subdirs', 'total')
+
+    def __init__(self, signature, local_bytes, subdirs, total=None):
+        self.signature = signature
+        self.local_bytes = local_bytes
+        self.subdirs = subdirs
+        self.total = total
+
+class DirectorySizeService:
+    """Recursive directory sizes, computed in the background and cached.
+
+    For every directory the service remembers the bytes of the files
+    directly inside it and the names of its subdirectories, keyed by the
+    directory's (dev, inode, mtime) signature. Revalidating a subtree then
+    costs one stat() per directory; only directories whose entries changed
+    are scanned again and their parents' totals are re-added from the
+    cached children. Records are also written to the shared FileCache,
+    when there is one, so sizes survive a restart. get_size() hands out
+    a known total at once and revalidates it in the background when it
+    is older than revalidate_interval.
+
+    A file rewritten in place does not change its directory's mtime and
+    is only seen once something else in that directory changes.
+    """
+
+    def __init__(self, cache=None, revalidate_interval=SIZE_REVALIDATE_INTERVAL):
+        self.cache = cache
+        self.revalidate_interval = revalidate_interval
+        self._records = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._queued = {}
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._closed = False
+
+    def _load_record(self, path, signature):
+        with self._lock:
+            record = self._records.get(path)
+        if record is not None and record.signature == signature:
+            return record
+        if self.cache is not None:
+            cached = self.cache.get(make_key("dir_size", path), signature=signature)
+            if cached is not None:
+                record = _DirRecord(signature, cached[0], tuple(cached[1]))
+                with self._lock:
+                    self._records[path] = record
+                return record
+        return None
+
+    def _scan(self, path, signature):
+        local_bytes = 0
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        local_bytes += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+        record = _DirRecord(signature, local_bytes, tuple(subdirs))
+        with self._lock:
+            self._records[path] = record
+        if self.cache is not None:
+            self.cache.set(make_key("dir_size", path), [local_bytes, list(subdirs)], signature=signature)
+        return record
+
+    def _subtree(self, path, cancel_event):
+        if cancel_event is not None and cancel_event.is_set():
+            raise OperationCancelledError("Size computation cancelled")
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return 0
+        if not stat.S_ISDIR(st.st_mode):
+            return st.st_size
+        signature = stat_signature(st)
+        record = self._load_record(path, signature)
+        if record is None:
+            try:
+                record = self._scan(path, signature)
+            except OSError as e:
+                logger.debug(f"Cannot scan {path}: {e}")
+                return 0
+        total = record.local_bytes
+        for name in record.subdirs:
+            total += self._subtree(os.path.join(path, name), cancel_event)
+        record.total = total
+        self._checked[path] = time.monotonic()
+        return total
+
+    def compute(self, path, cancel_event=None):
+        """Return the total size of path in bytes, revalidating cached parts"""
+        return self._subtree(os.path.normpath(path), cancel_event)
+
+    def peek(self, path):
+        """Last computed total for path, or None. Never touches the disk."""
+        with self._lock:
+            record = self._records.get(os.path.normpath(path))
+        return record.total if record is not None else None
+
+    def request(self, path, callback=None):
+        """Queue a background computation; callback(path, size) is called when done"""
+        path = os.path.normpath(path)
+        with self._lock:
+            if self._closed:
+                return
+            callbacks = self._queued.get(path)
+            if callbacks is None:
+                self._queued[path] = callbacks = []
+                self._queue.append(path)
+            if callback is not None:
+                callbacks.append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+
+    def get_size(self, path, callback=None):
+        """Known total for path, or None while a background computation runs
+
+        A total is only returned while path's own signature is unchanged.
+        Files added deeper down (recordings, FTP uploads) leave it alone,
+        so a total older than revalidate_interval is handed out and the
+        subtree checked again in the background, one stat() per folder;
+        callback gets the fresh total.
+        """
+        path = os.path.normpath(path)
+        with self._lock:
+            record = self._records.get(path)
+            checked = self._checked.get(path, 0.0)
+        if record is not None and record.total is not None:
+            try:
+                current = stat_signature(os.lstat(path))
+            except OSError:
+                current = None
+            if current == record.signature:
+                if time.monotonic() - checked >= self.revalidate_interval:
+                    self.request(path, callback)
+                return record.total
+        self.request(path, callback)
+        return None
+
+    def is_pending(self, path):
+        with self._lock:
+            return os.path.normpath(path) in self._queued
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                if not self._queue and not self._closed:
+                    self._wakeup.wait(5.0)
+                if not self._queue or self._closed:
+                    # Idle: let the thread end; request() starts a new one
+                    self._thread = None
+                    return
+                path = self._queue.popleft()
+            try:
+                size = self.compute(path)
+            except Exception as e:
+                logger.error(f"Size computation for {path} failed: {e}")
+                size = None
+            with self._lock:
+                callbacks = self._queued.pop(path, [])
+            for callback in callbacks:
+                try:
+                    callback(path, size)
+                except Exception as e:
+                    logger.error(f"Size callback error: {e}")
+
+    def invalidate(self, path):
+        """Forget the record of path and the totals of every directory above it
+
+        Call it for paths whose contents changed; the parents keep their
+        listings and are re-added from their children on the next request.
+        """
+        path = os.path.normpath(path)
+        with self._lock:
+            self._records.pop(path, None)
+            self._checked.pop(path, None)
+            while True:
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+                record = self._records.get(path)
+                if record is not None:
+                    record.total = None
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._checked.clear()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+            self._queued.clear()
+            self._wakeup.notify_all()
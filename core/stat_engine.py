@@ -0,0 +1,173 @@
+import os
+import stat
+from collections import defaultdict
+from datetime import datetime
+from ..constants import STAT_SCANDIR_THRESHOLD
+from ..utils.formatters import format_size
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class FileInfo:
+    """Compact stat() result for one path.
+
+    Holds raw numbers only; datetimes and formatted strings are built on
+    access. Also answers info['name'] style lookups, so it can stand in for
+    the dicts get_file_info() and search used to return.
+    """
+
+    __slots__ = ('path', 'name', 'is_dir', 'is_link', 'size', 'mtime', 'atime', 'ctime',
+                 'mode', 'uid', 'gid', 'item_count')
+
+    def __init__(self, path, st, is_link=False, name=None):
+        self.path = path
+        self.name = name if name is not None else os.path.basename(path)
+        self.is_dir = stat.S_ISDIR(st.st_mode)
+        self.is_link = is_link
+        self.size = 0 if self.is_dir else st.st_size
+        self.mtime = st.st_mtime
+        self.atime = st.st_atime
+        self.ctime = st.st_ctime
+        self.mode = st.st_mode
+        self.uid = st.st_uid
+        self.gid = st.st_gid
+        self.item_count = None
+
+    @property
+    def modified(self):
+        return datetime.fromtimestamp(self.mtime)
+
+    @property
+    def accessed(self):
+        return datetime.fromtimestamp(self.atime)
+
+    @property
+    def created(self):
+        return datetime.fromtimestamp(self.ctime)
+
+    @property
+    def is_file(self):
+        """Regular file (not a directory, FIFO, socket or device)"""
+        return stat.S_ISREG(self.mode)
+
+    @property
+    def size_formatted(self):
+        return format_size(self.size)
+
+    @property
+    def permissions(self):
+        return oct(self.mode)[-3:]
+
+    @property
+    def owner(self):
+        return self.uid
+
+    @property
+    def group(self):
+        return self.gid
+
+    # Mapping-style access for code written against the old dicts
+    def __getitem__(self, key):
+        try:
+            value = getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+        if value is None and key == 'item_count':
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"FileInfo({self.path!r}, size={self.size}, is_dir={self.is_dir})"
+
+class StatEngine:
+    """Batched stat() for many paths at once.
+
+    Paths are grouped by parent directory. Where many names share a parent,
+    the directory is read once with scandir(), whose entries already know
+    their type and cache their own stat result; a few scattered paths are
+    stat'ed directly. Either way each path costs about one syscall, against
+    five or more for exists/isdir/getsize/stat chains.
+    """
+
+    def __init__(self, negative_cache=None, scandir_threshold=STAT_SCANDIR_THRESHOLD):
+        self.negative_cache = negative_cache
+        self.scandir_threshold = scandir_threshold
+
+    def stat(self, path):
+        """FileInfo for one path (following symlinks); raises OSError"""
+        st = os.lstat(path) if self.negative_cache is None else self.negative_cache.stat(path, follow_symlinks=False)
+        is_link = stat.S_ISLNK(st.st_mode)
+        if is_link:
+            try:
+                st = os.stat(path)
+            except OSError:
+                pass  # dangling link: describe the link itself
+        return FileInfo(path, st, is_link)
+
+    def from_entry(self, entry):
+        """FileInfo for a scandir() entry, reusing its cached type and stat"""
+        is_link = entry.is_symlink()
+        try:
+            st = entry.stat()
+        except OSError:
+            st = entry.stat(follow_symlinks=False)
+        return FileInfo(entry.path, st, is_link, entry.name)
+
+    def scan_dir(self, directory):
+        """FileInfo for every entry of a directory; raises OSError"""
+        infos = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    infos.append(self.from_entry(entry))
+                except OSError as e:
+                    logger.debug(f"Cannot stat {entry.path}: {e}")
+        return infos
+
+    def stat_many(self, paths):
+        """Return {path: FileInfo} for the paths that exist
+
+        Paths are returned as given; folder paths may end in '/' as the
+        file lists hand them out.
+        """
+        by_parent = defaultdict(list)
+        for path in paths:
+            by_parent[os.path.dirname(os.path.normpath(path))].append(path)
+
+        results = {}
+        for parent, group in by_parent.items():
+            if len(group) >= self.scandir_threshold:
+                wanted = {os.path.basename(os.path.normpath(p)): p for p in group}
+                try:
+                    with os.scandir(parent or '.') as it:
+                        for entry in it:
+                            path = wanted.get(entry.name)
+                            if path is not None:
+                                try:
+                                    info = self.from_entry(entry)
+                                    info.path = path
+                                    results[path] = info
+                                except OSError:
+                                    pass
+                    continue
+                except OSError:
+                    pass  # fall through to single stats
+            for path in group:
+                try:
+                    results[path] = self.stat(path)
+                except OSError:
+                    pass
+        return results
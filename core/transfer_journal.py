@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from ..constants import TRANSFER_JOURNAL_FILE, JOURNAL_SAVE_INTERVAL
+from ..exceptions import OperationCancelledError, VerificationError
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class JournalEntry:
+    """Journal record of one copy or move.
+
+    FileOperations calls start() once the final destination name is known
+    and checkpoint() whenever a file's prefix is safely on disk. A resumed
+    entry already has a target, and resume_point() hands back the last
+    checkpoint for the file that was being written.
+    """
+
+    __slots__ = ('journal', 'id', 'mode', 'source', 'dest', 'verify', 'size', 'source_sig',
+                 'target', 'file', 'offset', 'digest', 'started', 'interrupted', 'resumed')
+
+    def __init__(self, journal, entry_id, mode, source, dest, verify=False, size=0):
+        self.journal = journal
+        self.id = entry_id
+        self.mode = mode
+        self.source = source
+        self.dest = dest
+        self.verify = verify
+        self.size = size
+        self.source_sig = self._signature(source)
+        self.target = None
+        self.file = None
+        self.offset = 0
+        self.digest = None
+        self.started = time.time()
+        self.interrupted = False
+        self.resumed = False
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if os.path.isdir(path):
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    @property
+    def resuming(self):
+        return self.target is not None
+
+    def start(self, target):
+        """Record the destination path chosen for this transfer"""
+        self.target = target
+        # Lost in a crash, the transfer just starts over under a new name
+        self.journal.save()
+
+    def checkpoint(self, path, offset, digest):
+        """Remember that the first offset bytes of path are on disk"""
+        self.file = path
+        self.offset = offset
+        self.digest = digest
+        # A reset must reach the disk; progress can wait for the next save
+        self.journal.save(force=not offset)
+
+    def resume_point(self, path):
+        """(offset, digest) to continue path from, or None if it has no checkpoint"""
+        if path != self.file:
+            return None
+        sig = self._signature(self.source)
+        if self.source_sig is not None and sig != self.source_sig:
+            logger.warning(f"{self.source} changed since it was journaled, starting over")
+            return (0, None)
+        return (self.offset, self.digest)
+
+    def keeps_partial(self, error):
+        """Whether a half-written destination is worth keeping after error"""
+        if isinstance(error, VerificationError):
+            return False
+        if isinstance(error, OperationCancelledError):
+            return self.interrupted
+        return True
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'mode': self.mode, 'source': self.source, 'dest': self.dest,
+            'verify': self.verify, 'size': self.size, 'source_sig': self.source_sig,
+            'target': self.target, 'file': self.file, 'offset': self.offset,
+            'digest': self.digest, 'started': self.started,
+        }
+
+    @classmethod
+    def from_dict(cls, journal, data):
+        entry = cls.__new__(cls)
+        entry.journal = journal
+        entry.id = data['id']
+        entry.mode = data['mode']
+        entry.source = data['source']
+        entry.dest = data['dest']
+        entry.verify = bool(data.get('verify'))
+        entry.size = data.get('size', 0)
+        entry.source_sig = data.get('source_sig')
+        entry.target = data.get('target')
+        entry.file = data.get('file')
+        entry.offset = data.get('offset', 0)
+        entry.digest = data.get('digest')
+        entry.started = data.get('started', 0)
+        entry.interrupted = False
+        entry.resumed = True
+        return entry
+
+class TransferJournal:
+    """Unfinished transfers, kept on flash so they survive a reboot.
+
+    Every queued job has an entry until it completes or the user cancels
+    it. Checkpoints only change memory; the file is rewritten (atomically)
+    at most every save_interval seconds, so a 20 GB copy costs a handful
+    of small flash writes. A selection is journaled with one write by
+    begin_many(), and finished jobs are dropped with throttled saves too. Entries found at load time belong to a previous
+    session and are offered for resuming through leftovers().
+    """
+
+    def __init__(self, journal_file=TRANSFER_JOURNAL_FILE, save_interval=JOURNAL_SAVE_INTERVAL):
+        self.journal_file = journal_file
+        self.save_interval = save_interval
+        self._entries = OrderedDict()
+        self._leftovers = []
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.journal_file, 'r') as f:
+                data = json.load(f)
+            for record in data.get('jobs', []):
+                entry = JournalEntry.from_dict(self, record)
+                self._entries[entry.id] = entry
+                self._leftovers.append(entry)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to read transfer journal {self.journal_file}: {e}")
+
+    def _new_id(self):
+        return f"{int(time.time() * 1000):x}-{len(self._entries)}"
+
+    def begin(self, mode, source, dest, verify=False, size=0):
+        """Create the entry for a newly queued job"""
+        return self.begin_many(mode, [(source, size)], dest, verify)[0]
+
+    def begin_many(self, mode, items, dest, verify=False):
+        """Create entries for a whole selection of (source, size) pairs with one write"""
+        entries = []
+        with self._lock:
+            for source, size in items:
+                entry = JournalEntry(self, self._new_id(), mode, source, dest, verify, size)
+                while entry.id in self._entries:
+                    entry.id += "_"
+                self._entries[entry.id] = entry
+                entries.append(entry)
+        self.save(force=True)
+        return entries
+
+    def leftovers(self):
+        """Entries from an earlier session that have not been resumed or discarded"""
+        with self._lock:
+            return list(self._leftovers)
+
+    def adopt(self, entry):
+        """Take over a leftover entry for resuming"""
+        with self._lock:
+            if entry in self._leftovers:
+                self._leftovers.remove(entry)
+
+    def finish(self, entry):
+        """Forget a completed or cancelled job
+
+        The file is rewritten at most once per save_interval; the scheduler
+        forces a save when its queue runs empty. An entry that outlives a
+        crash this way is resumed as a no-op.
+        """
+        with self._lock:
+            self._entries.pop(entry.id, None)
+            if entry in self._leftovers:
+                self._leftovers.remove(entry)
+        self.save()
+
+    def discard_leftovers(self):
+        with self._lock:
+            for entry in self._leftovers:
+                self._entries.pop(entry.id, None)
+            self._leftovers = []
+        self.save(force=True)
+
+    def save(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_save < self.save_interval:
+                return
+            self._last_save = now
+            records = [entry.to_dict() for entry in self._entries.values()]
+            try:
+                if not records:
+                    if os.path.exists(self.journal_file):
+                        os.remove(self.journal_file)
+                    return
+                tmp_path = self.journal_file + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'version': 1, 'jobs': records}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.journal_file)
+            except Exception as e:
+                logger.warning(f"Failed to write transfer journal {self.journal_file}: {e}")
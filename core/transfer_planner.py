@@ -0,0 +1,147 @@
+import os
+from ..exceptions import DiskSpaceError
+from ..utils.formatters import format_size
+from ..utils.logging_config import get_logger
+from .mounts import mount_table
+
+logger = get_logger(__name__)
+
+FAT32_MAX_FILE_SIZE = 4 * 1024 ** 3 - 1
+
+class TransferPlan:
+    """Totals for a selection and how they compare with the destination"""
+
+    def __init__(self, destination, mode):
+        self.destination = destination
+        self.mode = mode
+        self.total_bytes = 0
+        self.sizes = {}  # bytes per selected source
+        self.needed_bytes = 0
+        self.file_count = 0
+        self.dir_count = 0
+        self.free_bytes = None
+        self.free_inodes = None
+        self.block_size = 0
+        self.same_device = False
+        self.oversized = []
+        self.problems = []
+
+    @property
+    def needed_inodes(self):
+        return self.file_count + self.dir_count
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def summary(self):
+        text = f"{self.file_count} files, {self.dir_count} folders, {format_size(self.total_bytes)}"
+        if self.free_bytes is not None and not self.same_device:
+            text += f"\nNeeded on disk: {format_size(self.needed_bytes)}, free: {format_size(self.free_bytes)}"
+        return text
+
+    def check(self):
+        """Raise DiskSpaceError describing every problem found"""
+        if self.problems:
+            raise DiskSpaceError("\n".join(self.problems))
+        return True
+
+class TransferPlanner:
+    """Pre-flight check for a copy or move of a whole selection.
+
+    Walks the selection once, counting files, folders and bytes, and rounds
+    every file up to the destination's block size. The result is compared
+    with the destination's free bytes and free inodes, and files too big
+    for a FAT32 target are listed, so a transfer that cannot finish is
+    refused before the first byte is written.
+    """
+
+    def plan(self, sources, destination, mode="cp"):
+        dest_dir = destination if os.path.isdir(destination) else os.path.dirname(destination)
+        plan = TransferPlan(dest_dir, mode)
+
+        try:
+            vfs = os.statvfs(dest_dir)
+            plan.block_size = vfs.f_frsize or vfs.f_bsize
+            plan.free_bytes = vfs.f_bavail * vfs.f_frsize
+            # FAT and some network filesystems report no inode counts
+            if vfs.f_files:
+                plan.free_inodes = vfs.f_favail
+            dest_dev = os.stat(dest_dir).st_dev
+        except OSError as e:
+            logger.debug(f"Cannot statvfs {dest_dir}: {e}")
+            dest_dev = None
+
+        fat = mount_table.is_fat_fs(dest_dir, dest_dev)
+        # A move within one filesystem is a rename and needs no space
+        plan.same_device = mode == "mv" and dest_dev is not None and all(
+            self._device(src) == dest_dev for src in sources
+        )
+
+        for src in sources:
+            before = plan.total_bytes
+            self._walk(src, plan, fat)
+            plan.sizes[src] = plan.total_bytes - before
+
+        if plan.same_device:
+            return plan
+
+        if plan.free_bytes is not None and plan.needed_bytes > plan.free_bytes:
+            plan.problems.append(
+                f"Insufficient space! Needed: {format_size(plan.needed_bytes)}, Free: {format_size(plan.free_bytes)}"
+            )
+        if plan.free_inodes is not None and plan.needed_inodes > plan.free_inodes:
+            plan.problems.append(
+                f"Too many files! Needed: {plan.needed_inodes} inodes, Free: {plan.free_inodes}"
+            )
+        if plan.oversized:
+            names = ", ".join(os.path.basename(p) for p in plan.oversized[:3])
+            more = f" and {len(plan.oversized) - 3} more" if len(plan.oversized) > 3 else ""
+            plan.problems.append(f"Files larger than 4 GB cannot be stored on FAT32: {names}{more}")
+        return plan
+
+    def _device(self, path):
+        try:
+            return os.lstat(path).st_dev
+        except OSError:
+            return None
+
+    def _add_file(self, path, size, plan, fat):
+        plan.file_count += 1
+        plan.total_bytes += size
+        if plan.block_size:
+            blocks = -(-size // plan.block_size)
+            plan.needed_bytes += blocks * plan.block_size
+        else:
+            plan.needed_bytes += size
+        if fat and size > FAT32_MAX_FILE_SIZE:
+            plan.oversized.append(path)
+
+    def _walk(self, source, plan, fat):
+        try:
+            st = os.lstat(source)
+        except OSError:
+            return
+        if not os.path.isdir(source) or os.path.islink(source):
+            self._add_file(source, st.st_size, plan, fat)
+            return
+
+        stack = [source]
+        while stack:
+            path = stack.pop()
+            plan.dir_count += 1
+            plan.needed_bytes += plan.block_size
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_symlink():
+                                plan.file_count += 1
+                            else:
+                                self._add_file(entry.path, entry.stat(follow_symlinks=False).st_size, plan, fat)
+                        except OSError:
+                            pass
+            except OSError as e:
+                logger.debug(f"Cannot scan {path}: {e}")
@@ -0,0 +1,326 @@
+import itertools
+import os
+import threading
+import time
+from ..constants import TRANSFER_WORKERS
+from .copy_engine import TransferReport
+from ..exceptions import OperationCancelledError
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class TransferJob:
+    """One queued copy or move"""
+
+    __slots__ = ('id', 'mode', 'source', 'dest', 'size', 'devices', 'state',
+                 'copied', 'error', 'result', 'verify', 'report', 'journal', 'planned', 'cancel_event',
+                 'done_event')
+
+    def __init__(self, job_id, mode, source, dest, size, devices, verify=False, journal=None, planned=False):
+        self.id = job_id
+        self.mode = mode
+        self.source = source
+        self.dest = dest
+        self.size = size
+        self.devices = devices
+        self.state = 'pending'
+        self.copied = 0
+        self.error = None
+        self.result = None
+        self.verify = verify
+        self.report = TransferReport()
+        self.journal = journal
+        # size comes from a TransferPlan whose space check already passed
+        self.planned = planned
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.done_event.is_set()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': 'copy' if self.mode == 'cp' else 'move',
+            'name': os.path.basename(self.source.rstrip('/')),
+            'source': self.source,
+            'dest': self.dest,
+            'state': self.state,
+            'size': self.size,
+            'copied': self.copied,
+            'verify': self.verify,
+            'verified': len(self.report.verified),
+            'mismatched': len(self.report.mismatched),
+        }
+
+class TransferScheduler:
+    """Runs copy/move jobs on a small worker pool, one job per device at a time.
+
+    Every job is tagged with the st_dev of its source and its destination.
+    A worker only starts a job when none of those devices is busy, so
+    transfers between separate disks run in parallel while two transfers
+    touching the same disk are serialised instead of fighting over the
+    heads. Jobs are started in submission order wherever devices allow.
+
+    With a TransferJournal every job is journaled until it completes or is
+    cancelled by the user; jobs cut short by close() or a failure stay in
+    the journal and can be picked up again with resume().
+    """
+
+    def __init__(self, file_ops, max_workers=TRANSFER_WORKERS, journal=None):
+        self.file_ops = file_ops
+        self.max_workers = max_workers
+        self.journal = journal
+        self._pending = []
+        self._running = []
+        self._finished = []
+        self._busy_devices = set()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._paused = False
+        self._closed = False
+        self._ids = itertools.count(1)
+        self._active_since = None
+        self._bytes_at_start = 0
+        self._bytes_done = 0
+
+    def _measure(self, source):
+        try:
+            if os.path.isdir(source) and not os.path.islink(source):
+                return self.file_ops._get_directory_size(source)
+            return os.lstat(source).st_size
+        except OSError:
+            return 0
+
+    def _devices(self, source, dest):
+        devices = set()
+        for path in (source, dest if os.path.isdir(dest) else os.path.dirname(dest)):
+            try:
+                devices.add(os.stat(path).st_dev)
+            except OSError:
+                pass
+        return frozenset(devices)
+
+    def submit(self, mode, source, dest, verify=False):
+        """Queue a copy ("cp") or move ("mv") of source into dest
+
+        With verify=True the copied data is checksummed; the results are
+        collected in job.report.
+        """
+        return self.submit_many(mode, [source], dest, verify)[0]
+
+    def submit_many(self, mode, sources, dest, verify=False, plan=None):
+        """Queue one job per source, journaled together with a single write
+
+        plan is the checked TransferPlan of the selection, if the caller
+        made one; its sizes are used instead of walking every source again
+        and the jobs skip their own disk-space check.
+        """
+        planned = plan is not None
+        sizes = [plan.sizes.get(source, 0) if planned else self._measure(source) for source in sources]
+        entries = [None] * len(sources)
+        if self.journal is not None:
+            entries = self.journal.begin_many(mode, list(zip(sources, sizes)), dest, verify)
+        jobs = [TransferJob(next(self._ids), mode, source, dest, size, self._devices(source, dest),
+                            verify, entry, planned)
+                for source, size, entry in zip(sources, sizes, entries)]
+        return self._enqueue(*jobs)
+
+    def resume(self, entry):
+        """Queue a journal entry left over from an interrupted session"""
+        self.journal.adopt(entry)
+        return self._enqueue(TransferJob(next(self._ids), entry.mode, entry.source, entry.dest, entry.size,
+                                         self._devices(entry.source, entry.dest), entry.verify, entry))[0]
+
+    def _enqueue(self, *jobs):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Transfer scheduler is closed")
+            self._pending.extend(jobs)
+            self._ensure_workers()
+            self._cond.notify_all()
+        return list(jobs)
+
+    def _ensure_workers(self):
+        self._workers = [t for t in self._workers if t.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self):
+        """Pop the first pending job whose devices are all idle"""
+        if self._paused:
+            return None
+        for i, job in enumerate(self._pending):
+            if not (job.devices & self._busy_devices):
+                return self._pending.pop(i)
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._closed:
+                        return
+                    self._cond.wait(1.0)
+                    job = self._next_job()
+                if not self._running:
+                    self._active_since = time.monotonic()
+                    self._bytes_at_start = self._bytes_done
+                self._busy_devices |= job.devices
+                self._running.append(job)
+                job.state = 'running'
+            self._run(job)
+            with self._cond:
+                self._busy_devices -= job.devices
+                self._running.remove(job)
+                self._finished.append(job)
+                if job.state == 'done':
+                    # Same-device moves are renames and report no progress
+                    self._bytes_done += max(0, job.size - job.copied)
+                self._cond.notify_all()
+                idle = not self._pending and not self._running
+            self._finish_journal(job)
+            if idle and self.journal is not None:
+                # Throttled finishes may not have reached the disk yet
+                self.journal.save(force=True)
+            job.done_event.set()
+
+    def _finish_journal(self, job):
+        """Drop the journal entry unless the job is worth resuming later"""
+        entry = job.journal
+        if entry is None:
+            return
+        if job.state == 'done' or (job.state == 'cancelled' and not entry.interrupted):
+            self.journal.finish(entry)
+        else:
+            self.journal.save(force=True)
+
+    def _run(self, job):
+        def progress(copied, total):
+            with self._cond:
+                self._bytes_done += copied - job.copied
+                job.copied = copied
+
+        planned_size = job.size if job.planned else None
+        try:
+            if job.mode == 'cp':
+                job.result = self.file_ops.copy(job.source, job.dest,
+                                                progress_callback=progress,
+                                                cancel_event=job.cancel_event,
+                                                verify=job.verify, report=job.report,
+                                                journal=job.journal, planned_size=planned_size)
+            else:
+                job.result = self.file_ops.move(job.source, job.dest,
+                                                progress_callback=progress,
+                                                cancel_event=job.cancel_event,
+                                                verify=job.verify, report=job.report,
+                                                journal=job.journal, planned_size=planned_size)
+            job.state = 'done'
+        except OperationCancelledError:
+            job.state = 'cancelled'
+        except Exception as e:
+            logger.error(f"Transfer of {job.source} failed: {e}")
+            job.error = e
+            job.state = 'failed'
+
+    def wait(self, jobs, timeout=None):
+        """Block until all jobs are finished; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in jobs:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not job.done_event.wait(remaining):
+                return False
+        return True
+
+    def cancel(self, jobs=None):
+        """Cancel the given jobs (default: all queued and running jobs)"""
+        with self._cond:
+            targets = list(self._pending) + list(self._running) if jobs is None else list(jobs)
+            for job in targets:
+                job.cancel_event.set()
+                if job in self._pending:
+                    self._pending.remove(job)
+                    job.state = 'cancelled'
+                    self._finished.append(job)
+                    self._finish_journal(job)
+                    job.done_event.set()
+            self._cond.notify_all()
+        if self.journal is not None:
+            self.journal.save(force=True)
+
+    def start(self):
+        """Resume starting queued jobs"""
+        with self._cond:
+            self._paused = False
+            if self._pending:
+                self._ensure_workers()
+            self._cond.notify_all()
+
+    def pause(self):
+        """Stop starting new jobs; running jobs are finished"""
+        with self._cond:
+            self._paused = True
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def get_queue(self):
+        """Running and pending jobs as dicts, in order"""
+        with self._cond:
+            return [job.to_dict() for job in self._running + self._pending]
+
+    def clear_queue(self):
+        """Drop pending jobs and forget finished ones"""
+        with self._cond:
+            for job in self._pending:
+                job.state = 'cancelled'
+                self._finish_journal(job)
+                job.done_event.set()
+            self._pending = []
+            self._finished = []
+        if self.journal is not None:
+            self.journal.save(force=True)
+
+    def get_stats(self):
+        with self._cond:
+            jobs = self._finished + self._running + self._pending
+            completed = sum(1 for j in self._finished if j.state == 'done')
+            failed = sum(1 for j in self._finished if j.state == 'failed')
+            cancelled = sum(1 for j in self._finished if j.state == 'cancelled')
+            remaining = sum(max(0, j.size - j.copied) for j in self._running + self._pending)
+            throughput = 0.0
+            if self._running and self._active_since is not None:
+                elapsed = time.monotonic() - self._active_since
+                if elapsed > 0:
+                    throughput = (self._bytes_done - self._bytes_at_start) / elapsed
+            return {
+                'total': len(jobs),
+                'completed': completed,
+                'failed': failed,
+                'cancelled': cancelled,
+                'running': len(self._running),
+                'pending': len(self._pending),
+                'paused': self._paused,
+                'bytes_total': sum(j.size for j in jobs),
+                'bytes_done': sum(j.size if j.state == 'done' else j.copied for j in jobs),
+                'throughput': throughput,
+                'eta': remaining / throughput if throughput > 0 else None,
+                'verified': sum(len(j.report.verified) for j in jobs),
+                'mismatched': sum(len(j.report.mismatched) for j in jobs),
+            }
+
+    def close(self):
+        """Cancel everything and let the workers exit; journaled jobs stay resumable"""
+        with self._cond:
+            for job in self._pending + self._running:
+                if job.journal is not None:
+                    job.journal.interrupted = True
+        self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
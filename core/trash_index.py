@@ -0,0 +1,219 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_PREFIX = ".pilotfs_index"
+INDEX_FILE_NAME = INDEX_PREFIX + ".jsonl"
+
+TrashEntry = namedtuple('TrashEntry', ['path', 'name', 'original_path', 'size', 'deleted_at', 'device', 'is_dir'])
+
+class TrashIndex:
+    """Append-only catalogue of one trash directory.
+
+    Every trashed item gets an "add" record with its original path, size,
+    deletion time and device; restoring or purging appends a "del" record.
+    The file lives inside the trash directory, so it goes wherever the
+    device goes. Listing, totals and age-based purges are answered from the
+    index; the directory itself is only re-listed (never stat'ed entry by
+    entry) when its mtime shows that something changed behind our back.
+
+    Items found there without a record are adopted with the size of a
+    file, but a folder's size is None (unknown) until set_size() records
+    it; totals count unknown sizes as 0.
+    """
+
+    COMPACT_MIN_RECORDS = 200
+
+    def __init__(self, trash_dir):
+        self.trash_dir = trash_dir
+        self.index_file = os.path.join(trash_dir, INDEX_FILE_NAME)
+        self._entries = None
+        self._records = 0
+        self._dir_mtime_ns = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        entries = OrderedDict()
+        records = 0
+        complete = 0  # bytes up to the end of the last whole line
+        try:
+            with open(self.index_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    complete += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    records += 1
+                    name = record.get('n')
+                    if record.get('op') == 'del':
+                        entries.pop(name, None)
+                    elif name:
+                        entries[name] = self._entry(record)
+            if complete < os.path.getsize(self.index_file):
+                # Torn write at the end: cut it off so the next append
+                # starts on a line of its own
+                os.truncate(self.index_file, complete)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to read trash index {self.index_file}: {e}")
+        self._entries = entries
+        self._records = records
+
+    def _entry(self, record):
+        size = record.get('s')
+        if not size and record.get('o') is None and record.get('d') is None:
+            # Adopted by an earlier version, which stored 0 for "unknown"
+            size = None
+        return TrashEntry(
+            os.path.join(self.trash_dir, record['n']),
+            record['n'],
+            record.get('o'),
+            size,
+            record.get('t', 0),
+            record.get('d'),
+            bool(record.get('dir')),
+        )
+
+    def _append(self, record):
+        try:
+            with open(self.index_file, 'a') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            self._records += 1
+        except Exception as e:
+            logger.warning(f"Failed to write trash index {self.index_file}: {e}")
+
+    def _ensure_synced(self):
+        """Load the index and pick up items added or removed outside PilotFS"""
+        if self._entries is None:
+            self._load()
+        try:
+            mtime_ns = os.stat(self.trash_dir).st_mtime_ns
+        except OSError:
+            self._entries.clear()
+            return
+        if mtime_ns == self._dir_mtime_ns:
+            return
+
+        try:
+            names = set(os.listdir(self.trash_dir))
+        except OSError:
+            return
+        names = {n for n in names if not n.startswith(INDEX_PREFIX)}
+        for name in [n for n in self._entries if n not in names]:
+            del self._entries[name]
+            self._append({'op': 'del', 'n': name})
+        for name in sorted(names - set(self._entries)):
+            # Trashed by an older version or another tool: no original path.
+            # One lstat() gives a file's size; a folder's is measured later
+            try:
+                st = os.lstat(os.path.join(self.trash_dir, name))
+            except OSError:
+                continue
+            is_dir = stat.S_ISDIR(st.st_mode)
+            self._add_locked(name, None, None if is_dir else st.st_size, None, st.st_dev, is_dir)
+        # Our own index writes change the directory mtime; read it last
+        self._dir_mtime_ns = os.stat(self.trash_dir).st_mtime_ns
+        self._maybe_compact()
+
+    def _add_locked(self, name, original_path, size, deleted_at, device, is_dir):
+        record = {'op': 'add', 'n': name, 'o': original_path, 's': size,
+                  't': deleted_at if deleted_at is not None else time.time(),
+                  'd': device, 'dir': bool(is_dir)}
+        self._entries[name] = self._entry(record)
+        self._append(record)
+
+    def add(self, name, original_path, size=0, device=None, is_dir=False):
+        """Record an item just moved into the trash directory"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self._add_locked(name, original_path, size, None, device, is_dir)
+            # The remembered mtime is left alone: the rename that brought the
+            # item here changed it, and so may something else since the last
+            # sync. The next read re-lists the directory once and finds this
+            # item already indexed.
+
+    def set_size(self, name, size):
+        """Record the measured size of an item adopted without one"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            device = entry.device
+            if device is None:
+                try:
+                    device = os.lstat(entry.path).st_dev
+                except OSError:
+                    return
+            self._entries[name] = entry._replace(size=size, device=device)
+            self._append({'op': 'add', 'n': name, 'o': entry.original_path, 's': size,
+                          't': entry.deleted_at, 'd': device, 'dir': entry.is_dir})
+
+    def remove(self, name):
+        """Forget an item that was restored or purged"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if self._entries.pop(name, None) is not None:
+                self._append({'op': 'del', 'n': name})
+            self._maybe_compact()
+
+    def get(self, name):
+        with self._lock:
+            self._ensure_synced()
+            return self._entries.get(name)
+
+    def entries(self):
+        """All items, oldest first"""
+        with self._lock:
+            self._ensure_synced()
+            return list(self._entries.values())
+
+    def total_size(self):
+        return sum(entry.size or 0 for entry in self.entries())
+
+    def older_than(self, seconds):
+        cutoff = time.time() - seconds
+        return [entry for entry in self.entries() if entry.deleted_at < cutoff]
+
+    def clear(self):
+        """Forget everything (after the directory was emptied)"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._records = 0
+            self._dir_mtime_ns = None
+            try:
+                os.remove(self.index_file)
+            except OSError:
+                pass
+
+    def _maybe_compact(self):
+        live = len(self._entries)
+        if self._records < self.COMPACT_MIN_RECORDS or self._records < 2 * live:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.trash_dir, prefix=INDEX_PREFIX + '_')
+            with os.fdopen(fd, 'w') as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps({'op': 'add', 'n': entry.name, 'o': entry.original_path,
+                                        's': entry.size, 't': entry.deleted_at, 'd': entry.device,
+                                        'dir': entry.is_dir}, separators=(',', ':')) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.index_file)
+            self._records = live
+        except Exception as e:
+            logger.warning(f"Failed to compact trash index {self.index_file}: {e}")
@@ -0,0 +1,127 @@
+import errno
+import os
+import threading
+from collections import OrderedDict
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class _Snapshot:
+    __slots__ = ('names', 'mtime_ns', 'counters')
+
+    def __init__(self, names, mtime_ns):
+        self.names = names
+        self.mtime_ns = mtime_ns
+        self.counters = {}
+
+class UniqueNameAllocator:
+    """Hands out free "name", "name_1", "name_2"... paths in a directory.
+
+    A directory is listed once with scandir() and the set of names is
+    reused for every later request, revalidated by the directory's mtime.
+    Names created here, and paths PilotFS reports through note(), are
+    added to the set and the new mtime remembered, and the next counter for each base name is kept, so pasting hundreds
+    of same-named files costs one listing instead of a stat per candidate.
+
+    A candidate is claimed atomically: O_CREAT|O_EXCL for files, mkdir()
+    for directories, symlink() for links. If another writer got there
+    first the name is marked taken and the next one is tried, so two
+    transfers can never end up writing to the same path.
+    """
+
+    MAX_DIRS = 16
+
+    def __init__(self, max_dirs=MAX_DIRS):
+        self.max_dirs = max_dirs
+        self._dirs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _snapshot(self, directory):
+        mtime_ns = os.stat(directory).st_mtime_ns
+        snapshot = self._dirs.get(directory)
+        if snapshot is None or snapshot.mtime_ns != mtime_ns:
+            with os.scandir(directory) as it:
+                snapshot = _Snapshot({entry.name for entry in it}, mtime_ns)
+            self._dirs[directory] = snapshot
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+        self._dirs.move_to_end(directory)
+        return snapshot
+
+    def _candidates(self, snapshot, name):
+        yield name
+        stem, ext = os.path.splitext(name)
+        counter = snapshot.counters.get(name, 1)
+        while True:
+            snapshot.counters[name] = counter + 1
+            yield f"{stem}_{counter}{ext}"
+            counter += 1
+
+    def _claim(self, path, kind, link_target):
+        if kind == 'dir':
+            os.mkdir(path)
+        elif kind == 'symlink':
+            os.symlink(link_target, path)
+        else:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+
+    def allocate(self, directory, name, kind='file', link_target=None):
+        """Claim a free variant of name in directory and return its path
+
+        kind is 'file' (an empty file is created), 'dir' or 'symlink'
+        (pointing at link_target). The caller then writes to, renames onto
+        or fills the claimed path.
+        """
+        directory = os.path.normpath(directory)
+        with self._lock:
+            snapshot = self._snapshot(directory)
+            for candidate in self._candidates(snapshot, name):
+                if candidate in snapshot.names:
+                    continue
+                path = os.path.join(directory, candidate)
+                try:
+                    self._claim(path, kind, link_target)
+                except OSError as e:
+                    if e.errno != errno.EEXIST:
+                        raise
+                    logger.debug(f"{path} appeared after the directory was listed")
+                    snapshot.names.add(candidate)
+                    continue
+                snapshot.names.add(candidate)
+                try:
+                    snapshot.mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    pass
+                return path
+
+    def note(self, path):
+        """Record that PilotFS itself created, filled or removed path
+
+        The snapshot of its directory takes the name in or out, depending
+        on whether path exists now, and the directory's new mtime, so a
+        rename onto a claimed name or a removed placeholder does not make
+        the next allocate() there list the directory again.
+        """
+        directory, name = os.path.split(os.path.normpath(path))
+        with self._lock:
+            snapshot = self._dirs.get(directory)
+            if snapshot is None:
+                return
+            if os.path.lexists(path):
+                snapshot.names.add(name)
+            elif name in snapshot.names:
+                snapshot.names.discard(name)
+                # Let a released "name_N" be handed out again
+                snapshot.counters.clear()
+            try:
+                snapshot.mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                pass
+
+    def forget(self, directory):
+        with self._lock:
+            self._dirs.pop(os.path.normpath(directory), None)
+
+    def clear(self):
+        with self._lock:
+            self._dirs.clear()
@@ -0,0 +1,251 @@
+import os
+import queue
+import threading
+from collections import deque
+from ..constants import TRASH_DIR_NAME, WALK_WORKERS, WALK_WORKERS_DEFAULT
+from ..utils.logging_config import get_logger
+from .mounts import mount_table
+
+logger = get_logger(__name__)
+
+def entry_size(entry):
+    """Size of a scandir() entry (following symlinks), or None if it is gone"""
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return None
+
+class TreeWalker:
+    """os.walk() replacement built on scandir() that hands out DirEntry objects.
+
+    walk() yields (dirpath, dirs, files) like os.walk, but dirs and files
+    are lists of os.DirEntry, so callers get the type from the directory
+    read itself and the size from entry.stat() (cached on the entry)
+    instead of an exists()/getsize() pair per file. Top-down, removing an
+    entry from dirs keeps the walk out of it.
+
+    Pruning:
+      skip_names      directory names never entered (default: the trash)
+      skip_hidden     leave out directories starting with '.'
+      one_filesystem  stay on the filesystem of the top directory
+      max_depth       0 lists only top, 1 also its subdirectories, ...
+
+    Symlinked directories are listed in dirs but only entered with
+    follow_symlinks; every directory entered is then remembered by
+    (st_dev, st_ino), so a link pointing back up the tree is walked once.
+    stop_event (a threading.Event) is checked before each directory.
+    """
+
+    def __init__(self, skip_names=(TRASH_DIR_NAME,), skip_hidden=False, one_filesystem=False,
+                 max_depth=None, follow_symlinks=False, stop_event=None):
+        self.skip_names = frozenset(skip_names)
+        self.skip_hidden = skip_hidden
+        self.one_filesystem = one_filesystem
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+        self.stop_event = stop_event
+
+    def walk(self, top, topdown=True):
+        try:
+            top_st = os.stat(top)
+        except OSError as e:
+            logger.debug(f"Cannot walk {top}: {e}")
+            return
+        visited = {(top_st.st_dev, top_st.st_ino)} if self.follow_symlinks else None
+
+        # (path, depth, listing); a listing is set when a bottom-up
+        # directory comes back round after its subdirectories
+        stack = [(top, 0, None)]
+        while stack:
+            if self.stop_event is not None and self.stop_event.is_set():
+                return
+            path, depth, listing = stack.pop()
+            if listing is not None:
+                yield (path,) + listing
+                continue
+
+            dirs, files = self._scan(path)
+            if topdown:
+                yield path, dirs, files
+            else:
+                stack.append((path, depth, (dirs, files)))
+
+            if self.max_depth is not None and depth >= self.max_depth:
+                continue
+            for entry in reversed(dirs):
+                if self._enters(entry, top_st.st_dev, visited):
+                    stack.append((entry.path, depth + 1, None))
+
+    def files(self, top):
+        """Every file below top as a DirEntry"""
+        for _root, _dirs, files in self.walk(top):
+            yield from files
+
+    def _scan(self, path):
+        dirs, files = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry)
+                    elif entry.name in self.skip_names or (self.skip_hidden and entry.name.startswith('.')):
+                        continue
+                    else:
+                        dirs.append(entry)
+        except OSError as e:
+            logger.debug(f"Cannot list {path}: {e}")
+        return dirs, files
+
+    def _enters(self, entry, top_dev, visited):
+        if not self.follow_symlinks and entry.is_symlink():
+            return False
+        if not self.one_filesystem and visited is None:
+            return True
+        try:
+            st = entry.stat()
+        except OSError:
+            return False
+        if self.one_filesystem and st.st_dev != top_dev:
+            return False
+        if visited is not None:
+            key = (st.st_dev, st.st_ino)
+            if key in visited:
+                logger.debug(f"Not following {entry.path} again (symlink loop)")
+                return False
+            visited.add(key)
+        return True
+
+class _StealingPool:
+    """Threads running scan() on directories from per-thread deques.
+
+    A thread takes its own newest directory first (staying deep in its
+    subtree) and, when its deque is empty, steals the oldest directory of
+    another thread, which is the one closest to the top and so likely the
+    largest piece of remaining work. Results go to one queue.
+    """
+
+    def __init__(self, workers, scan):
+        self.scan = scan
+        self.deques = [deque() for _ in range(workers)]
+        self.results = queue.Queue()
+        self._cond = threading.Condition()
+        self._queued = 0
+        self._closed = False
+        for index in range(workers):
+            threading.Thread(target=self._work, args=(index,), daemon=True).start()
+
+    def submit(self, index, item):
+        """Queue item on thread index's deque"""
+        self.deques[index].append(item)
+        with self._cond:
+            self._queued += 1
+            self._cond.notify()
+
+    def _take(self, index):
+        try:
+            return self.deques[index].pop()
+        except IndexError:
+            pass
+        count = len(self.deques)
+        for offset in range(1, count):
+            try:
+                return self.deques[(index + offset) % count].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _work(self, index):
+        while True:
+            item = self._take(index)
+            if item is None:
+                with self._cond:
+                    while not self._closed and self._queued <= 0:
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                continue
+            with self._cond:
+                self._queued -= 1
+                if self._closed:
+                    return
+            try:
+                listing = self.scan(item[0])
+            except Exception as e:
+                logger.error(f"Error listing {item[0]}: {e}")
+                listing = ([], [])
+            self.results.put((item, index, listing))
+
+    def close(self):
+        # A thread stuck on a dead share finishes its listing on its own
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+class ParallelTreeWalker(TreeWalker):
+    """TreeWalker that lists up to workers directories at the same time.
+
+    On network shares each scandir() is a round trip, so walking one
+    directory at a time leaves the link idle; here a work-stealing pool of
+    threads lists directories while the caller works through earlier ones.
+    Directories come out in the order their listings finish, not depth
+    first. Subdirectories are only queued after the caller has seen the
+    parent, so removing entries from dirs still prunes the walk, and all
+    pruning and loop checks stay on the caller's thread. Bottom-up walks
+    fall back to the sequential walker.
+    """
+
+    POLL_SECONDS = 0.2  # how often a waiting walk looks at stop_event
+
+    def __init__(self, workers=4, **kwargs):
+        TreeWalker.__init__(self, **kwargs)
+        self.workers = workers
+
+    def walk(self, top, topdown=True):
+        if not topdown or self.workers <= 1:
+            yield from TreeWalker.walk(self, top, topdown)
+            return
+        try:
+            top_st = os.stat(top)
+        except OSError as e:
+            logger.debug(f"Cannot walk {top}: {e}")
+            return
+        visited = {(top_st.st_dev, top_st.st_ino)} if self.follow_symlinks else None
+
+        pool = _StealingPool(self.workers, self._scan)
+        try:
+            pool.submit(0, (top, 0))
+            pending = 1
+            while pending:
+                if self.stop_event is not None and self.stop_event.is_set():
+                    return
+                try:
+                    (path, depth), owner, (dirs, files) = pool.results.get(timeout=self.POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                pending -= 1
+                yield path, dirs, files
+
+                if self.max_depth is not None and depth >= self.max_depth:
+                    continue
+                for entry in dirs:
+                    if self._enters(entry, top_st.st_dev, visited):
+                        # Children go to the thread that listed the parent; idle ones steal
+                        pool.submit(owner, (entry.path, depth + 1))
+                        pending += 1
+        finally:
+            pool.close()
+
+def walker_for(directory, **kwargs):
+    """TreeWalker for directory, parallel where its filesystem type gains from it
+
+    The number of threads comes from WALK_WORKERS by the type of the mount
+    holding directory; kwargs are passed on to the walker.
+    """
+    workers = WALK_WORKERS.get(mount_table.get_fstype(directory), WALK_WORKERS_DEFAULT)
+    if workers > 1:
+        return ParallelTreeWalker(workers, **kwargs)
+    return TreeWalker(**kwargs)
@@ -36,4 +36,12 @@ class ArchiveError(PilotFSError):
 
 class MediaPlaybackError(PilotFSError):
     """Media playback failed"""
-    pass
\ No newline at end of file
+    pass
+
+class OperationCancelledError(PilotFSError):
+    """Operation cancelled by the user"""
+    pass
+
+class VerificationError(PilotFSError):
+    """Copied data does not match its source"""
+    pass
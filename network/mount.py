@@ -6,13 +6,31 @@ import shlex
 from ..constants import DEFAULT_CIFS_VERSION, DEFAULT_TIMEOUT
 from ..exceptions import NetworkError, RemoteConnectionError
 from ..utils.validators import validate_ip, validate_hostname, sanitize_string
+from ..utils.logging_config import get_logger
+from ..core.mounts import mount_table
 import re
 
+logger = get_logger(__name__)
+
 class MountManager:
     def __init__(self, config):
         self.config = config
         self.timeout = DEFAULT_TIMEOUT
         self.mount_points = {}
+        self.mount_listeners = []
+    
+    def add_mount_listener(self, callback):
+        """Call callback(mount_point) whenever a share is mounted or unmounted"""
+        if callback not in self.mount_listeners:
+            self.mount_listeners.append(callback)
+    
+    def _notify_mount_change(self, mount_point):
+        mount_table.reload()
+        for callback in list(self.mount_listeners):
+            try:
+                callback(mount_point)
+            except Exception as e:
+                logger.error(f"Mount listener error: {e}")
     
     def mount_cifs(self, server, share, mount_point, username="", password="", domain="", options=None):
         """Mount CIFS/SMB share"""
@@ -98,6 +116,7 @@ class MountManager:
                     'share': share,
                     'options': mount_options
                 }
+                self._notify_mount_change(mount_point)
                 return True, f"Mounted //{server}/{share} to {mount_point}"
             else:
                 error = result.stderr.strip() or result.stdout.strip()
@@ -143,6 +162,7 @@ class MountManager:
                             'share': share,
                             'options': new_options
                         }
+                        self._notify_mount_change(mount_point)
                         return True, f"Mounted with vers={version}"
                 
                 return False, f"Mount failed: {error[:200]}"
@@ -184,6 +204,7 @@ class MountManager:
             if result.returncode == 0:
                 if mount_point in self.mount_points:
                     del self.mount_points[mount_point]
+                self._notify_mount_change(mount_point)
                 return True, f"Unmounted {mount_point}"
             else:
                 error = result.stderr.strip() or result.stdout.strip()
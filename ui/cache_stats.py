@@ -0,0 +1,86 @@
+from Screens.Screen import Screen
+from Components.ActionMap import ActionMap
+from Components.Label import Label
+from enigma import getDesktop, eTimer
+
+from ..utils.formatters import format_size
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class CacheStatsScreen(Screen):
+    """Live cache statistics, refreshed every second"""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, session, cache, exporter=None):
+        Screen.__init__(self, session)
+        self.cache = cache
+        self.exporter = exporter
+
+        w, h = getDesktop(0).size().width(), getDesktop(0).size().height()
+        panel_w, panel_h = min(w - 100, 1000), min(h - 100, 640)
+        pos_x, pos_y = (w - panel_w) // 2, (h - panel_h) // 2
+
+        self.skin = f"""
+        <screen name="CacheStatsScreen" position="{pos_x},{pos_y}" size="{panel_w},{panel_h}" title="Cache Statistics" backgroundColor="#1a1a1a">
+            <eLabel position="0,0" size="{panel_w},50" backgroundColor="#0055aa" />
+            <eLabel text="📈 Cache Statistics" position="20,5" size="{panel_w - 40},40" font="Regular;28" valign="center" transparent="1" foregroundColor="#ffffff" />
+            <widget name="stats" position="20,65" size="{panel_w - 40},{panel_h - 120}" font="Regular;20" foregroundColor="#ffffff" transparent="1" />
+            <widget name="help" position="20,{panel_h - 45}" size="{panel_w - 40},30" font="Regular;18" foregroundColor="#aaaaaa" transparent="1" />
+        </screen>"""
+
+        self["stats"] = Label("")
+        self["help"] = Label("OK:Write JSON  YELLOW:Reset  EXIT:Close")
+
+        self["actions"] = ActionMap(["OkCancelActions", "ColorActions"], {
+            "ok": self.export_now,
+            "yellow": self.reset_stats,
+            "cancel": self.close,
+        }, -1)
+
+        self.refresh_timer = eTimer()
+        self.refresh_timer.callback.append(self.update_stats)
+        self.onLayoutFinish.append(self.start_refresh)
+        self.onClose.append(self.refresh_timer.stop)
+
+    def start_refresh(self):
+        self.update_stats()
+        self.refresh_timer.start(self.REFRESH_MS)
+
+    def update_stats(self):
+        """Render the current statistics"""
+        try:
+            stats = self.cache.get_stats()
+            max_bytes = stats.get('max_bytes')
+            text = f"Entries: {stats['size']} / {stats['max_size']}"
+            if stats.get('shards'):
+                text += f"   (shards: {stats['shards']})"
+            text += "\n"
+            text += f"Memory: {format_size(stats['bytes'])}"
+            if max_bytes:
+                text += f" / {format_size(max_bytes)}"
+            text += "\n\n"
+            text += f"Hits: {stats['hits']}   Misses: {stats['misses']}   Hit rate: {stats['hit_rate']:.1f}%\n"
+            text += f"Inserts: {stats['inserts']} ({stats['insert_rate']:.2f}/s)   Evictions: {stats['evictions']}\n"
+            text += f"Mean lookup: {stats['mean_lookup_us']:.1f} µs\n"
+
+            if stats['prefixes']:
+                text += "\nBy key prefix:\n"
+                for prefix, counts in stats['prefixes'].items():
+                    text += f"  {prefix}: {counts['hits']} hits / {counts['misses']} misses ({counts['hit_rate']:.1f}%)\n"
+
+            self["stats"].setText(text)
+        except Exception as e:
+            logger.error(f"Error updating cache stats: {e}")
+            self["stats"].setText(f"Statistics unavailable: {e}")
+
+    def export_now(self):
+        if self.exporter is not None and self.exporter.export():
+            self["help"].setText(f"Written to {self.exporter.stats_file}")
+        else:
+            self["help"].setText("JSON export unavailable")
+
+    def reset_stats(self):
+        self.cache.reset_stats()
+        self.update_stats()
@@ -189,7 +189,8 @@ class ContextMenuHandler:
             elif action == "disk_usage":
                 self.main.dialogs.show_disk_usage(current_dir, self.file_ops)
             elif action == "search_here":
-                self.main.dialogs.show_search_dialog(current_dir, self.main.search_engine)
+                self.main.dialogs.show_search_dialog(current_dir, self.main.search_engine,
+                                                    self.main.show_search_result)
             elif action == "new_file":
                 self.main.dialogs.show_create_file_dialog(current_dir, self.file_ops, self.main.update_ui)
             elif action == "new_folder":
@@ -322,6 +323,10 @@ class ContextMenuHandler:
     def show_multi_selection_context_menu(self, marked_items):
         """Show context menu for multiple selected items"""
         try:
+            # One batched stat for the whole selection; folders count as 0
+            infos = self.file_ops.stat_many([item[0][0] for item in marked_items])
+            total = sum(info.size for info in infos.values())
+            
             menu_items = [
                 (" <-- Back", "back"),
                 (" <-- Back", "back"),
@@ -338,7 +343,7 @@ class ContextMenuHandler:
             self.main.session.openWithCallback(
                 lambda choice: self.smart_callback(choice, self.handle_multi_selection_menu, marked_items),
                 ChoiceBox,
-                title=f"📋 {len(marked_items)} Selected Items",
+                title=f"📋 {len(marked_items)} Selected Items ({format_size(total)})",
                 list=menu_items
             )
         except Exception as e:
@@ -421,6 +426,7 @@ class ContextMenuHandler:
                     ("🔧 Repair Environment", "repair"),
                     ("🔗 Repair Picon", "picon"),
                     ("📋 View Task Queue", "queue"),
+                    ("📈 Cache Statistics", "cachestats"),
                     ("📄 View Log", "log"),
                     
                     ("═══ SETTINGS ═══", None),
@@ -451,6 +457,7 @@ class ContextMenuHandler:
                     ("🔧 Repair Environment", "repair"),
                     ("🔗 Repair Picon", "picon"),
                     ("📋 View Task Queue", "queue"),
+                    ("📈 Cache Statistics", "cachestats"),
                     ("📄 View Log", "log"),
                     ("⚙️ Plugin Settings", "cfg"),
                 ]
@@ -532,7 +539,8 @@ class ContextMenuHandler:
                 self.main.preview_file()
             elif mode == "search":
                 self.main.dialogs.show_search_dialog(self.main.active_pane.getCurrentDirectory(), 
-                                                    self.main.search_engine)
+                                                    self.main.search_engine,
+                                                    self.main.show_search_result)
             elif mode == "archive":
                 files = self.main.get_selected_files()
                 if files:
@@ -552,7 +560,8 @@ class ContextMenuHandler:
                     # Return to tools menu after message
                     self._return_to_tools_after_delay(2)
             elif mode == "trash":
-                self.main.dialogs.show_trash_manager(self.file_ops, self.main.active_pane, self.main.update_ui)
+                self.main.dialogs.show_trash_manager(self.file_ops, self.main.active_pane, self.main.update_ui,
+                                                     self.main.run_operation)
             elif mode == "mount":
                 self.main.dialogs.show_mount_dialog(self.main.active_pane.getCurrentDirectory(), 
                                                    self.main.mount_mgr, self.main.active_pane, self.main.update_ui)
@@ -594,6 +603,12 @@ class ContextMenuHandler:
                 self.main.dialogs.show_disk_usage(self.main.active_pane.getCurrentDirectory(), self.file_ops)
             elif mode == "log":
                 self.main.dialogs.show_log_viewer()
+            elif mode == "cachestats":
+                if self.main.cache is not None:
+                    from .cache_stats import CacheStatsScreen
+                    self.main.session.open(CacheStatsScreen, self.main.cache, self.main.cache_stats_exporter)
+                else:
+                    self.dialogs.show_message("Cache is disabled in Plugin Settings", type="info")
             elif mode == "repair":
                 # Set submenu level and show repair menu
                 self.current_menu_level = 1
@@ -602,7 +617,9 @@ class ContextMenuHandler:
                 self.main.dialogs.show_content_search_dialog(self.main.active_pane.getCurrentDirectory(), 
                                                             self.main.search_engine)
             elif mode == "checksum":
-                files = [f for f in self.main.get_selected_files() if os.path.isfile(f)]
+                selected = self.main.get_selected_files()
+                infos = self.file_ops.stat_many(selected)
+                files = [f for f in selected if f in infos and infos[f].is_file]
                 if files:
                     self.main.dialogs.show_checksum_dialog(files, self.file_ops)
                 else:
@@ -610,16 +627,7 @@ class ContextMenuHandler:
                     # Return to tools menu after message
                     self._return_to_tools_after_delay(2)
             elif mode == "queue":
-                # FIXED: Create a proper queue manager stub
-                class QueueManagerStub:
-                    def get_queue(self):
-                        return []
-                    def get_stats(self):
-                        return {"total": 0, "completed": 0, "failed": 0, "pending": 0}
-                    def clear_queue(self):
-                        pass
-                
-                self.main.dialogs.show_queue_dialog(QueueManagerStub())
+                self.main.dialogs.show_queue_dialog(self.main.transfer_scheduler)
             elif mode == "remote":
                 self.main.dialogs.show_remote_access_dialog(self.main.remote_mgr, self.main.mount_mgr, 
                                                            self.main.active_pane, self.main.update_ui)
@@ -1211,19 +1219,7 @@ class ContextMenuHandler:
         if not confirmed:
             return
         
-        try:
-            self.file_ops.delete(item_path)
-            self._force_refresh_pane()
-            
-            if self.config.plugins.pilotfs.trash_enabled.value == "yes":
-                msg = f"✅ Moved to trash: {item_name}"
-            else:
-                msg = f"✅ Permanently deleted: {item_name}"
-            
-            self.main.dialogs.show_message(msg, type="info")
-        except Exception as e:
-            logger.error(f"Error executing item deletion: {e}")
-            self.main.dialogs.show_message(f"Delete failed:\n{e}", type="error")
+        self.main.start_deletion([item_path])
     
     def delete_multiple_items(self, file_paths):
         """Delete multiple selected items"""
@@ -1243,29 +1239,7 @@ class ContextMenuHandler:
         if not confirmed:
             return
         
-        try:
-            success = 0
-            errors = []
-            
-            for item_path in file_paths:
-                try:
-                    self.file_ops.delete(item_path)
-                    success += 1
-                except Exception as e:
-                    errors.append(f"{os.path.basename(item_path)}: {str(e)[:30]}")
-            
-            msg = f"✅ Deleted: {success} items\n"
-            if errors:
-                msg += f"\n❌ Failed: {len(errors)}\n"
-                msg += "\n".join(errors[:3])
-                if len(errors) > 3:
-                    msg += f"\n... and {len(errors) - 3} more"
-            
-            self._force_refresh_pane()
-            self.main.dialogs.show_message(msg, type="info")
-        except Exception as e:
-            logger.error(f"Error executing multiple deletion: {e}")
-            self.main.dialogs.show_message(f"Delete multiple failed:\n{e}", type="error")
+        self.main.start_deletion(file_paths)
     
     def copy_item(self, item_path):
         """Copy item to clipboard"""
@@ -11,7 +11,9 @@ import glob
 
 from ..utils.formatters import format_size, get_file_icon
 from ..utils.logging_config import get_logger
-from ..constants import TRASH_PATH, LOG_FILE
+from ..constants import LOG_FILE, TRASH_PURGE_DAYS
+from ..core.walker import TreeWalker, entry_size
+from .search_results import SearchResultsScreen
 
 logger = get_logger(__name__)
 
@@ -202,11 +204,13 @@ class Dialogs:
             logger.error(f"Error showing create folder dialog: {e}")
             self.show_message(f"Create folder error: {e}", type="error")
     
-    def show_transfer_dialog(self, files, destination, callback):
+    def show_transfer_dialog(self, files, destination, callback, file_ops):
         """Show transfer dialog"""
         try:
-            num_files = len([x for x in files if os.path.isfile(x)])
-            num_dirs = len([x for x in files if os.path.isdir(x)])
+            # One batched stat for the whole selection
+            infos = file_ops.stat_many(files).values()
+            num_files = len([info for info in infos if info.is_file])
+            num_dirs = len([info for info in infos if info.is_dir])
             
             choices = [
                 (f"Copy {len(files)} items ({num_dirs} folders, {num_files} files)", "cp"),
@@ -391,42 +395,41 @@ class Dialogs:
         threading.Thread(target=extract_thread, daemon=True).start()
     
     # Search dialogs
-    def show_search_dialog(self, directory, search_engine):
-        """Show file search dialog"""
+    def show_search_dialog(self, directory, search_engine, on_select=None):
+        """Show file search dialog
+        
+        on_select(path) is called with the result the user picks.
+        """
         try:
             self.show_input(
-                "Search files (wildcards: * ?):",
+                "Search files (wildcards: * ?, several: a;b, regex: re:...):",
                 "",
-                lambda pattern: self._execute_file_search(pattern, directory, search_engine) if pattern else None
+                lambda pattern: self._execute_file_search(pattern, directory, search_engine, on_select) if pattern else None
             )
         except Exception as e:
             logger.error(f"Error showing search dialog: {e}")
             self.show_message(f"Search dialog error: {e}", type="error")
     
-    def _execute_file_search(self, pattern, directory, search_engine):
-        """Execute file search"""
-        def search_thread():
-            try:
-                results = search_engine.search_files(directory, pattern, recursive=True, max_results=100)
-                
-                if results:
-                    result_text = "Found %d matches:\n\n" % len(results)
-                    for item in results[:20]:
-                        icon = "Folder" if item['is_dir'] else "File"
-                        result_text += icon + " " + item['name'] + "\n"
-                    
-                    if len(results) > 20:
-                        result_text += "\n... and %d more" % (len(results) - 20)
-                    
-                    self.show_message(result_text, type="info")
-                else:
-                    self.show_message("No files found matching: " + pattern, type="info")
-                    
-            except Exception as e:
-                logger.error(f"Error in search thread: {e}")
-                self.show_message("Search failed: " + str(e), type="error")
+    def _execute_file_search(self, pattern, directory, search_engine, on_select=None):
+        """Execute file search, listing results as they are found"""
+        def describe(item):
+            icon = "Folder" if item['is_dir'] else "File"
+            return f"{icon} {item['name']}   ({os.path.dirname(item['path'])})"
         
-        threading.Thread(target=search_thread, daemon=True).start()
+        def picked(item):
+            if item is not None and on_select is not None:
+                on_select(item['path'])
+        
+        try:
+            # Stops this search only, not others running on the engine
+            stop = threading.Event()
+            results = search_engine.iter_files(directory, pattern, recursive=True, max_results=100,
+                                               stop_event=stop)
+            self.session.openWithCallback(picked, SearchResultsScreen, "Search: " + pattern,
+                                          results, describe, stop.set)
+        except Exception as e:
+            logger.error(f"Error starting search: {e}")
+            self.show_message("Search failed: " + str(e), type="error")
     
     def show_content_search_dialog(self, directory, search_engine):
         """Show content search dialog"""
@@ -597,7 +600,7 @@ class Dialogs:
                     with os.scandir(directory) as it:
                         for entry in it:
                             try:
-                                size = file_ops.get_file_size(entry.path, use_cache=True)
+                                size = file_ops.get_file_size(entry.path, use_cache=False)
                                 entries.append({
                                     'name': entry.name,
                                     'size': size,
@@ -831,45 +834,57 @@ class Dialogs:
             self.show_message(f"Clear bookmarks error: {e}", type="error")
     
     # Trash management
-    def show_trash_manager(self, file_ops, filelist, update_callback):
+    def show_trash_manager(self, file_ops, filelist, update_callback, run_operation=None):
         """Show trash manager"""
         try:
-            if not os.path.exists(TRASH_PATH):
-                self.show_message("Trash is empty", type="info")
-                return
-            
-            items = os.listdir(TRASH_PATH)
-            if not items:
+            entries = file_ops.list_trash_entries()
+            if not entries:
                 self.show_message("Trash is empty", type="info")
                 return
             
-            choices = [
-                ("Open Trash Folder (%d items)" % len(items), "open"),
+            # One trash folder per device
+            choices = []
+            for trash_dir in file_ops.get_trash_dirs():
+                in_dir = [e for e in entries if os.path.dirname(e.path) == trash_dir]
+                if in_dir:
+                    choices.append(("Open Trash Folder %s (%d items, %s)" % (trash_dir, len(in_dir), self._trash_size_text(in_dir)), "open:" + trash_dir))
+            choices += [
                 ("Empty Trash (Permanent Delete)", "empty"),
+                ("Purge Items Older Than %d Days" % TRASH_PURGE_DAYS, "purge"),
                 ("Restore All Items", "restore_all")
             ]
             
             self.show_choice(
-                "Trash Management",
+                "Trash Management (%s)" % self._trash_size_text(entries),
                 choices,
-                lambda choice: self._handle_trash_action(choice, file_ops, filelist, update_callback) if choice else None
+                lambda choice: self._handle_trash_action(choice, file_ops, filelist, update_callback, run_operation) if choice else None
             )
         except Exception as e:
             logger.error(f"Error showing trash manager: {e}")
             self.show_message("Trash error: " + str(e), type="error")
     
-    def _handle_trash_action(self, choice, file_ops, filelist, update_callback):
+    def _trash_size_text(self, entries):
+        """Total size of trash entries; '+' marks folders still being measured"""
+        text = format_size(sum(e.size or 0 for e in entries))
+        return text + "+" if any(e.size is None for e in entries) else text
+    
+    def _handle_trash_action(self, choice, file_ops, filelist, update_callback, run_operation=None):
         """Handle trash action"""
         action = choice[1]
         
         try:
-            if action == "open":
-                filelist.changeDir(TRASH_PATH)
+            if action.startswith("open:"):
+                filelist.changeDir(action[len("open:"):])
                 update_callback()
             elif action == "empty":
                 self.show_confirmation(
                     "Permanently delete all items in trash?",
-                    lambda res: self._empty_trash(res, file_ops, filelist, update_callback) if res else None
+                    lambda res: self._empty_trash(res, file_ops, filelist, update_callback, run_operation) if res else None
+                )
+            elif action == "purge":
+                self.show_confirmation(
+                    "Permanently delete trash items older than %d days?" % TRASH_PURGE_DAYS,
+                    lambda res: self._purge_trash(res, file_ops, filelist, update_callback, run_operation) if res else None
                 )
             elif action == "restore_all":
                 self.show_confirmation(
@@ -880,11 +895,19 @@ class Dialogs:
             logger.error(f"Error handling trash action: {e}")
             self.show_message(f"Trash action error: {e}", type="error")
     
-    def _empty_trash(self, confirmed, file_ops, filelist, update_callback):
+    def _empty_trash(self, confirmed, file_ops, filelist, update_callback, run_operation=None):
         """Empty trash"""
         if not confirmed:
             return
         
+        if run_operation is not None:
+            # Throttled background delete with progress on the main screen
+            def task(progress, cancel_event):
+                file_ops.empty_trash(progress, cancel_event)
+                return "Trash emptied successfully"
+            run_operation("Empty trash", task)
+            return
+        
         try:
             file_ops.empty_trash()
             filelist.refresh()
@@ -894,19 +917,38 @@ class Dialogs:
             logger.error(f"Error emptying trash: {e}")
             self.show_message("Empty trash failed: " + str(e), type="error")
     
+    def _purge_trash(self, confirmed, file_ops, filelist, update_callback, run_operation=None):
+        """Delete old trash items"""
+        if not confirmed:
+            return
+        
+        if run_operation is not None:
+            def task(progress, cancel_event):
+                return "Purged %d items from trash" % file_ops.purge_trash(TRASH_PURGE_DAYS, progress, cancel_event)
+            run_operation("Purge trash", task)
+            return
+        
+        try:
+            purged = file_ops.purge_trash(TRASH_PURGE_DAYS)
+            filelist.refresh()
+            update_callback()
+            self.show_message("Purged %d items from trash" % purged, type="info")
+        except Exception as e:
+            logger.error(f"Error purging trash: {e}")
+            self.show_message("Purge trash failed: " + str(e), type="error")
+    
     def _restore_all_from_trash(self, confirmed, file_ops, filelist, update_callback):
         """Restore all from trash"""
         if not confirmed:
             return
         
         try:
-            items = os.listdir(TRASH_PATH)
+            items = file_ops.list_trash_items()
             restored = 0
             failed = 0
             
-            for item in items:
+            for trash_item in items:
                 try:
-                    trash_item = os.path.join(TRASH_PATH, item)
                     file_ops.restore_from_trash(trash_item)
                     restored += 1
                 except:
@@ -1407,17 +1449,17 @@ class Dialogs:
         
         def cleanup_thread():
             try:
-                temp_extensions = ['.tmp', '.temp', '.log', '.bak', '.backup', '.old']
+                temp_extensions = ('.tmp', '.temp', '.log', '.bak', '.backup', '.old')
                 count = 0
                 
-                for root, dirs, files in os.walk(directory):
-                    for file in files:
-                        if any(file.endswith(ext) for ext in temp_extensions):
-                            try:
-                                os.remove(os.path.join(root, file))
-                                count += 1
-                            except:
-                                pass
+                # Never reach into other mounts or the trash
+                for entry in TreeWalker(one_filesystem=True).files(directory):
+                    if entry.name.endswith(temp_extensions):
+                        try:
+                            os.remove(entry.path)
+                            count += 1
+                        except:
+                            pass
                 
                 filelist.refresh()
                 update_callback()
@@ -1437,9 +1479,9 @@ class Dialogs:
             try:
                 count = 0
                 
-                for root, dirs, files in os.walk(directory, topdown=False):
-                    for dir in dirs:
-                        dir_path = os.path.join(root, dir)
+                for root, dirs, files in TreeWalker(one_filesystem=True).walk(directory, topdown=False):
+                    for entry in dirs:
+                        dir_path = entry.path
                         try:
                             if not os.listdir(dir_path):
                                 os.rmdir(dir_path)
@@ -1466,18 +1508,16 @@ class Dialogs:
                 count = 0
                 total_size = 0
                 
-                for root, dirs, files in os.walk(directory):
-                    for file in files:
-                        if 'cache' in file.lower() or file.endswith('.cache'):
-                            file_path = os.path.join(root, file)
-                            try:
-                                size = os.path.getsize(file_path)
-                                if size > 100 * 1024 * 1024:  # 100MB
-                                    os.remove(file_path)
-                                    count += 1
-                                    total_size += size
-                            except:
-                                pass
+                for entry in TreeWalker(one_filesystem=True).files(directory):
+                    if 'cache' in entry.name.lower() or entry.name.endswith('.cache'):
+                        size = entry_size(entry)
+                        try:
+                            if size is not None and size > 100 * 1024 * 1024:  # 100MB
+                                os.remove(entry.path)
+                                count += 1
+                                total_size += size
+                        except:
+                            pass
                 
                 filelist.refresh()
                 update_callback()
@@ -1526,14 +1566,18 @@ class Dialogs:
         def repair_thread():
             try:
                 count = 0
+                infos = file_ops.stat_many(files)
                 
                 for file_path in files:
+                    info = infos.get(file_path)
+                    if info is None:
+                        continue
                     try:
-                        if os.path.isdir(file_path):
+                        if info.is_dir:
                             file_ops.change_permissions(file_path, "755")
                         else:
                             # Check if file is executable
-                            if os.access(file_path, os.X_OK) or file_path.endswith(('.sh', '.py', '.bin')):
+                            if info.mode & 0o111 or file_path.endswith(('.sh', '.py', '.bin')):
                                 file_ops.change_permissions(file_path, "755")
                             else:
                                 file_ops.change_permissions(file_path, "644")
@@ -1587,18 +1631,13 @@ class Dialogs:
         def scan_thread():
             try:
                 broken = []
-                picon_extensions = ['.png', '.jpg', '.jpeg', '.bmp']
+                picon_extensions = ('.png', '.jpg', '.jpeg', '.bmp')
                 
-                for root, dirs, files in os.walk(directory):
-                    for file in files:
-                        if any(file.endswith(ext) for ext in picon_extensions):
-                            file_path = os.path.join(root, file)
-                            try:
-                                size = os.path.getsize(file_path)
-                                if size < 100:  # Likely broken if <100 bytes
-                                    broken.append(file_path)
-                            except:
-                                pass
+                for entry in TreeWalker().files(directory):
+                    if entry.name.endswith(picon_extensions):
+                        size = entry_size(entry)
+                        if size is not None and size < 100:  # Likely broken if <100 bytes
+                            broken.append(entry.path)
                 
                 if broken:
                     msg = f"Found {len(broken)} potentially broken picons:\n\n"
@@ -1646,16 +1685,21 @@ class Dialogs:
             if queue:
                 msg = f"Queue: {len(queue)} items\n\n"
                 for i, item in enumerate(queue[:5], 1):
-                    msg += f"{i}. {item.get('type', 'unknown')}: {item.get('name', 'unknown')}\n"
+                    msg += f"{i}. {item.get('type', 'unknown')}: {item.get('name', 'unknown')}"
+                    if item.get('state') == 'running' and item.get('size'):
+                        msg += f" ({item['copied'] * 100 // item['size']}%)"
+                    msg += "\n"
                 if len(queue) > 5:
                     msg += f"\n... and {len(queue) - 5} more"
                 self.show_message(msg, type="info")
             else:
                 self.show_message("Queue is empty", type="info")
         elif action == "start":
+            queue_manager.start()
             self.show_message("Starting queue...", type="info", timeout=2)
         elif action == "pause":
-            self.show_message("Pausing queue...", type="info", timeout=2)
+            queue_manager.pause()
+            self.show_message("Pausing queue...\n\nRunning transfers will finish first.", type="info", timeout=2)
         elif action == "clear":
             self.show_confirmation(
                 "Clear all queued operations?",
@@ -1668,6 +1712,19 @@ class Dialogs:
             msg += f"Completed: {stats.get('completed', 0)}\n"
             msg += f"Failed: {stats.get('failed', 0)}\n"
             msg += f"Pending: {stats.get('pending', 0)}"
+            if stats.get('verified') or stats.get('mismatched'):
+                msg += f"\nVerified files: {stats['verified']}"
+                if stats.get('mismatched'):
+                    msg += f"\nChecksum mismatches: {stats['mismatched']}"
+            if stats.get('running'):
+                msg += f"\nRunning: {stats['running']}"
+                msg += f"\n\nProgress: {format_size(stats['bytes_done'])} / {format_size(stats['bytes_total'])}"
+                msg += f"\nThroughput: {format_size(int(stats['throughput']))}/s"
+                if stats.get('eta') is not None:
+                    eta = int(stats['eta'])
+                    msg += f"\nETA: {eta // 60}m {eta % 60:02d}s"
+            if stats.get('paused'):
+                msg += "\n\n(paused)"
             self.show_message(msg, type="info")
     
     def _execute_queue_clear(self, confirmed, queue_manager):
@@ -13,11 +13,19 @@ import os
 import time
 
 from ..core.config import PilotFSConfig
+from ..constants import MAX_CACHE_BYTES
+from ..core.cache import ShardedFileCache, CacheStatsExporter
 from ..core.file_operations import FileOperations
+from ..core.transfer_scheduler import TransferScheduler
+from ..core.transfer_journal import TransferJournal
+from ..core.copy_engine import TransferReport
+from ..core.listing_cache import DirectoryListingCache
 from ..core.archive import ArchiveManager
 from ..core.search import SearchEngine
+from ..core.file_index import FileIndex
 from ..network.remote_manager import RemoteConnectionManager
 from ..network.mount import MountManager
+from ..exceptions import OperationCancelledError
 from ..utils.formatters import get_file_icon, format_size
 from ..utils.logging_config import get_logger
 from .context_menu import ContextMenuHandler
@@ -104,11 +112,27 @@ class PilotFSMain(Screen):
             print(f"[PilotFS] Config Init Error: {e}")
             from Components.config import config as en_config
             self.config = en_config # Fallback to global config
-        self.file_ops = FileOperations(self.config)
+        self.cache = None
+        self.cache_stats_exporter = None
+        try:
+            if self.config.plugins.pilotfs.cache_enabled.value:
+                self.cache = ShardedFileCache(max_bytes=MAX_CACHE_BYTES)
+                self.cache_stats_exporter = CacheStatsExporter(self.cache)
+                self.cache_stats_exporter.start()
+        except Exception as e:
+            logger.error(f"Cache init error: {e}")
+        self.file_index = FileIndex()
+        self.file_ops = FileOperations(self.config, self.cache, self.file_index)
+        self.transfer_journal = TransferJournal()
+        self.transfer_scheduler = TransferScheduler(self.file_ops, journal=self.transfer_journal)
         self.archive_mgr = ArchiveManager(self.file_ops)
-        self.search_engine = SearchEngine()
+        self.search_engine = SearchEngine(self.cache, self.file_index)
+        self.listing_cache = DirectoryListingCache()
         self.remote_mgr = RemoteConnectionManager(self.config)
         self.mount_mgr = MountManager(self.config)
+        self.mount_mgr.add_mount_listener(self.file_ops.negative_cache.drop_mount)
+        self.mount_mgr.add_mount_listener(lambda mount_point: self.listing_cache.invalidate_all())
+        self.mount_mgr.add_mount_listener(lambda mount_point: self.file_index.refresh_async(force=True))
         
         # 3. Initialize state (MOVE THIS HERE)
         self.marked_files = set()
@@ -157,6 +181,15 @@ class PilotFSMain(Screen):
         except Exception as e:
             print("[PilotFS] Error saving paths on close: %s" % str(e))
 
+        if self.cache_stats_exporter is not None:
+            self.cache_stats_exporter.stop()
+        if self.cache is not None:
+            self.cache.close()
+        self.listing_cache.close()
+        self.transfer_scheduler.close()
+        self.file_ops.size_service.close()
+        self.file_index.close()
+
         # IMPORTANT: Always call the parent Screen close at the end
         from Screens.Screen import Screen
         Screen.close(self)    
@@ -234,6 +267,12 @@ class PilotFSMain(Screen):
         self.operation_timer.callback.append(self.update_operation_progress)
         self.operation_current = 0
         self.operation_total = 0
+        self.operation_cancel = threading.Event()
+        
+        # Directory sizes arrive from a background thread; poll for them
+        self.size_timer = eTimer()
+        self.size_timer.callback.append(self.on_size_timer)
+        self.resort_when_sized = None
         
         # OK button - Simple navigation (long press disabled)
         # Long press feature removed for immediate response
@@ -333,6 +372,92 @@ class PilotFSMain(Screen):
         
         logger.info("PilotFS started successfully")
         self["status_bar"].setText("Ready")
+        
+        # Build or revalidate the search index while the user browses
+        self.file_index.refresh_async()
+        
+        self.offer_transfer_resume()
+
+    def offer_transfer_resume(self):
+        """Ask whether to continue transfers cut short by a restart or reboot"""
+        entries = self.transfer_journal.leftovers()
+        if not entries:
+            return
+        
+        names = [f"{'Copy' if e.mode == 'cp' else 'Move'}: {os.path.basename(e.source.rstrip('/'))}"
+                 for e in entries[:5]]
+        if len(entries) > 5:
+            names.append(f"... and {len(entries) - 5} more")
+        self.dialogs.show_confirmation(
+            f"{len(entries)} unfinished transfers from the last session:\n\n"
+            + "\n".join(names) + "\n\nResume them?",
+            lambda res: self.execute_resume(res, entries)
+        )
+
+    def execute_resume(self, confirmed, entries):
+        """Resume journaled transfers, or forget them"""
+        if not confirmed:
+            self.transfer_journal.discard_leftovers()
+            return
+        
+        with self.operation_lock:
+            if self.operation_in_progress:
+                self.dialogs.show_message("Another operation is in progress!", type="warning")
+                return
+            self.operation_in_progress = True
+        
+        try:
+            self.operation_current = 0
+            self.operation_total = 0
+            self.operation_cancel.clear()
+            self.operation_timer.start(500)
+            
+            thread = threading.Thread(
+                target=self._perform_resume,
+                args=(entries,),
+                daemon=True
+            )
+            thread.start()
+        except Exception as e:
+            logger.error(f"Error resuming transfers: {e}")
+            with self.operation_lock:
+                self.operation_in_progress = False
+            self.show_error("Resume", e)
+
+    def _perform_resume(self, entries):
+        """Run resumed transfers in thread"""
+        try:
+            jobs = [self.transfer_scheduler.resume(entry) for entry in entries]
+            report = self._wait_for_transfers(jobs)
+            
+            with self.operation_lock:
+                self.operation_in_progress = False
+                self.operation_timer.stop()
+            
+            self.session.openWithCallback(
+                lambda: None,
+                MessageBox,
+                "Resumed transfers complete!" + (f"\n\n{report}" if report else ""),
+                type=MessageBox.TYPE_INFO,
+                timeout=2 if not report else 10
+            )
+            
+            self.active_pane.refresh()
+            self.inactive_pane.refresh()
+            self.update_ui()
+            
+        except Exception as e:
+            logger.error(f"Resumed transfers failed: {e}")
+            with self.operation_lock:
+                self.operation_in_progress = False
+                self.operation_timer.stop()
+            
+            self.session.openWithCallback(
+                lambda: None,
+                MessageBox,
+                f"Resume failed:\n{e}",
+                type=MessageBox.TYPE_ERROR
+            )
 
     def validate_config(self):
         """Validate configuration"""
@@ -468,15 +593,24 @@ class PilotFSMain(Screen):
                 except:
                     is_marked = False
                 
-                # Only get size for files, not directories (too slow)
-                if os.path.isfile(path):
-                    try:
-                        size = os.path.getsize(path)
-                        size_str = format_size(size)
-                    except:
-                        size_str = "?"
-                else:
-                    size_str = "DIR"
+                try:
+                    info = self.file_ops.stat_engine.stat(path)
+                    if not info.is_dir:
+                        size_str = info.size_formatted
+                    elif self._is_child_of_current(path):
+                        size = self.file_ops.size_service.get_size(path)
+                        if size is None:
+                            size_str = "DIR | computing..."
+                            self.size_timer.start(500, True)
+                        else:
+                            size_str = f"DIR | {format_size(size)}"
+                            if self.file_ops.size_service.is_pending(path):
+                                # Show the total again once it is revalidated
+                                self.size_timer.start(500, True)
+                    else:
+                        size_str = "DIR"
+                except OSError:
+                    size_str = "?"
                 
                 # Show in RED if marked
                 if is_marked:
@@ -491,6 +625,21 @@ class PilotFSMain(Screen):
         
         self["info_panel"].setText("")
 
+    def _is_child_of_current(self, path):
+        """True for entries inside the current directory (not the parent link)"""
+        current = self.active_pane.getCurrentDirectory()
+        return bool(current) and os.path.dirname(os.path.normpath(path)) == os.path.normpath(current)
+
+    def on_size_timer(self):
+        """Show directory sizes that finished computing in the background"""
+        self.update_info_panel()
+        if self.resort_when_sized is not None:
+            if any(self.file_ops.size_service.is_pending(p) for p in self.resort_when_sized):
+                self.size_timer.start(500, True)
+            else:
+                self.resort_when_sized = None
+                self.apply_sorting()
+
     def update_operation_progress(self):
         """Update progress bar during operations"""
         try:
@@ -659,6 +808,15 @@ class PilotFSMain(Screen):
         except Exception as e:
             logger.error(f"Error going end: {e}")
 
+    def show_search_result(self, path):
+        """Open the folder holding path in the active pane and select it"""
+        try:
+            select = path + '/' if os.path.isdir(path) else path
+            self.active_pane.changeDir(os.path.dirname(path.rstrip('/')) or '/', select=select)
+            self.update_ui()
+        except Exception as e:
+            logger.error(f"Error showing search result: {e}")
+
     def focus_left(self):
         """Switch focus to left pane"""
         try:
@@ -737,20 +895,7 @@ class PilotFSMain(Screen):
         if not confirmed:
             return
         
-        try:
-            self.file_ops.delete(item_path)
-            self.active_pane.refresh()
-            self.update_ui()
-            
-            if self.config.plugins.pilotfs.trash_enabled.value == "yes":
-                msg = f"Moved to trash: {item_name}"
-            else:
-                msg = f"Permanently deleted: {item_name}"
-            
-            self.dialogs.show_message(msg, type="info", timeout=2)
-        except Exception as e:
-            logger.error(f"Error executing delete: {e}")
-            self.show_error("Delete", e)
+        self.start_deletion([item_path])
 
     def rename_request(self):
         """Request file rename - GREEN button"""
@@ -819,7 +964,7 @@ class PilotFSMain(Screen):
                 self.dialogs.show_message("No files selected!", type="info")
                 return
             
-            self.dialogs.show_transfer_dialog(files, dest, self.execute_transfer)
+            self.dialogs.show_transfer_dialog(files, dest, self.execute_transfer, self.file_ops)
         except Exception as e:
             logger.error(f"Error in quick copy: {e}")
             self.show_error("Copy", e)
@@ -877,7 +1022,8 @@ class PilotFSMain(Screen):
         
         try:
             self.operation_current = 0
-            self.operation_total = len(files)
+            self.operation_total = 0
+            self.operation_cancel.clear()
             self.operation_timer.start(500)
             
             thread = threading.Thread(
@@ -895,19 +1041,13 @@ class PilotFSMain(Screen):
     def _perform_paste(self, mode, files, dest):
         """Perform paste operation in thread"""
         try:
-            for i, src in enumerate(files):
-                try:
-                    if mode == "cp":
-                        self.file_ops.copy(src, dest)
-                    elif mode == "mv":
-                        self.file_ops.move(src, dest)
-                    
-                    with self.operation_lock:
-                        self.operation_current = i + 1
-                    
-                except Exception as e:
-                    logger.error(f"Paste failed for {src}: {e}")
-                    # Continue with next file
+            # Refuse up front rather than halfway through
+            plan = self.file_ops.plan_transfer(files, dest, mode)
+            plan.check()
+            
+            verify = self.config.plugins.pilotfs.verify_copies.value
+            jobs = self.transfer_scheduler.submit_many(mode, files, dest, verify, plan)
+            report = self._wait_for_transfers(jobs)
             
             # Operation complete
             with self.operation_lock:
@@ -923,9 +1063,9 @@ class PilotFSMain(Screen):
             self.session.openWithCallback(
                 lambda: None,
                 MessageBox,
-                "Paste complete!",
+                "Paste complete!" + (f"\n\n{report}" if report else ""),
                 type=MessageBox.TYPE_INFO,
-                timeout=2
+                timeout=2 if not report else 10
             )
             
             # Refresh panes
@@ -947,6 +1087,133 @@ class PilotFSMain(Screen):
                 type=MessageBox.TYPE_ERROR
             )
 
+    def _wait_for_transfers(self, jobs):
+        """Block until the scheduled jobs finish, mirroring their byte progress
+        
+        Returns a short report: failed jobs and checksum results, if any.
+        """
+        with self.operation_lock:
+            self.operation_total = sum(job.size for job in jobs)
+        
+        while not self.transfer_scheduler.wait(jobs, timeout=0.5):
+            if self.operation_cancel.is_set():
+                self.transfer_scheduler.cancel(jobs)
+            self.operation_current = sum(job.size if job.state == 'done' else job.copied for job in jobs)
+        self.operation_current = self.operation_total
+        
+        lines = []
+        combined = TransferReport()
+        for job in jobs:
+            if job.state == 'failed':
+                logger.error(f"{job.mode} failed for {job.source}: {job.error}")
+                lines.append(f"Failed: {os.path.basename(job.source.rstrip('/'))}")
+            for result in job.report.results:
+                combined.add(result)
+            for source, action in job.report.special:
+                combined.add_special(source, action)
+        summary = combined.summary()
+        if summary:
+            lines.append(summary)
+        return "\n".join(lines)
+
+    def run_operation(self, label, task):
+        """Run task(progress_callback, cancel_event) on a worker thread
+        
+        The progress bar follows progress_callback(done, total) through the
+        operation timer, and EXIT offers to set cancel_event. The string the
+        task returns is shown when it finishes.
+        """
+        with self.operation_lock:
+            if self.operation_in_progress:
+                self.dialogs.show_message("Another operation is in progress!", type="warning")
+                return False
+            self.operation_in_progress = True
+        
+        try:
+            self.operation_current = 0
+            self.operation_total = 0
+            self.operation_cancel.clear()
+            self.operation_timer.start(500)
+            
+            thread = threading.Thread(
+                target=self._perform_operation,
+                args=(label, task),
+                daemon=True
+            )
+            thread.start()
+            return True
+        except Exception as e:
+            logger.error(f"Error starting {label}: {e}")
+            with self.operation_lock:
+                self.operation_in_progress = False
+            self.show_error(label, e)
+            return False
+
+    def _perform_operation(self, label, task):
+        """Body of run_operation(), runs in thread"""
+        def progress(done, total):
+            self.operation_current = done
+            self.operation_total = total
+        
+        msg_type = MessageBox.TYPE_INFO
+        try:
+            msg = task(progress, self.operation_cancel)
+        except OperationCancelledError:
+            msg = f"{label} cancelled"
+        except Exception as e:
+            logger.error(f"{label} failed: {e}")
+            msg = f"{label} failed:\n{e}"
+            msg_type = MessageBox.TYPE_ERROR
+        finally:
+            with self.operation_lock:
+                self.operation_in_progress = False
+                self.operation_timer.stop()
+        
+        self.session.openWithCallback(
+            lambda *args: None,
+            MessageBox,
+            msg,
+            type=msg_type,
+            timeout=3 if msg_type == MessageBox.TYPE_INFO else 0
+        )
+        
+        # Refresh panes
+        self.active_pane.refresh()
+        self.inactive_pane.refresh()
+        self.update_ui()
+
+    def start_deletion(self, files):
+        """Delete (or trash) files in the background with throttled unlinking"""
+        files = list(files)
+        to_trash = self.config.plugins.pilotfs.trash_enabled.value == "yes"
+        
+        def task(progress, cancel_event):
+            success = 0
+            errors = []
+            for item_path in files:
+                if cancel_event.is_set():
+                    raise OperationCancelledError("Delete cancelled")
+                try:
+                    self.file_ops.delete(item_path, progress_callback=progress, cancel_event=cancel_event)
+                    success += 1
+                except OperationCancelledError:
+                    raise
+                except Exception as e:
+                    errors.append(f"{os.path.basename(item_path)}: {str(e)[:30]}")
+            
+            if len(files) == 1 and not errors:
+                name = os.path.basename(files[0])
+                return f"Moved to trash: {name}" if to_trash else f"Permanently deleted: {name}"
+            msg = f"Deleted: {success} items\n"
+            if errors:
+                msg += f"\nFailed: {len(errors)}\n"
+                msg += "\n".join(errors[:3])
+                if len(errors) > 3:
+                    msg += f"\n... and {len(errors) - 3} more"
+            return msg
+        
+        return self.run_operation("Delete", task)
+
     def execute_transfer(self, mode, files, dest):
         """Execute file transfer"""
         with self.operation_lock:
@@ -957,7 +1224,8 @@ class PilotFSMain(Screen):
         
         try:
             self.operation_current = 0
-            self.operation_total = len(files)
+            self.operation_total = 0
+            self.operation_cancel.clear()
             self.operation_timer.start(500)
             
             thread = threading.Thread(
@@ -975,19 +1243,13 @@ class PilotFSMain(Screen):
     def _perform_transfer(self, mode, files, dest):
         """Perform transfer in thread"""
         try:
-            for i, src in enumerate(files):
-                try:
-                    if mode == "cp":
-                        self.file_ops.copy(src, dest)
-                    elif mode == "mv":
-                        self.file_ops.move(src, dest)
-                    
-                    with self.operation_lock:
-                        self.operation_current = i + 1
-                    
-                except Exception as e:
-                    logger.error(f"Transfer failed for {src}: {e}")
-                    # Continue with next file
+            # Refuse up front rather than halfway through
+            plan = self.file_ops.plan_transfer(files, dest, mode)
+            plan.check()
+            
+            verify = self.config.plugins.pilotfs.verify_copies.value
+            jobs = self.transfer_scheduler.submit_many(mode, files, dest, verify, plan)
+            report = self._wait_for_transfers(jobs)
             
             # Operation complete
             with self.operation_lock:
@@ -998,9 +1260,9 @@ class PilotFSMain(Screen):
             self.session.openWithCallback(
                 lambda: None,
                 MessageBox,
-                "Transfer complete!",
+                "Transfer complete!" + (f"\n\n{report}" if report else ""),
                 type=MessageBox.TYPE_INFO,
-                timeout=2
+                timeout=2 if not report else 10
             )
             
             # Refresh panes
@@ -1150,21 +1412,7 @@ class PilotFSMain(Screen):
 
     def can_play_file(self, path):
         """Check if file can be played"""
-        if not os.path.exists(path):
-            return False
-        
-        # Check file size
-        try:
-            size = os.path.getsize(path)
-            if size == 0:
-                return False
-        except:
-            return False
-        
-        # Check extension
-        ext = os.path.splitext(path)[1].lower()
-        supported = ['.mp4', '.mkv', '.avi', '.ts', '.m2ts', '.mp3', '.flac', '.wav', '.aac', '.ogg', '.m4a']
-        return ext in supported
+        return self.file_ops.can_play_file(path)
 
     def show_icon_legend(self):
         """Show file type icon legend"""
@@ -1307,13 +1555,39 @@ class PilotFSMain(Screen):
             else:
                 current_sort = self.right_sort_mode
             
+            # Size and date come from the cached listing instead of a stat per item
+            try:
+                listing = self.listing_cache.get_entry_map(self.active_pane.getCurrentDirectory())
+            except Exception:
+                listing = {}
+            
+            def entry_of(item):
+                return listing.get(os.path.normpath(item[0][0]))
+            
             # Sort based on mode
             if current_sort == "name":
                 items.sort(key=lambda x: x[0][0].lower())
             elif current_sort == "size":
-                items.sort(key=lambda x: self.file_ops.get_file_size(x[0][0]), reverse=True)
+                waiting = []
+                
+                def size_of(item):
+                    entry = entry_of(item)
+                    if entry is None:
+                        return 0
+                    if not entry.is_dir:
+                        return entry.size
+                    size = self.file_ops.size_service.get_size(entry.path)
+                    if size is None:
+                        waiting.append(entry.path)
+                    return size or 0
+                
+                items.sort(key=size_of, reverse=True)
+                if waiting:
+                    # Sort again once the folder sizes are known
+                    self.resort_when_sized = waiting
+                    self.size_timer.start(500, True)
             elif current_sort == "date":
-                items.sort(key=lambda x: os.path.getmtime(x[0][0]) if os.path.exists(x[0][0]) else 0, reverse=True)
+                items.sort(key=lambda x: entry_of(x).mtime if entry_of(x) else 0, reverse=True)
             elif current_sort == "type":
                 items.sort(key=lambda x: (not x[0][1], os.path.splitext(x[0][0])[1].lower()))
             
@@ -1509,11 +1783,21 @@ class PilotFSMain(Screen):
         
         threading.Thread(target=play_thread, daemon=True).start()
 
-    def refresh_panes(self):
+    def refresh_pane(self, pane, force=False):
+        """Re-read a pane unless its directory is unchanged since the last refresh"""
+        directory = pane.getCurrentDirectory()
+        if not force and directory and self.listing_cache.is_fresh(directory):
+            return False
+        # FileList reads the directory itself; a listing cached for sorting
+        # or the info panel keeps it fresh for the next refresh
+        pane.refresh()
+        return True
+
+    def refresh_panes(self, force=False):
         """Refresh both panes"""
         try:
-            self["left_pane"].refresh()
-            self["right_pane"].refresh()
+            self.refresh_pane(self["left_pane"], force)
+            self.refresh_pane(self["right_pane"], force)
             self.update_ui()
             self["status_bar"].setText("Refreshed")
         except Exception as e:
@@ -1544,6 +1828,7 @@ class PilotFSMain(Screen):
             self.marked_files.clear()
             
             # Cancel any pending operations
+            self.operation_cancel.set()
             with self.operation_lock:
                 self.operation_in_progress = False
             
@@ -1554,7 +1839,10 @@ class PilotFSMain(Screen):
     def close_plugin(self):
         """Clean shutdown"""
         if self.operation_in_progress:
-            self.dialogs.show_message("Operation in progress!\n\nPlease wait...", type="warning")
+            self.dialogs.show_confirmation(
+                "Operation in progress!\n\nCancel it?",
+                lambda res: res and self.operation_cancel.set()
+            )
             return
         
         try:
@@ -1670,27 +1958,4 @@ class PilotFSMain(Screen):
         if not confirmed:
             return
         
-        try:
-            success = 0
-            errors = []
-            
-            for item_path in files:
-                try:
-                    self.file_ops.delete(item_path)
-                    success += 1
-                except Exception as e:
-                    errors.append(f"{os.path.basename(item_path)}: {str(e)[:30]}")
-            
-            msg = f"Deleted: {success} items\n"
-            if errors:
-                msg += f"\nFailed: {len(errors)}\n"
-                msg += "\n".join(errors[:3])
-                if len(errors) > 3:
-                    msg += f"\n... and {len(errors) - 3} more"
-            
-            self.active_pane.refresh()
-            self.update_ui()
-            self.dialogs.show_message(msg, type="info")
-        except Exception as e:
-            logger.error(f"Error deleting multiple items: {e}")
-            self.dialogs.show_message(f"Delete multiple failed: {e}", type="error")
\ No newline at end of file
+        self.start_deletion(files)
\ No newline at end of file
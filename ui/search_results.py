@@ -0,0 +1,131 @@
+from Screens.Screen import Screen
+from Components.ActionMap import ActionMap
+from Components.Label import Label
+from Components.MenuList import MenuList
+from enigma import getDesktop, eTimer
+import threading
+import time
+
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class SearchResultsScreen(Screen):
+    """Result list that fills in while a search is still running.
+
+    results is an iterator (one of the SearchEngine.iter_* generators); it
+    is consumed on a worker thread that only appends to a pending list.
+    The UI timer moves whatever has arrived into the list in one batch, so
+    the list never redraws more than a few times a second however fast
+    the results come. describe(item) gives the text shown for an item.
+    OK closes with the selected item, EXIT stops the search and closes
+    with None.
+    """
+
+    REFRESH_MS = 250
+
+    def __init__(self, session, title, results, describe, stop=None):
+        Screen.__init__(self, session)
+        self.results = results
+        self.describe = describe
+        self.stop = stop
+        self._pending = []
+        self._lock = threading.Lock()
+        self._done = False
+        self._error = None
+        self._closed = False
+        self._started = 0.0
+        self._first = None
+        self.entries = []
+
+        w, h = getDesktop(0).size().width(), getDesktop(0).size().height()
+        panel_w, panel_h = min(w - 100, 1200), min(h - 100, 700)
+        pos_x, pos_y = (w - panel_w) // 2, (h - panel_h) // 2
+
+        self.skin = f"""
+        <screen name="SearchResultsScreen" position="{pos_x},{pos_y}" size="{panel_w},{panel_h}" title="Search" backgroundColor="#1a1a1a">
+            <eLabel position="0,0" size="{panel_w},50" backgroundColor="#0055aa" />
+            <widget name="title" position="20,5" size="{panel_w - 40},40" font="Regular;28" valign="center" transparent="1" foregroundColor="#ffffff" />
+            <widget name="list" position="20,65" size="{panel_w - 40},{panel_h - 160}" itemHeight="35" font="Regular;22" scrollbarMode="showOnDemand" />
+            <widget name="status" position="20,{panel_h - 85}" size="{panel_w - 40},30" font="Regular;20" foregroundColor="#ffff00" transparent="1" />
+            <widget name="help" position="20,{panel_h - 45}" size="{panel_w - 40},30" font="Regular;18" foregroundColor="#aaaaaa" transparent="1" />
+        </screen>"""
+
+        self["title"] = Label(title)
+        self["list"] = MenuList([])
+        self["status"] = Label("Searching...")
+        self["help"] = Label("OK:Go to  EXIT:Stop/Close")
+
+        self["actions"] = ActionMap(["OkCancelActions"], {
+            "ok": self.select,
+            "cancel": self.cancel,
+        }, -1)
+
+        self.refresh_timer = eTimer()
+        self.refresh_timer.callback.append(self.drain)
+        self.onLayoutFinish.append(self.start_search)
+        self.onClose.append(self.stop_search)
+
+    def start_search(self):
+        self._started = time.monotonic()
+        threading.Thread(target=self._consume, daemon=True).start()
+        self.refresh_timer.start(self.REFRESH_MS)
+
+    def _consume(self):
+        try:
+            for item in self.results:
+                with self._lock:
+                    if self._closed:
+                        break
+                    if self._first is None:
+                        self._first = time.monotonic() - self._started
+                    self._pending.append(item)
+        except Exception as e:
+            logger.error(f"Error in search thread: {e}")
+            self._error = e
+        finally:
+            self._done = True
+
+    def drain(self):
+        """Move results that arrived since the last tick into the list"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            done = self._done
+        try:
+            if batch:
+                self.entries.extend((self.describe(item), item) for item in batch)
+                self["list"].setList(self.entries)
+
+            elapsed = time.monotonic() - self._started
+            if self._error is not None:
+                status = f"Search failed: {self._error}"
+            elif done:
+                status = f"{len(self.entries)} found in {elapsed:.1f}s" if self.entries else "Nothing found"
+            else:
+                status = f"Searching... {len(self.entries)} found"
+            if self._first is not None:
+                status += f"   (first after {self._first * 1000:.0f} ms)"
+            self["status"].setText(status)
+        except Exception as e:
+            logger.error(f"Error updating search results: {e}")
+
+        if done:
+            self.refresh_timer.stop()
+
+    def select(self):
+        current = self["list"].getCurrent()
+        if current:
+            self.close(current[1])
+
+    def cancel(self):
+        if not self._done:
+            self.stop_search()
+            self["status"].setText(f"Stopped, {len(self.entries)} found")
+            return
+        self.close(None)
+
+    def stop_search(self):
+        with self._lock:
+            self._closed = True
+        if self.stop is not None and not self._done:
+            self.stop()
@@ -125,6 +125,7 @@ class PilotFSSetup(ConfigListScreen, Screen):
             self.list.append(getConfigListEntry("══════ File Operations ══════", ConfigNothing()))
             self.list.append(getConfigListEntry("Enable Trash:", p.trash_enabled))
             self.list.append(getConfigListEntry("Enable Cache:", p.cache_enabled))
+            self.list.append(getConfigListEntry("Verify Copies (checksum):", p.verify_copies))
             self.list.append(getConfigListEntry("Preview Size Limit:", p.preview_size))
             
             # Exit Behavior